@@ -1,7 +1,14 @@
 # leaderboards/admin.py
 from django.contrib import admin
-from .models import League
+from .models import League, ResetRun
 
 @admin.register(League)
 class LeagueAdmin(admin.ModelAdmin):
     list_display = ("name", "order", "icon")
+
+
+@admin.register(ResetRun)
+class ResetRunAdmin(admin.ModelAdmin):
+    list_display = ("started_at", "week_start", "mode", "status", "users_processed", "duration_seconds", "peak_rss_mib")
+    list_filter = ("status", "mode")
+    readonly_fields = [field.name for field in ResetRun._meta.fields]
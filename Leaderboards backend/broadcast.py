@@ -0,0 +1,174 @@
+# leaderboards/broadcast.py
+
+import logging
+
+from asgiref.sync import async_to_sync
+from celery import shared_task
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.cache import cache
+
+from .metrics import REGISTRY
+from .models import UserLeaguePlacement
+from .ranking import ranked_group
+
+logger = logging.getLogger(__name__)
+
+# Sequence numbers and the last published board outlive a cycle by a day, then expire.
+BROADCAST_STATE_TIMEOUT = 60 * 60 * 24 * 8
+# Seconds between two broadcasts of the same group (settings.LEADERBOARD_BROADCAST_INTERVAL).
+BROADCAST_INTERVAL = 0.25
+# Dirty marks and emit locks outlive a lost emit task by this much, then clear themselves.
+BROADCAST_MARK_TIMEOUT = 5
+
+broadcasts_emitted = REGISTRY.counter(
+    "leaderboards_broadcasts_emitted_total", "Group leaderboard broadcasts sent."
+)
+broadcasts_suppressed = REGISTRY.counter(
+    "leaderboards_broadcasts_suppressed_total",
+    "Broadcast requests folded into a broadcast already scheduled for the group.",
+)
+
+
+def group_channel_name(league_group_id):
+    return f"league_group_{league_group_id}"
+
+
+def _dirty_key(league_group_id):
+    return f"leaderboards:dirty:{league_group_id}"
+
+
+def _emit_lock_key(league_group_id):
+    return f"leaderboards:emitting:{league_group_id}"
+
+
+def _seq_key(league_group_id):
+    return f"leaderboards:seq:{league_group_id}"
+
+
+def _state_key(league_group_id):
+    return f"leaderboards:published:{league_group_id}"
+
+
+def current_seq(league_group_id):
+    return cache.get(_seq_key(league_group_id), 0)
+
+
+def _next_seq(league_group_id):
+    key = _seq_key(league_group_id)
+    cache.add(key, 0, BROADCAST_STATE_TIMEOUT)
+    return cache.incr(key)
+
+
+def _ranked_rows(league_group_id):
+    """[(user_id, username, rank, exp_earned), ...] best first, ranked by ranked_group()."""
+    usernames = {}
+    scores = {}
+    for user_id, username, exp_earned in (
+        UserLeaguePlacement.objects
+        .filter(league_group_id=league_group_id)
+        .values_list("user_id", "user__username", "exp_earned")
+    ):
+        usernames[user_id] = username
+        scores[user_id] = exp_earned  # ranked when the store is not shared, or loaded into it
+    ranked = ranked_group(league_group_id, lambda: scores, usernames)
+    return [
+        (user_id, usernames[user_id], rank, exp_earned)
+        for rank, (user_id, exp_earned) in enumerate(ranked, start=1)
+    ]
+
+
+def publish_group_delta(league_group_id):
+    """
+    Sends the members of a group only what changed since the last message:
+
+        {"type": "leaderboard.delta", "seq": 12,
+         "changes": [[user_id, rank, exp_earned], ...],
+         "joined": [[user_id, username], ...],
+         "removed": [user_id, ...]}
+
+    seq increases by one per message, so a client that sees a gap asks for a resync.
+    Returns the message, or None when nothing changed.
+    """
+    rows = _ranked_rows(league_group_id)
+    previous = cache.get(_state_key(league_group_id)) or {}
+    state = {user_id: (rank, exp_earned) for user_id, _, rank, exp_earned in rows}
+
+    changes = [
+        [user_id, rank, exp_earned]
+        for user_id, _, rank, exp_earned in rows
+        if previous.get(user_id) != (rank, exp_earned)
+    ]
+    joined = [[user_id, username] for user_id, username, _, _ in rows if user_id not in previous]
+    removed = [user_id for user_id in previous if user_id not in state]
+    if not changes and not removed:
+        return None
+
+    message = {
+        "type": "leaderboard.delta",
+        "seq": _next_seq(league_group_id),
+        "changes": changes,
+        "joined": joined,
+        "removed": removed,
+    }
+    cache.set(_state_key(league_group_id), state, BROADCAST_STATE_TIMEOUT)
+    async_to_sync(get_channel_layer().group_send)(group_channel_name(league_group_id), message)
+    logger.debug(f"[broadcast] group {league_group_id} seq={message['seq']} changes={len(changes)}")
+    return message
+
+
+def group_snapshot_message(league_group_id):
+    """
+    The full board for a (re)connecting client. seq is read before the rows, so any delta
+    published meanwhile carries a higher seq and is safe to apply on top.
+    """
+    seq = current_seq(league_group_id)
+    return {
+        "type": "leaderboard.snapshot",
+        "seq": seq,
+        "rows": [list(row) for row in _ranked_rows(league_group_id)],
+    }
+
+
+def broadcast_interval():
+    return getattr(settings, "LEADERBOARD_BROADCAST_INTERVAL", BROADCAST_INTERVAL)
+
+
+def mark_group_dirty(league_group_id):
+    """
+    Asks for a broadcast of the group within broadcast_interval() seconds.
+
+    The dirty marks live in the shared cache, so all processes coalesce together: the
+    first mark of a window schedules the emit task, every other mark until it runs is
+    suppressed. A group therefore gets at most one broadcast per interval.
+    """
+    if not cache.add(_dirty_key(league_group_id), 1, BROADCAST_MARK_TIMEOUT):
+        broadcasts_suppressed.inc()
+        return
+    try:
+        emit_group_broadcast_task.apply_async((league_group_id,), countdown=broadcast_interval())
+    except Exception as e:
+        # A broker hiccup must not fail the XP write that triggered us; the next mark retries.
+        cache.delete(_dirty_key(league_group_id))
+        logger.error(f"[broadcast] could not schedule group {league_group_id}: {e}")
+
+
+@shared_task
+def emit_group_broadcast_task(league_group_id):
+    emit_group_broadcast(league_group_id)
+
+
+def emit_group_broadcast(league_group_id):
+    # Clearing the mark first means a change landing while we publish schedules the next window.
+    cache.delete(_dirty_key(league_group_id))
+    if not cache.add(_emit_lock_key(league_group_id), 1, BROADCAST_MARK_TIMEOUT):
+        # Another worker is still publishing this group; keep seq order by going next.
+        mark_group_dirty(league_group_id)
+        return None
+    try:
+        message = publish_group_delta(league_group_id)
+    finally:
+        cache.delete(_emit_lock_key(league_group_id))
+    if message is not None:
+        broadcasts_emitted.inc()
+    return message
@@ -0,0 +1,60 @@
+# leaderboards/consumers.py
+
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.generic.websocket import JsonWebsocketConsumer
+
+from .broadcast import group_channel_name, group_snapshot_message
+from .league_service import get_previous_monday_0001_utc
+from .models import UserLeaguePlacement
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderboardConsumer(JsonWebsocketConsumer):
+    """
+    Streams the caller's LeagueGroup: one snapshot on connect, then delta messages.
+    Clients send {"action": "resync"} when they detect a gap in seq.
+    """
+
+    def connect(self):
+        user = self.scope.get("user")
+        if user is None or not user.is_authenticated:
+            self.close()
+            return
+
+        self.league_group_id = (
+            UserLeaguePlacement.objects
+            .filter(user=user, league_group__week_start=get_previous_monday_0001_utc().date())
+            .values_list("league_group_id", flat=True)
+            .first()
+        )
+        if self.league_group_id is None:
+            self.close()
+            return
+
+        async_to_sync(self.channel_layer.group_add)(
+            group_channel_name(self.league_group_id), self.channel_name
+        )
+        self.accept()
+        self.send_json(self._client_message(group_snapshot_message(self.league_group_id)))
+
+    def disconnect(self, code):
+        if getattr(self, "league_group_id", None) is not None:
+            async_to_sync(self.channel_layer.group_discard)(
+                group_channel_name(self.league_group_id), self.channel_name
+            )
+
+    def receive_json(self, content, **kwargs):
+        if content.get("action") == "resync":
+            self.send_json(self._client_message(group_snapshot_message(self.league_group_id)))
+
+    def leaderboard_delta(self, event):
+        self.send_json(self._client_message(event))
+
+    @staticmethod
+    def _client_message(event):
+        message = dict(event)
+        message["type"] = message["type"].split(".", 1)[1]  # "leaderboard.delta" -> "delta"
+        return message
@@ -0,0 +1,128 @@
+# leaderboards/instrumentation.py
+
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.db import connections
+
+from .metrics import REGISTRY
+
+QUERY_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+request_latency = REGISTRY.histogram(
+    "leaderboards_request_seconds", "Total time spent handling a request, rendering included.", labelnames=("endpoint",)
+)
+request_queries = REGISTRY.histogram(
+    "leaderboards_request_queries", "Database queries issued per request.", labelnames=("endpoint",), buckets=QUERY_BUCKETS
+)
+request_db_time = REGISTRY.histogram(
+    "leaderboards_request_db_seconds", "Time spent waiting on the database per request.", labelnames=("endpoint",)
+)
+span_latency = REGISTRY.histogram(
+    "leaderboards_span_seconds", "Time spent in a named section of a request.", labelnames=("endpoint", "span")
+)
+
+_current = ContextVar("leaderboards_request_profile", default=None)
+
+
+class RequestProfile:
+    """
+    What one request cost: queries and the time spent in them, named spans, and total
+    latency. Also the execute_wrapper that counts the queries.
+    """
+
+    def __init__(self):
+        self.endpoint = None
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.spans = {}  # name -> seconds, summed over every entry into the span
+        self.total_seconds = None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_seconds += time.perf_counter() - started
+            self.queries += 1
+
+    def __repr__(self):
+        return (
+            f"<RequestProfile {self.endpoint} {self.queries} queries, db {self.db_seconds:.4f}s, "
+            f"total {self.total_seconds}s>"
+        )
+
+
+def current_profile():
+    """The profile of the request being handled, or None outside an instrumented request."""
+    return _current.get()
+
+
+@contextmanager
+def span(name):
+    """Times a section of the current request; does nothing outside one."""
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.spans[name] = profile.spans.get(name, 0.0) + time.perf_counter() - started
+
+
+class InstrumentedViewMixin:
+    """
+    For DRF views: renders the response inside a "serialize" span instead of after the
+    view returns, so serialization is timed on its own. Rendering twice is a no-op.
+    """
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if _current.get() is not None and callable(getattr(response, "render", None)):
+            with span("serialize"):
+                response.render()
+        return response
+
+
+class RequestInstrumentationMiddleware:
+    """
+    Profiles every request into the leaderboards_request_* and leaderboards_span_*
+    histograms, labelled with the URL name of the view ("unmatched" when none resolved).
+    The profile is also left on the response as response.request_profile, for tests.
+
+    Enable it with "leaderboards.instrumentation.RequestInstrumentationMiddleware" in
+    MIDDLEWARE, as early as possible so the other middleware is counted too.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profile = RequestProfile()
+        token = _current.set(profile)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        profile.total_seconds = time.perf_counter() - started
+
+        match = getattr(request, "resolver_match", None)
+        profile.endpoint = (match.view_name if match else "") or "unmatched"
+        record(profile)
+        response.request_profile = profile
+        return response
+
+
+def record(profile):
+    request_latency.labels(endpoint=profile.endpoint).observe(profile.total_seconds)
+    request_queries.labels(endpoint=profile.endpoint).observe(profile.queries)
+    request_db_time.labels(endpoint=profile.endpoint).observe(profile.db_seconds)
+    for name, seconds in profile.spans.items():
+        span_latency.labels(endpoint=profile.endpoint, span=name).observe(seconds)
@@ -0,0 +1,97 @@
+# leaderboards/leaderboard_cache.py
+
+import logging
+import time
+import uuid
+
+from django.core.cache import cache
+
+from .leaderboard_rows import group_rows
+from .models import LeaderboardRow
+from .serializers import LEADERBOARD_ROW_COLUMNS, leaderboard_row_dicts
+
+logger = logging.getLogger(__name__)
+
+# Safety net only: snapshots are dropped as soon as a member's placement changes.
+SNAPSHOT_TIMEOUT = 60 * 10
+# A lost version only costs clients one full response, so it may live for a whole cycle.
+GROUP_VERSION_TIMEOUT = 60 * 60 * 24 * 7
+
+
+def snapshot_key(league_group_id, version):
+    return f"leaderboards:snapshot:{league_group_id}:{version}"
+
+
+def group_version_key(league_group_id):
+    return f"leaderboards:group_version:{league_group_id}"
+
+
+def get_group_snapshot(league_group, version=None):
+    """
+    Returns the ranked leaderboard of a LeagueGroup, shared by every member polling it.
+
+    The snapshot is a dict with "leaderboard" (serialized rows, rank included) and
+    "built_at" (a time.time() stamp, so readers can measure how stale it is).
+
+    Snapshots are cached under the group_version() they were built for (pass the one
+    already read, e.g. for an ETag, to stay consistent with it). A build that races an
+    invalidation therefore lands under a version nobody reads again, instead of being
+    served as current until it expires.
+    """
+    if version is None:
+        version = group_version(league_group.id)
+    key = snapshot_key(league_group.id, version)
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = build_group_snapshot(league_group)
+        cache.set(key, snapshot, SNAPSHOT_TIMEOUT)
+        logger.debug(f"[leaderboard_cache] built snapshot for group {league_group.id}")
+    return snapshot
+
+
+def build_group_snapshot(league_group):
+    # One range scan over (league_group, rank). A group without rows yet (created before
+    # the read model, or not rebuilt) is ranked from its placements without writing.
+    rows = list(
+        LeaderboardRow.objects
+        .filter(league_group=league_group)
+        .order_by("rank")
+        .values_list(*LEADERBOARD_ROW_COLUMNS)
+    )
+    if not rows:
+        rows = [
+            tuple(getattr(row, column) for column in LEADERBOARD_ROW_COLUMNS)
+            for row in group_rows(league_group.id)
+        ]
+    leaderboard = leaderboard_row_dicts(rows)
+
+    return {
+        "league_group_id": league_group.id,
+        "leaderboard": leaderboard,
+        "built_at": time.time(),
+    }
+
+
+def group_version(league_group_id):
+    """
+    An opaque token that changes whenever the group's board does: invalidation drops it
+    and a fresh one is drawn on the next read, which also retires the snapshot keyed by it.
+    """
+    key = group_version_key(league_group_id)
+    version = cache.get(key)
+    if version is None:
+        # add() so concurrent readers agree on one token.
+        fresh = uuid.uuid4().hex
+        cache.add(key, fresh, GROUP_VERSION_TIMEOUT)
+        version = cache.get(key) or fresh
+    return version
+
+
+def invalidate_group_snapshot(league_group_id):
+    # The orphaned snapshot is never read again and expires after SNAPSHOT_TIMEOUT.
+    cache.delete(group_version_key(league_group_id))
+
+
+def snapshot_age(snapshot):
+    """Seconds since the snapshot was built."""
+    return max(0.0, time.time() - snapshot["built_at"])
@@ -0,0 +1,235 @@
+# leaderboards/leaderboard_rows.py
+
+import logging
+from itertools import groupby
+from operator import itemgetter
+
+from django.db import transaction
+
+from .models import LeaderboardRow, LeagueGroup, UserLeaguePlacement
+from .ranking import BOARD_ORDER, ranked_group
+from accounts.models import CustomUser
+
+logger = logging.getLogger(__name__)
+
+ROWS_BATCH_SIZE = 2000
+
+
+def group_rows(league_group_id):
+    """
+    Builds (unsaved) LeaderboardRows for a group: members from its placements, ranks and
+    exp served by the ranking store. Returns [] for a group that no longer exists.
+    """
+    group = (
+        LeagueGroup.objects
+        .filter(pk=league_group_id)
+        .values_list("league__name", "week_start")
+        .first()
+    )
+    if group is None:
+        return []
+    return _ranked_rows(league_group_id, *group)
+
+
+def _ranked_rows(league_group_id, league_name, week_start):
+    members = {
+        user_id: (username, email, exp_earned)
+        for user_id, username, email, exp_earned in (
+            UserLeaguePlacement.objects
+            .filter(league_group_id=league_group_id)
+            .values_list("user_id", "user__username", "user__email", "exp_earned")
+        )
+    }
+    # exp_earned rides along on the scan the identities need anyway: the ranking without a
+    # shared store, otherwise only read to load a group the store does not hold yet.
+    ranked = ranked_group(league_group_id, lambda: {user_id: m[2] for user_id, m in members.items()}, members)
+    return [
+        LeaderboardRow(
+            league_group_id=league_group_id,
+            rank=rank,
+            user_id=user_id,
+            username=members[user_id][0],
+            email=members[user_id][1],
+            exp_earned=exp_earned,
+            league_name=league_name,
+            week_start=week_start,
+        )
+        for rank, (user_id, exp_earned) in enumerate(ranked, start=1)
+    ]
+
+
+def refresh_group_rows(league_group_id):
+    """
+    Brings the stored rows of one group (at most LEAGUE_CAPACITY of them) in line with its
+    board. The LeagueGroup row is locked first, so refreshes of one group queue up instead
+    of colliding on (league_group, rank); then only the rank slots whose member or exp
+    changed are rewritten (deleted and inserted again, cheaper than a CASE per column).
+    """
+    with transaction.atomic():
+        group = (
+            LeagueGroup.objects
+            .select_for_update(of=("self",))
+            .filter(pk=league_group_id)
+            .values_list("league__name", "week_start")
+            .first()
+        )
+        if group is None:
+            return []
+        rows = _ranked_rows(league_group_id, *group)
+
+        stored = {
+            rank: (row_id, current)
+            for row_id, rank, *current in LeaderboardRow.objects.filter(league_group_id=league_group_id).values_list(
+                "id", "rank", "user_id", "username", "email", "exp_earned"
+            )
+        }
+        stale, written = [], []
+        for row in rows:
+            row_id, current = stored.pop(row.rank, (None, None))
+            if current != [row.user_id, row.username, row.email, row.exp_earned]:
+                written.append(row)
+                if row_id is not None:
+                    stale.append(row_id)
+        stale.extend(row_id for row_id, _ in stored.values())  # slots past the end of a group that shrank
+        if stale:
+            LeaderboardRow.objects.filter(pk__in=stale).delete()
+        if written:
+            LeaderboardRow.objects.bulk_create(written)
+    return rows
+
+
+def create_new_group_rows(groups, batch_size=ROWS_BATCH_SIZE):
+    """
+    Rows for groups the reset just filled: groups is [(LeagueGroup, league_name, [user_id, ...]), ...].
+    Everyone starts on 0 exp, so BOARD_ORDER is the tie order: lowest id first.
+    """
+    user_ids = [user_id for _, _, ids in groups for user_id in ids]
+    identities = {
+        user_id: (username, email)
+        for user_id, username, email in (
+            CustomUser.objects.filter(id__in=user_ids).values_list("id", "username", "email")
+        )
+    }
+    LeaderboardRow.objects.bulk_create(
+        [
+            LeaderboardRow(
+                league_group=group,
+                rank=rank,
+                user_id=user_id,
+                username=identities[user_id][0],
+                email=identities[user_id][1],
+                exp_earned=0,
+                league_name=league_name,
+                week_start=group.week_start,
+            )
+            for group, league_name, ids in groups
+            for rank, user_id in enumerate(sorted(ids), start=1)
+        ],
+        batch_size=batch_size,
+    )
+
+
+def rebuild_rows(week_start=None, batch_size=ROWS_BATCH_SIZE):
+    """
+    Recreates the read model from the placements in one ordered pass, for every cycle
+    or only week_start. Returns the number of rows written.
+    """
+    placements = UserLeaguePlacement.objects.all()
+    stale = LeaderboardRow.objects.all()
+    if week_start is not None:
+        placements = placements.filter(league_group__week_start=week_start)
+        stale = stale.filter(week_start=week_start)
+
+    rows = (
+        placements
+        .order_by("league_group_id", *BOARD_ORDER)
+        .values_list(
+            "league_group_id",
+            "league_group__league__name",
+            "league_group__week_start",
+            "user_id",
+            "user__username",
+            "user__email",
+            "exp_earned",
+        )
+        .iterator(chunk_size=batch_size)
+    )
+
+    written = 0
+    pending = []
+    with transaction.atomic():
+        stale.delete()
+        for _, members in groupby(rows, key=itemgetter(0)):
+            for rank, (group_id, league_name, group_week, user_id, username, email, exp_earned) in enumerate(
+                members, start=1
+            ):
+                pending.append(
+                    LeaderboardRow(
+                        league_group_id=group_id,
+                        rank=rank,
+                        user_id=user_id,
+                        username=username,
+                        email=email,
+                        exp_earned=exp_earned,
+                        league_name=league_name,
+                        week_start=group_week,
+                    )
+                )
+            if len(pending) >= batch_size:
+                LeaderboardRow.objects.bulk_create(pending)
+                written += len(pending)
+                pending = []
+        LeaderboardRow.objects.bulk_create(pending)
+        written += len(pending)
+
+    logger.info(f"[leaderboard_rows] rebuilt {written} row(s).")
+    return written
+
+
+def check_rows(week_start=None):
+    """
+    Compares the read model with the normalized tables and returns a list of
+    (league_group_id, problem) pairs; empty when they agree.
+    """
+    placements = UserLeaguePlacement.objects.all()
+    rows = LeaderboardRow.objects.all()
+    if week_start is not None:
+        placements = placements.filter(league_group__week_start=week_start)
+        rows = rows.filter(week_start=week_start)
+
+    expected = {}
+    for group_id, league_name, group_week, user_id, username, email, exp_earned in placements.values_list(
+        "league_group_id",
+        "league_group__league__name",
+        "league_group__week_start",
+        "user_id",
+        "user__username",
+        "user__email",
+        "exp_earned",
+    ).iterator():
+        expected.setdefault(group_id, {})[user_id] = (username, email, exp_earned, league_name, group_week)
+
+    actual = {}
+    for row in rows.order_by("league_group_id", "rank").values_list(
+        "league_group_id", "rank", "user_id", "username", "email", "exp_earned", "league_name", "week_start"
+    ).iterator():
+        actual.setdefault(row[0], []).append(row[1:])
+
+    problems = []
+    for group_id in sorted(expected.keys() | actual.keys()):
+        members = expected.get(group_id, {})
+        stored = actual.get(group_id, [])
+        if {r[1] for r in stored} != members.keys() or len(stored) != len(members):
+            problems.append((group_id, f"{len(stored)} row(s) for {len(members)} member(s)"))
+            continue
+        if [r[0] for r in stored] != list(range(1, len(stored) + 1)):
+            problems.append((group_id, "ranks are not 1..n"))
+            continue
+        mismatched = [r[1] for r in stored if tuple(r[2:]) != members[r[1]]]
+        if mismatched:
+            problems.append((group_id, f"stale data for user(s) {mismatched}"))
+            continue
+        order = [(-r[4], r[1]) for r in stored]
+        if order != sorted(order):
+            problems.append((group_id, "rows are not in board order"))
+    return problems
@@ -0,0 +1,108 @@
+# leaderboards/league_catalog.py
+
+import hashlib
+import json
+import logging
+import threading
+import uuid
+
+from django.core.cache import cache
+
+from .models import League
+from .serializers import LeagueSerializer
+
+logger = logging.getLogger(__name__)
+
+CATALOG_VERSION_KEY = "leaderboards:league_catalog:version"
+
+_local = {"catalog": None}
+_lock = threading.Lock()
+
+
+class LeagueCatalog:
+    """
+    The League rows, loaded once per process and read without queries.
+
+    Acts as a mapping of name -> League (catalog["Gold"], "Gold" in catalog, len()),
+    ordered by League.order, with O(1) position and neighbour lookups. Instances are
+    never mutated: hold on to one for the length of an operation.
+    """
+
+    def __init__(self, leagues, version):
+        self.leagues = tuple(leagues)
+        self.version = version
+        self.names = tuple(league.name for league in self.leagues)
+        self._by_name = {league.name: league for league in self.leagues}
+        self._position = {name: position for position, name in enumerate(self.names)}
+        self.serialized = [dict(data) for data in LeagueSerializer(self.leagues, many=True).data]
+        # Derived from the content, so it is the same in every process and across restarts.
+        self.content_version = hashlib.sha1(json.dumps(self.serialized, sort_keys=True).encode()).hexdigest()[:12]
+
+    def __getitem__(self, name):
+        return self._by_name[name]
+
+    def __contains__(self, name):
+        return name in self._by_name
+
+    def __len__(self):
+        return len(self.leagues)
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def get(self, name, default=None):
+        return self._by_name.get(name, default)
+
+    def position(self, name):
+        """0 for the lowest league, len(catalog) - 1 for the highest. KeyError if unknown."""
+        return self._position[name]
+
+    @property
+    def lowest(self):
+        return self.leagues[0] if self.leagues else None
+
+    @property
+    def highest(self):
+        return self.leagues[-1] if self.leagues else None
+
+    def next_tier(self, name):
+        """The league above name; the highest league is its own next tier."""
+        position = self._position[name]
+        return self.names[min(position + 1, len(self.names) - 1)]
+
+    def previous_tier(self, name):
+        """The league below name; the lowest league is its own previous tier."""
+        position = self._position[name]
+        return self.names[max(position - 1, 0)]
+
+
+def _shared_version():
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        # add() so processes racing after an eviction agree on one token.
+        fresh = uuid.uuid4().hex
+        cache.add(CATALOG_VERSION_KEY, fresh, None)
+        version = cache.get(CATALOG_VERSION_KEY) or fresh
+    return version
+
+
+def get_league_catalog():
+    """
+    The current LeagueCatalog. Costs one cache read; the leagues are reloaded only when
+    another process (or this one) changed them since the last load.
+    """
+    version = _shared_version()
+    catalog = _local["catalog"]
+    if catalog is None or catalog.version != version:
+        with _lock:
+            catalog = _local["catalog"]
+            if catalog is None or catalog.version != version:
+                catalog = _local["catalog"] = LeagueCatalog(League.objects.order_by("order"), version)
+                logger.debug(f"[league_catalog] loaded {len(catalog)} league(s), version {version}")
+    return catalog
+
+
+def invalidate_league_catalog():
+    """Makes every process reload the leagues on its next get_league_catalog()."""
+    cache.set(CATALOG_VERSION_KEY, uuid.uuid4().hex, None)
+    _local["catalog"] = None
@@ -1,14 +1,29 @@
 # league_service.py
 
 import logging
-from django.db import transaction
-from django.db.models import Q
+from array import array
+from itertools import compress, islice
+from django.db import connection, transaction
+from django.db.models import F, Q
 from django.utils.timezone import now
-from datetime import datetime, timedelta, time, timezone
-
-from .models import League, LeagueGroup, UserLeaguePlacement, UserWeeklyOutcome
+from datetime import date, datetime, timedelta, time, timezone
+
+from .models import (
+    LeagueGroup,
+    LeagueResetCheckpoint,
+    ResetPoolEntry,
+    ResetRun,
+    UserLeaguePlacement,
+    UserWeeklyOutcome,
+)
+from .broadcast import mark_group_dirty
+from .leaderboard_cache import invalidate_group_snapshot
+from .leaderboard_rows import create_new_group_rows, refresh_group_rows
+from .league_catalog import get_league_catalog
+from .ranking import BOARD_ORDER, get_ranking_store
+from .reset_telemetry import ResetRecorder, record_count, record_plan, recorded_atomic, recording, reset_phase
 from accounts.models import CustomUser
-from celery import shared_task
+from celery import chord, shared_task
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
@@ -16,6 +31,9 @@ logger.setLevel(logging.DEBUG)
 LEAGUE_CAPACITY = 30
 PROMOTED_COUNT = 7
 DEMOTED_COUNT = 7
+RESET_BATCH_SIZE = 500  # rows per UPDATE ... IN (...) / bulk insert during a reset
+RESET_SHARD_GROUPS = 200  # old groups committed per checkpoint by a reset shard
+SEAT_RESERVE_ATTEMPTS = 5  # open groups tried before a contended placement opens a new one
 
 LEAGUES_ORDER = [
     "Bronze",
@@ -36,17 +54,23 @@ EXP_TO_REJOIN = 40
 
 @shared_task
 def reset_leagues_task():
-    try:
-        reset_leagues()
-    except Exception as e:
-        logger.error(f"[reset_leagues_task] League reset failed: {e}")
+    # Failures are recorded on the ResetRun and re-raised, so Celery marks the task failed.
+    start_sharded_reset()
+
+
+@shared_task
+def reset_league_shard_task(league_name, old_week_start, run_id=None):
+    return reset_league_shard(league_name, date.fromisoformat(old_week_start), run_id)
+
+
+@shared_task
+def finish_sharded_reset_task(shard_results, old_week_start, run_id=None):
+    return finish_sharded_reset(shard_results, date.fromisoformat(old_week_start), run_id)
 
 
 def get_league_map():
-    league_map = {}
-    for league in League.objects.all():
-        league_map[league.name] = league
-    return league_map
+    """The process-local LeagueCatalog: a mapping of name -> League, without a query."""
+    return get_league_catalog()
 
 
 def get_previous_monday_0001_utc(ref_dt=None):
@@ -82,7 +106,7 @@ def place_new_user_in_bronze(user):
         logger.info(f"User '{user.username}' locked out (needs {user.exp_to_enter}).")
         return
 
-    bronze_league = League.objects.filter(name=LEAGUES_ORDER[0]).first()
+    bronze_league = get_league_catalog().get(LEAGUES_ORDER[0])
     if not bronze_league:
         logger.warning("No Bronze league found!")
         return
@@ -94,179 +118,779 @@ def place_new_user_in_bronze(user):
     if dt_utc < monday_0001:
         base_monday -= timedelta(days=7)
 
-    existing_groups = LeagueGroup.objects.filter(
-        league=bronze_league, week_start=base_monday
-    ).order_by("id")
-
-    for group in existing_groups:
-        if group.placements.count() < LEAGUE_CAPACITY:
-            _place_user_in_group(user, group, LEAGUES_ORDER[0])
-            return
-
-    # Create a new Bronze group if none have space
-    new_group = LeagueGroup.objects.create(
-        league=bronze_league, week_start=base_monday
+    league_group_id = reserve_group_seat(bronze_league, base_monday)
+    _place_user_in_group(user, league_group_id, LEAGUES_ORDER[0])
+
+
+def reserve_group_seat(league, week_start):
+    """
+    Claims a seat in the oldest group of league/week_start that has room, or in a new
+    group when all are full, and returns the group id.
+
+    The claim is a conditional UPDATE (member_count < LEAGUE_CAPACITY), so two callers
+    racing for the last seat cannot both get it: the loser sees 0 rows and tries the next
+    group. Call it inside the transaction that creates the placement, so a failed
+    placement gives the seat back.
+    """
+    open_groups = (
+        LeagueGroup.objects
+        .filter(league=league, week_start=week_start, member_count__lt=LEAGUE_CAPACITY)
+        .order_by("id")
+        .values_list("id", flat=True)
     )
-    _place_user_in_group(user, new_group, LEAGUES_ORDER[0])
-
-
-def _place_user_in_group(user, league_group, league_name):
+    for _ in range(SEAT_RESERVE_ATTEMPTS):
+        league_group_id = open_groups.first()
+        if league_group_id is None:
+            break
+        claimed = LeagueGroup.objects.filter(
+            pk=league_group_id, member_count__lt=LEAGUE_CAPACITY
+        ).update(member_count=F("member_count") + 1)
+        if claimed:
+            return league_group_id
+    return LeagueGroup.objects.create(league=league, week_start=week_start, member_count=1).id
+
+
+def _place_user_in_group(user, league_group_id, league_name):
     user.exp_this_league = 0
     user.current_league = league_name
     if user.exp_to_enter >= EXP_TO_REJOIN:
         user.exp_to_enter = 0
     user.save()
 
-    UserLeaguePlacement.objects.create(user=user, league_group=league_group, exp_earned=0)
-    logger.debug(f"Placed {user.username} in group {league_group.id}, league {league_name}")
+    UserLeaguePlacement.objects.create(user=user, league_group_id=league_group_id, exp_earned=0)
+    logger.debug(f"Placed {user.username} in group {league_group_id}, league {league_name}")
+
+
+def staged_for_reset(week_start):
+    """
+    ResetPoolEntry rows of users a sharded reset took out of their old group and has not
+    placed in a new one yet: staged for week_start, or for any cycle whose tiers are still
+    resetting. They have no placement in the meantime but must not be sent to Bronze.
+    """
+    resetting = LeagueResetCheckpoint.objects.exclude(status=LeagueResetCheckpoint.DONE).values("week_start")
+    return ResetPoolEntry.objects.filter(Q(week_start=week_start) | Q(week_start__in=resetting))
+
+
+@shared_task
+def place_user_in_bronze_task(user_id):
+    week_start = get_previous_monday_0001_utc().date()
+    with transaction.atomic():
+        # The view enqueues this on every poll until the placement shows up. Locking the
+        # user first makes duplicate tasks run one at a time, so only the first one places.
+        user = CustomUser.objects.select_for_update().filter(pk=user_id).first()
+        if user is None:
+            return
+        if UserLeaguePlacement.objects.filter(user=user, league_group__week_start=week_start).exists():
+            return
+        if staged_for_reset(week_start).filter(user=user).exists():
+            logger.info(f"User '{user.username}' is staged by the weekly reset, not placing.")
+            return
+        place_new_user_in_bronze(user)
+
+
+@shared_task
+def place_users_in_bronze_task(user_ids):
+    place_users_in_bronze(CustomUser.objects.filter(pk__in=user_ids).order_by("id"))
 
 
 @transaction.atomic
+def place_users_in_bronze(users, batch_size=RESET_BATCH_SIZE):
+    """
+    Bulk version of place_new_user_in_bronze() for onboarding waves: same eligibility,
+    same layout (open groups topped up oldest first, then new groups of LEAGUE_CAPACITY
+    in the given order), but written with bulk statements. Users already placed this
+    cycle, or staged by a sharded reset, are skipped. Returns {user_id: league_group_id}
+    for the users placed.
+    """
+    bronze_league = get_league_catalog().get(LEAGUES_ORDER[0])
+    if not bronze_league:
+        logger.warning("No Bronze league found!")
+        return {}
+    week_start = get_previous_monday_0001_utc().date()
+
+    candidates = {}
+    for user in users:
+        if user.exp_to_enter >= EXP_TO_REJOIN:
+            logger.info(f"User '{user.username}' locked out (needs {user.exp_to_enter}).")
+            continue
+        candidates.setdefault(user.pk, user)
+    for ids in batched(list(candidates), batch_size):
+        for user_id in UserLeaguePlacement.objects.filter(
+            user_id__in=ids, league_group__week_start=week_start
+        ).values_list("user_id", flat=True):
+            candidates.pop(user_id, None)  # a user can hold two placements in a week
+        for user_id in staged_for_reset(week_start).filter(user_id__in=ids).values_list("user_id", flat=True):
+            candidates.pop(user_id, None)
+    if not candidates:
+        return {}
+
+    for ids in batched(list(candidates), batch_size):
+        CustomUser.objects.filter(id__in=ids).update(current_league=LEAGUES_ORDER[0], exp_this_league=0)
+    for user in candidates.values():
+        user.current_league = LEAGUES_ORDER[0]
+        user.exp_this_league = 0
+
+    placed = fill_league_groups(bronze_league, week_start, list(candidates), batch_size)
+    logger.info(f"[place_users_in_bronze] placed {len(placed)} user(s).")
+    return placed
+
+
+def fill_league_groups(league, week_start, user_ids, batch_size=RESET_BATCH_SIZE):
+    """
+    Places user_ids (in order) into league/week_start: seats left in open groups first,
+    oldest group first, then new groups. The open groups are locked until commit, so
+    reserve_group_seat() callers wait instead of claiming the same seats.
+    """
+    placed = {}
+    pending = iter(user_ids)
+    open_groups = (
+        LeagueGroup.objects
+        .select_for_update()
+        .filter(league=league, week_start=week_start, member_count__lt=LEAGUE_CAPACITY)
+        .order_by("id")
+    )
+    topped_up = []
+    for group in open_groups:
+        taken = list(islice(pending, LEAGUE_CAPACITY - group.member_count))
+        if not taken:
+            break
+        LeagueGroup.objects.filter(pk=group.pk).update(member_count=F("member_count") + len(taken))
+        placed.update((user_id, group.id) for user_id in taken)
+        topped_up.append((group.id, taken))
+
+    new_groups = [(league.name, ids) for ids in batched(pending, LEAGUE_CAPACITY)]
+    created = []
+    for group_batch in batched(new_groups, max(1, batch_size // LEAGUE_CAPACITY)):
+        groups = _bulk_create_groups(
+            [LeagueGroup(league=league, week_start=week_start, member_count=len(ids)) for _, ids in group_batch]
+        )
+        for group, (name, ids) in zip(groups, group_batch):
+            placed.update((user_id, group.id) for user_id in ids)
+            created.append((group, name, ids))
+
+    for placement_batch in batched(placed.items(), batch_size):
+        UserLeaguePlacement.objects.bulk_create(
+            [
+                UserLeaguePlacement(user_id=user_id, league_group_id=league_group_id, exp_earned=0)
+                for user_id, league_group_id in placement_batch
+            ]
+        )
+    for group_batch in batched(created, max(1, batch_size // LEAGUE_CAPACITY)):
+        create_new_group_rows(group_batch, batch_size=batch_size)
+    store = get_ranking_store()
+    for league_group_id, taken in topped_up:
+        # bulk_create skips post_save, so bring the boards people may be watching along.
+        if store.has_group(league_group_id):
+            for user_id in taken:
+                store.set_score(league_group_id, user_id, 0)
+        refresh_group_rows(league_group_id)
+        transaction.on_commit(lambda gid=league_group_id: _group_members_changed(gid))
+    return placed
+
+
+def _group_members_changed(league_group_id):
+    invalidate_group_snapshot(league_group_id)
+    mark_group_dirty(league_group_id)
+
+
+def add_league_exp(user, amount):
+    """
+    The single entry point for league XP: bumps CustomUser.exp_this_league and the user's
+    placement for the current cycle together, with F() so concurrent awards never lose
+    an increment. The passed-in user instance is not refreshed.
+    """
+    week_start = get_previous_monday_0001_utc().date()
+    with transaction.atomic():
+        CustomUser.objects.filter(pk=user.pk).update(
+            exp_this_league=F("exp_this_league") + amount
+        )
+        placement = (
+            UserLeaguePlacement.objects
+            .filter(user=user, league_group__week_start=week_start)
+            .values_list("id", "league_group_id")
+            .first()
+        )
+        if placement is None:
+            return
+        placement_id, league_group_id = placement
+        UserLeaguePlacement.objects.filter(pk=placement_id).update(
+            exp_earned=F("exp_earned") + amount
+        )
+        transaction.on_commit(lambda: league_exp_changed(league_group_id, user.pk, amount))
+
+
+def league_exp_changed(league_group_id, user_id, amount):
+    # Queryset updates skip post_save, so refresh the derived views here.
+    store = get_ranking_store()
+    if store.has_group(league_group_id):
+        store.incr(league_group_id, user_id, amount)
+    league_group_changed(league_group_id)
+
+
+def league_group_changed(league_group_id):
+    """Brings the read model, the snapshot and the live clients in line with a group's scores."""
+    refresh_group_rows(league_group_id)
+    invalidate_group_snapshot(league_group_id)
+    mark_group_dirty(league_group_id)
+
+
 def reset_leagues():
-    """1) Update locked-out users. 2) Process old cycle groups. 3) Reassign promotions/demotions."""
+    """
+    1) Update locked-out users. 2) Process old cycle groups. 3) Reassign promotions/demotions.
+    The reset is one transaction; the ResetRun recording it is written outside of it, so
+    a failure that rolls the reset back is still recorded, with none of the rolled-back
+    counts, then re-raised.
+    """
     league_map = get_league_map()
     if not league_map:
         logger.warning("No leagues in DB, aborting.")
         return
 
-    # Step 1: handle locked-out users
-    locked_out_users = CustomUser.objects.filter(current_league="")
-    logger.info(f"[reset_leagues] {locked_out_users.count()} locked-out user(s).")
-
-    for user in locked_out_users:
-        if user.exp_to_enter >= EXP_TO_REJOIN:
-            place_new_user_in_bronze(user)
-        else:
-            # Remain locked out, reset exp_to_enter
-            user.exp_to_enter = 0
-            user.save()
-
-    # Step 2: process old groups
     ref_dt = now()
     old_monday = get_previous_monday_0001_utc(ref_dt)
     new_monday = old_monday + timedelta(days=7)
 
+    recorder = ResetRecorder(ResetRun.objects.create(week_start=old_monday.date(), mode=ResetRun.SINGLE).pk)
+    try:
+        with recording(recorder), recorded_atomic():
+            status = _reset_cycle(old_monday, new_monday, league_map)
+    except Exception as e:
+        recorder.fail(e)
+        raise
+    recorder.flush(status)
+
+
+def _reset_cycle(old_monday, new_monday, league_map):
+    # Step 1: handle locked-out users
+    with reset_phase("locked_out"):
+        update_locked_out_users()
+
+    # Step 2: process old groups
     old_groups = LeagueGroup.objects.filter(week_start=old_monday.date())
     if not old_groups.exists():
         logger.warning("No groups for old cycle, aborting.")
-        return
+        return ResetRun.SKIPPED
 
     logger.info(f"[reset_leagues] old_cycle={old_monday}, new_cycle={new_monday}")
 
-    for group in old_groups:
-        old_league = group.league
-        old_name = old_league.name
+    with reset_phase("plan"):
+        plan = build_reset_plan(old_groups, league_map)
+    apply_reset_plan(plan, new_monday, league_map)
 
-        # Exclude locked-out users
-        placements = list(
-            UserLeaguePlacement.objects.filter(league_group=group)
-            .select_related("user")
-            .exclude(user__current_league="")
-        )
-        if not placements:
-            logger.info(f"Group {group.id} has no non-locked users.")
-            continue
+    logger.info("Deleting old league groups.")
+    with reset_phase("delete"):
+        group_ids = list(old_groups.values_list("id", flat=True))
+        drop_rankings_on_commit(group_ids)
+        rows_deleted, _ = old_groups.delete()
+    record_count("groups_processed", len(group_ids))
+    record_count("rows_deleted", rows_deleted)
+    logger.info("League reset completed.")
+    return ResetRun.DONE
 
-        placements.sort(key=lambda p: p.exp_earned, reverse=True)
-        size = len(placements)
-        logger.info(f"Processing group {group.id} ({old_name}), size={size}")
-
-        if size < 7:
-            top_list = placements[:]
-            middle_list = []
-            bottom_list = []
-        elif size < 24:
-            top_list = placements[:7]
-            middle_list = placements[7:]
-            bottom_list = []
-        else:
-            top_list = placements[:7]
-            middle_list = placements[7 : size - 7]
-            bottom_list = placements[size - 7 :]
-
-        # Obsidian gem reward
-        if old_name == "Obsidian":
-            for p in top_list:
-                p.user.gems_count += DIAMOND_GEM_REWARD
-                p.user.save()
-
-        old_index = LEAGUES_ORDER.index(old_name)
-        promoted_league_name = (
-            LEAGUES_ORDER[old_index + 1]
-            if old_index < len(LEAGUES_ORDER) - 1
-            else old_name
+
+def update_locked_out_users():
+    locked_out_users = CustomUser.objects.filter(current_league="")
+    locked_out_count = locked_out_users.count()
+    record_count("locked_out_users", locked_out_count)
+    logger.info(f"[reset_leagues] {locked_out_count} locked-out user(s).")
+
+    # place_new_user_in_bronze() turns away anyone at or above EXP_TO_REJOIN, so only the
+    # users below the threshold are written: they remain locked out with exp_to_enter reset.
+    locked_out_users.filter(exp_to_enter__lt=EXP_TO_REJOIN).update(exp_to_enter=0)
+
+
+def start_sharded_reset():
+    """
+    Runs the weekly reset as one Celery subtask per tier (a chord over LEAGUES_ORDER),
+    whose body forms the new groups once every tier has staged its users.
+    Calling it again after a failure only re-dispatches the tiers that have not finished.
+    """
+    if not get_league_map():
+        logger.warning("No leagues in DB, aborting.")
+        return
+
+    old_week_start = get_previous_monday_0001_utc(now()).date()
+    # Every attempt gets its own ResetRun; a resumed one only counts the tiers it processes.
+    recorder = ResetRecorder(ResetRun.objects.create(week_start=old_week_start, mode=ResetRun.SHARDED).pk)
+    try:
+        with recording(recorder), recorded_atomic(), reset_phase("locked_out"):
+            update_locked_out_users()
+
+        if not (
+            LeagueGroup.objects.filter(week_start=old_week_start).exists()
+            or ResetPoolEntry.objects.filter(week_start=old_week_start).exists()
+        ):
+            logger.warning("No groups for old cycle, aborting.")
+            recorder.flush(ResetRun.SKIPPED)
+            return
+
+        pending = []
+        for league_name in LEAGUES_ORDER:
+            checkpoint, _ = LeagueResetCheckpoint.objects.get_or_create(
+                week_start=old_week_start, league_name=league_name
+            )
+            if checkpoint.status != LeagueResetCheckpoint.DONE:
+                pending.append(league_name)
+
+        logger.info(f"[reset_leagues] sharding reset of {old_week_start} over {pending}")
+        recorder.flush()
+        if not pending:
+            # Every tier finished before the groups were formed; only that is left to do.
+            return finish_sharded_reset_task.delay([], old_week_start.isoformat(), recorder.run_id)
+        return chord(
+            reset_league_shard_task.s(league_name, old_week_start.isoformat(), recorder.run_id)
+            for league_name in pending
+        )(finish_sharded_reset_task.s(old_week_start.isoformat(), recorder.run_id))
+    except Exception as e:
+        recorder.fail(e)
+        raise
+
+
+def reset_league_shard(league_name, old_week_start, run_id=None):
+    """
+    Resets every old-cycle group of one tier, RESET_SHARD_GROUPS at a time.
+    Each slice is planned, applied, deleted and checkpointed in a single transaction,
+    so a crash loses at most the slice in flight. Users are staged for the league they
+    move into rather than grouped; finish_sharded_reset() forms the groups. With a
+    run_id, what the shard did is added to that ResetRun.
+    """
+    checkpoint = LeagueResetCheckpoint.objects.get(week_start=old_week_start, league_name=league_name)
+    if checkpoint.status == LeagueResetCheckpoint.DONE:
+        return {"groups_done": checkpoint.groups_done, "users_done": checkpoint.users_done}
+
+    league_map = get_league_map()
+    new_monday = datetime.combine(old_week_start, time(0, 1), tzinfo=timezone.utc) + timedelta(days=7)
+    LeagueResetCheckpoint.objects.filter(pk=checkpoint.pk).update(
+        status=LeagueResetCheckpoint.RUNNING, error=""
+    )
+
+    recorder = ResetRecorder(run_id) if run_id is not None else None
+    try:
+        with recording(recorder):
+            checkpoint = _reset_shard_slices(checkpoint, league_name, old_week_start, new_monday, league_map)
+    except Exception as e:
+        LeagueResetCheckpoint.objects.filter(pk=checkpoint.pk).update(
+            status=LeagueResetCheckpoint.FAILED, error=str(e)
         )
-        demoted_league_name = (
-            LEAGUES_ORDER[old_index - 1] if old_index > 0 else old_name
+        if recorder is not None:
+            recorder.fail(e)
+        raise
+    if recorder is not None:
+        recorder.flush()
+
+    checkpoint.status = LeagueResetCheckpoint.DONE
+    checkpoint.save()
+    logger.info(f"[reset_leagues] {league_name} shard done, {checkpoint.groups_done} group(s).")
+    return {"groups_done": checkpoint.groups_done, "users_done": checkpoint.users_done}
+
+
+def _reset_shard_slices(checkpoint, league_name, old_week_start, new_monday, league_map):
+    """Applies the tier's remaining groups slice by slice; returns the last checkpoint."""
+    while True:
+        with recorded_atomic():
+            # A second worker picking up the same tier waits here instead of double-applying.
+            checkpoint = LeagueResetCheckpoint.objects.select_for_update().get(pk=checkpoint.pk)
+            group_ids = list(
+                LeagueGroup.objects.filter(
+                    week_start=old_week_start,
+                    league__name=league_name,
+                    id__gt=checkpoint.last_group_id,
+                )
+                .order_by("id")
+                .values_list("id", flat=True)[:RESET_SHARD_GROUPS]
+            )
+            if not group_ids:
+                return checkpoint
+
+            old_groups = LeagueGroup.objects.filter(id__in=group_ids)
+            with reset_phase("plan"):
+                plan = build_reset_plan(old_groups, league_map, staged_week_start=old_week_start)
+            apply_reset_plan(plan, new_monday, league_map)
+            with reset_phase("delete"):
+                drop_rankings_on_commit(group_ids)
+                rows_deleted, _ = old_groups.delete()
+            record_count("groups_processed", len(group_ids))
+            record_count("rows_deleted", rows_deleted)
+
+            checkpoint.last_group_id = group_ids[-1]
+            checkpoint.groups_done += len(group_ids)
+            checkpoint.users_done += len(plan.outcomes)
+            checkpoint.save()
+
+
+def finish_sharded_reset(shard_results, old_week_start, run_id=None):
+    """The chord body of a sharded reset: forms the staged groups, then closes the ResetRun."""
+    recorder = ResetRecorder(run_id) if run_id is not None else None
+    try:
+        with recording(recorder):
+            new_groups = form_staged_groups(old_week_start, get_league_map())
+    except Exception as e:
+        if recorder is not None:
+            recorder.fail(e)
+        raise
+    if recorder is not None:
+        recorder.flush(ResetRun.DONE)
+
+    groups_done = sum(result["groups_done"] for result in shard_results)
+    users_done = sum(result["users_done"] for result in shard_results)
+    logger.info(
+        f"[reset_leagues] sharded reset of {old_week_start} completed: "
+        f"{groups_done} group(s), {users_done} user(s), {new_groups} new group(s)."
+    )
+    return {"groups_done": groups_done, "users_done": users_done, "new_groups": new_groups}
+
+
+def form_staged_groups(old_week_start, league_map, batch_size=RESET_BATCH_SIZE):
+    """
+    Deals everyone the shards staged for a league into its new groups with a single
+    serpentine_split(), so the league's groups come out as in reset_leagues(): sizes
+    within one of each other, however many tiers fed it. One transaction per league,
+    which also removes its staged users, so running this again only forms what is left.
+    Returns the number of groups formed.
+    """
+    new_monday = old_week_start + timedelta(days=7)
+    formed = 0
+    for league_name in league_map.names:
+        with transaction.atomic():
+            # A second finisher for the same cycle waits here, then finds nothing staged.
+            list(
+                LeagueResetCheckpoint.objects.select_for_update()
+                .filter(week_start=old_week_start, league_name=league_name)
+                .values_list("id", flat=True)
+            )
+            staged = ResetPoolEntry.objects.filter(week_start=old_week_start, league_name=league_name)
+            ordered = array(
+                "q", staged.order_by(*BOARD_ORDER).values_list("user_id", flat=True).iterator(chunk_size=batch_size)
+            )
+            if not ordered:
+                continue
+            new_groups = [(league_name, user_ids) for user_ids in serpentine_split(ordered)]
+            with reset_phase("assignment"):
+                create_reset_groups(new_groups, new_monday, league_map, batch_size)
+                staged.delete()
+        record_count("new_groups", len(new_groups))
+        formed += len(new_groups)
+    logger.info(f"[reset_leagues] formed {formed} new group(s) from the staged users.")
+    return formed
+
+
+class ResetPlan:
+    """
+    Every promotion, demotion and lockout decided by a reset, held in memory.
+    Nothing is written until apply_reset_plan() is called.
+
+    Decisions are parallel columns with one entry per old placement, in ranking order:
+    user_ids[i] finished finished_rank[i] in tier old_tier[i] and moves to new_tier[i]
+    (positions in tiers; LOCKED_OUT_TIER for nobody), with flags[i] a mask of GEM,
+    REJOIN and LOCKED_OUT. About 50 bytes per placement, pools and new groups included.
+    """
+
+    GEM = 1  # gems_count += DIAMOND_GEM_REWARD
+    REJOIN = 2  # exp_to_enter -> EXP_TO_REJOIN
+    LOCKED_OUT = 4  # current_league -> ""
+    LOCKED_OUT_TIER = -1
+
+    def __init__(self, tiers):
+        self.tiers = tuple(tiers)  # league names, lowest first
+        self.user_ids = array("q")
+        self.exp_earned = array("q")
+        self.finished_rank = array("l")
+        self.old_tier = array("b")
+        self.new_tier = array("b")
+        self.flags = array("B")
+        self.pools = []  # per tier, the indices of the rows moving into it
+        self.new_groups = []  # (league_name, user ids), one entry per new LeagueGroup
+        self.staged_week_start = None  # set when the pools are staged instead of grouped
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    def rows(self):
+        """(user_id, finished_rank, old_league, new_league, flags) per placement."""
+        names = self.tiers + ("",)  # LOCKED_OUT_TIER indexes the trailing ""
+        for user_id, finished_rank, old_tier, new_tier, flags in zip(
+            self.user_ids, self.finished_rank, self.old_tier, self.new_tier, self.flags
+        ):
+            yield user_id, finished_rank, names[old_tier], names[new_tier], flags
+
+    @property
+    def outcomes(self):
+        """Read-only view of user_id -> (finished_rank, old_league, new_league)."""
+        return _PlanOutcomes(self)
+
+    def flagged_user_ids(self, flag):
+        return array("q", compress(self.user_ids, (flags & flag for flags in self.flags)))
+
+
+class _PlanOutcomes:
+    def __init__(self, plan):
+        self._plan = plan
+
+    def __len__(self):
+        return len(self._plan)
+
+    def __iter__(self):
+        return iter(self._plan.user_ids)
+
+    def items(self):
+        for user_id, finished_rank, old_league, new_league, _ in self._plan.rows():
+            yield user_id, (finished_rank, old_league, new_league)
+
+    def values(self):
+        for _, outcome in self.items():
+            yield outcome
+
+
+def build_reset_plan(old_groups, league_map, staged_week_start=None):
+    """
+    Ranks every old group in one ordered query and classifies its members.
+
+    Only (group, tier, user_id, exp_earned) is read, straight into compact columns; the
+    decisions are then made group by group with slice assignments and the new groups
+    formed per tier (see serpentine_groups), so no per-user Python objects are kept.
+
+    When staged_week_start (the cycle being closed) is given, as by the shards of a
+    sharded reset, the users are row-locked first and anyone already staged for that
+    cycle is skipped: another shard, or an earlier attempt, has written them. No groups
+    are formed then; apply_reset_plan() stages the pools and form_staged_groups() deals
+    them once every tier has been planned.
+    """
+    plan = ResetPlan(league_map.names)
+
+    # Exclude locked-out users
+    placements = UserLeaguePlacement.objects.filter(league_group__in=old_groups).exclude(
+        user__current_league=""
+    )
+    plan.staged_week_start = staged_week_start
+    if staged_week_start is not None:
+        list(
+            CustomUser.objects.select_for_update(of=("self",))
+            .filter(league_placements__league_group__in=old_groups)
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+        placements = placements.exclude(
+            user__in=ResetPoolEntry.objects.filter(week_start=staged_week_start).values("user_id")
         )
 
-        # Bronze removal if bottom or 0 XP
-        if old_name == LEAGUES_ORDER[0]:
-            for p in bottom_list:
-                p.user.exp_to_enter = EXP_TO_REJOIN
-                p.user.current_league = ""
-                p.user.save()
-            for p in placements:
-                if p.exp_earned == 0:
-                    p.user.exp_to_enter = EXP_TO_REJOIN
-                    p.user.current_league = ""
-                    p.user.save()
-
-        promoted_set = [p.user for p in top_list]
-        remain_set = [p.user for p in middle_list]
-        demoted_set = []
-
-        if old_name != LEAGUES_ORDER[0]:
-            demoted_set = [p.user for p in bottom_list]
-
-        # Weekly outcomes
-        for idx, p in enumerate(placements):
-            final_rank = idx + 1
-            user = p.user
-            if p in top_list:
-                new_l = promoted_league_name if old_index < len(LEAGUES_ORDER) - 1 else old_name
-            elif p in bottom_list:
-                new_l = "" if old_index == 0 else demoted_league_name
-            else:
-                new_l = old_name
-
-            UserWeeklyOutcome.objects.update_or_create(
-                user=user,
-                defaults={
-                    "finished_rank": final_rank,
-                    "old_league": old_name,
-                    "new_league": new_l,
-                },
+    rows = (
+        placements.order_by("league_group_id", *BOARD_ORDER)
+        .values_list("league_group_id", "league_group__league_id", "user_id", "exp_earned")
+        .iterator(chunk_size=RESET_BATCH_SIZE)
+    )
+    tier_of_league = {league.id: tier for tier, league in enumerate(league_map.leagues)}
+    group_starts, group_tiers = array("q"), array("b")
+    add_user, add_exp = plan.user_ids.append, plan.exp_earned.append
+    last_group_id = None
+    for group_id, league_id, user_id, exp_earned in rows:
+        if group_id != last_group_id:
+            group_starts.append(len(plan.user_ids))
+            group_tiers.append(tier_of_league[league_id])
+            last_group_id = group_id
+        add_user(user_id)
+        add_exp(exp_earned)
+    group_starts.append(len(plan.user_ids))
+
+    plan.pools = plan_groups(plan, group_starts, group_tiers)
+    logger.info(f"[reset_leagues] planned {len(group_tiers)} group(s), {len(plan)} placement(s).")
+    if staged_week_start is None:
+        for tier, pool in enumerate(plan.pools):
+            if pool:
+                plan.new_groups.extend((plan.tiers[tier], user_ids) for user_ids in _pool_groups(plan, pool))
+    return plan
+
+
+def plan_groups(plan, group_starts, group_tiers):
+    """
+    Fills the decision columns for the groups whose rows start at group_starts (already
+    ranked, highest exp first). Returns, per tier, the row indices moving into it.
+    """
+    size = len(plan.user_ids)
+    plan.finished_rank = array("l", [0]) * size
+    plan.old_tier = array("b", [0]) * size
+    plan.new_tier = array("b", [0]) * size
+    plan.flags = array("B", [0]) * size
+    if not size:
+        return []
+
+    # Runs of one value to slice-assign from, as long as the largest group.
+    longest = max(end - start for start, end in zip(group_starts, group_starts[1:]))
+    ranks = array("l", range(1, longest + 1))
+    tier_runs = {tier: array("b", [tier]) * longest for tier in range(ResetPlan.LOCKED_OUT_TIER, len(plan.tiers))}
+    flag_runs = {flag: array("B", [flag]) * longest for flag in (ResetPlan.GEM, ResetPlan.REJOIN | ResetPlan.LOCKED_OUT)}
+    highest = len(plan.tiers) - 1
+    pools = [array("q") for _ in plan.tiers]
+
+    for start, end, tier in zip(group_starts, group_starts[1:], group_tiers):
+        count = end - start
+        # Under 7 members everyone is promoted; the bottom 7 only drop from 24 members up.
+        top_end = start + min(count, PROMOTED_COUNT)
+        bottom_start = end - DEMOTED_COUNT if count >= 24 else end
+        promoted, demoted = min(tier + 1, highest), tier - 1  # -1 below Bronze: locked out
+
+        plan.finished_rank[start:end] = ranks[:count]
+        plan.old_tier[start:end] = tier_runs[tier][:count]
+        plan.new_tier[start:top_end] = tier_runs[promoted][:top_end - start]
+        plan.new_tier[top_end:bottom_start] = tier_runs[tier][:bottom_start - top_end]
+        plan.new_tier[bottom_start:end] = tier_runs[demoted][:end - bottom_start]
+        pools[promoted].extend(range(start, top_end))
+        pools[tier].extend(range(top_end, bottom_start))
+
+        if tier == highest:
+            plan.flags[start:top_end] = flag_runs[ResetPlan.GEM][:top_end - start]
+        if tier == 0:
+            # The bottom slice is locked out; anyone on 0 XP (a suffix, rows are ranked)
+            # must also earn EXP_TO_REJOIN again, though only the bottom slice leaves.
+            plan.flags[bottom_start:end] = flag_runs[ResetPlan.REJOIN | ResetPlan.LOCKED_OUT][:end - bottom_start]
+            zero = end
+            while zero > start and plan.exp_earned[zero - 1] == 0:
+                zero -= 1
+                plan.flags[zero] |= ResetPlan.REJOIN
+        else:
+            pools[demoted].extend(range(bottom_start, end))
+    return pools
+
+
+def _pool_groups(plan, pool):
+    """serpentine_groups() over the rows in pool, without building (user_id, exp) pairs."""
+    # BOARD_ORDER with two stable sorts: by user id, then by exp descending (reverse keeps ties in id order).
+    order = sorted(pool, key=plan.user_ids.__getitem__)
+    order.sort(key=plan.exp_earned.__getitem__, reverse=True)
+    return serpentine_split(array("q", map(plan.user_ids.__getitem__, order)))
+
+
+def serpentine_groups(members, capacity=LEAGUE_CAPACITY):
+    """
+    Splits [(user_id, exp_earned), ...] into ceil(len / capacity) groups whose sizes
+    differ by at most one. Members are dealt out by last cycle's exp_earned in a
+    snake order (1..n, n..1, ...), so every group gets a similar spread of strong and
+    weak players instead of the top finishers sharing one group. O(n log n) for the sort.
+    """
+    ordered = sorted(members, key=lambda member: (-member[1], member[0]))
+    return serpentine_split([user_id for user_id, _ in ordered], capacity)
+
+
+def serpentine_split(ordered, capacity=LEAGUE_CAPACITY):
+    """
+    The snake deal of serpentine_groups() over user ids already in order, with slices:
+    group g takes index g of every even round and index count - 1 - g of every odd one.
+    Groups have the type of ordered (a list or an array).
+    """
+    count = -(-len(ordered) // capacity)
+    step = 2 * count
+    groups = []
+    for position in range(count):
+        forward, backward = ordered[position::step], ordered[step - 1 - position::step]
+        # Even rounds come first, so a group never has more odd-round members than even.
+        group = ordered[:1] * (len(forward) + len(backward))
+        group[::2], group[1::2] = forward, backward
+        groups.append(group)
+    return groups
+
+
+def apply_reset_plan(plan, new_cycle_monday, league_map, batch_size=RESET_BATCH_SIZE):
+    """
+    Writes a ResetPlan with UPDATEs by id list and bulk inserts, batch_size rows at a time:
+    the users, their outcomes, then either the new groups or, for a plan with a
+    staged_week_start, the ResetPoolEntry rows they will be formed from.
+    """
+    record_plan(plan)
+    with reset_phase("assignment"):
+        for ids in batched(sorted(plan.flagged_user_ids(ResetPlan.REJOIN)), batch_size):
+            CustomUser.objects.filter(id__in=ids).update(exp_to_enter=EXP_TO_REJOIN)
+        for ids in batched(sorted(plan.flagged_user_ids(ResetPlan.LOCKED_OUT)), batch_size):
+            CustomUser.objects.filter(id__in=ids).update(current_league="")
+        for ids in batched(plan.flagged_user_ids(ResetPlan.GEM), batch_size):
+            CustomUser.objects.filter(id__in=ids).update(
+                gems_count=F("gems_count") + DIAMOND_GEM_REWARD
             )
 
-        assign_users_to_new_league(promoted_set, promoted_league_name, new_monday, league_map)
-        assign_users_to_new_league(remain_set, old_name, new_monday, league_map)
-        if old_name != LEAGUES_ORDER[0]:
-            assign_users_to_new_league(demoted_set, demoted_league_name, new_monday, league_map)
+        for league_name, pool in zip(plan.tiers, plan.pools):
+            for ids in batched(sorted(map(plan.user_ids.__getitem__, pool)), batch_size):
+                CustomUser.objects.filter(id__in=ids).update(
+                    current_league=league_name, exp_this_league=0
+                )
+
+    with reset_phase("outcomes"):
+        for outcome_batch in batched(plan.outcomes.items(), batch_size):
+            UserWeeklyOutcome.objects.bulk_create(
+                [
+                    UserWeeklyOutcome(
+                        user_id=user_id,
+                        finished_rank=finished_rank,
+                        old_league=old_league,
+                        new_league=new_league,
+                    )
+                    for user_id, (finished_rank, old_league, new_league) in outcome_batch
+                ],
+                update_conflicts=True,
+                unique_fields=["user"],
+                update_fields=["finished_rank", "old_league", "new_league"],
+            )
 
-    logger.info("Deleting old league groups.")
-    old_groups.delete()
-    logger.info("League reset completed.")
+    with reset_phase("assignment"):
+        if plan.staged_week_start is None:
+            create_reset_groups(plan.new_groups, new_cycle_monday.date(), league_map, batch_size)
+        else:
+            for league_name, pool in zip(plan.tiers, plan.pools):
+                for rows in batched(pool, batch_size):
+                    ResetPoolEntry.objects.bulk_create(
+                        [
+                            ResetPoolEntry(
+                                week_start=plan.staged_week_start,
+                                league_name=league_name,
+                                user_id=plan.user_ids[row],
+                                exp_earned=plan.exp_earned[row],
+                            )
+                            for row in rows
+                        ]
+                    )
+
+    logger.info(
+        f"[reset_leagues] wrote {len(plan.outcomes)} outcome(s), "
+        f"{len(plan.new_groups)} new group(s)."
+    )
 
 
-def assign_users_to_new_league(users, league_name, new_cycle_monday, league_map):
-    if not users or league_name not in league_map:
-        return
+def create_reset_groups(new_groups, week_start, league_map, batch_size=RESET_BATCH_SIZE):
+    """Inserts a reset's new groups, [(league_name, user ids), ...], with placements and rows."""
+    for group_batch in batched(new_groups, max(1, batch_size // LEAGUE_CAPACITY)):
+        groups = _bulk_create_groups(
+            [
+                LeagueGroup(league=league_map[name], week_start=week_start, member_count=len(user_ids))
+                for name, user_ids in group_batch
+            ]
+        )
+        UserLeaguePlacement.objects.bulk_create(
+            [
+                UserLeaguePlacement(user_id=user_id, league_group=group, exp_earned=0)
+                for group, (_, user_ids) in zip(groups, group_batch)
+                for user_id in user_ids
+            ],
+            batch_size=batch_size,
+        )
+        create_new_group_rows(
+            [(group, name, user_ids) for group, (name, user_ids) in zip(groups, group_batch)],
+            batch_size=batch_size,
+        )
 
-    league_obj = league_map[league_name]
-    slice_start = 0
-    while slice_start < len(users):
-        slice_end = slice_start + LEAGUE_CAPACITY
-        chunk = users[slice_start:slice_end]
 
-        group = LeagueGroup.objects.create(
-            league=league_obj,
-            week_start=new_cycle_monday.date()
-        )
-        for u in chunk:
-            u.current_league = league_name
-            u.exp_this_league = 0
-            u.save()
-            UserLeaguePlacement.objects.create(user=u, league_group=group, exp_earned=0)
+def drop_rankings_on_commit(league_group_ids):
+    # Old groups are ranked straight from exp_earned above (the DB is authoritative at the
+    # cutover); the ranking store only needs to forget them. New groups load lazily.
+    transaction.on_commit(lambda: get_ranking_store().drop_groups(league_group_ids))
+
+
+def _bulk_create_groups(groups):
+    # Placements need the new primary keys, which not every backend returns from a bulk insert.
+    if connection.features.can_return_rows_from_bulk_insert:
+        return LeagueGroup.objects.bulk_create(groups)
+    for group in groups:
+        group.save()
+    return groups
+
 
-        slice_start += LEAGUE_CAPACITY
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
@@ -0,0 +1,44 @@
+# python manage.py benchmark_group_formation --users 1000000
+# leaderboards/management/commands/benchmark_group_formation.py
+
+import random
+import statistics
+import time
+from django.core.management.base import BaseCommand
+from leaderboards.league_service import serpentine_groups, LEAGUE_CAPACITY
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark reset-time group formation for one tier: serpentine_groups() against "
+        "slicing users into LEAGUE_CAPACITY chunks in rank order. Pure Python, no database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000000, help='Users in the tier (default: 1000000)')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rnd = random.Random(options['seed'])
+        members = [(user_id, int(rnd.paretovariate(1.5) * 20)) for user_id in range(1, options['users'] + 1)]
+        exp_of = dict(members)
+
+        started = time.perf_counter()
+        balanced = serpentine_groups(members)
+        seconds = time.perf_counter() - started
+
+        ranked = [user_id for user_id, _ in sorted(members, key=lambda m: (-m[1], m[0]))]
+        chunked = [ranked[i:i + LEAGUE_CAPACITY] for i in range(0, len(ranked), LEAGUE_CAPACITY)]
+
+        self.stdout.write(
+            f"{len(members)} users -> {len(balanced)} groups in {seconds:.3f}s "
+            f"({len(members) / seconds if seconds else float('inf'):.0f} users/s)"
+        )
+        for name, groups in (("serpentine", balanced), ("rank-order chunks", chunked)):
+            sizes = [len(g) for g in groups]
+            means = [statistics.fmean(exp_of[u] for u in g) for g in groups]
+            self.stdout.write(
+                f"  {name:<18} sizes {min(sizes)}-{max(sizes)}  "
+                f"mean exp per group {min(means):.1f}-{max(means):.1f} "
+                f"(stdev {statistics.pstdev(means):.1f})"
+            )
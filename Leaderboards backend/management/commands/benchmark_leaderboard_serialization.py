@@ -0,0 +1,78 @@
+# python manage.py benchmark_leaderboard_serialization --rows 30 1000 --repeat 200
+# leaderboards/management/commands/benchmark_leaderboard_serialization.py
+
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from accounts.models import CustomUser
+from leaderboards.models import LeaderboardRow, League, LeagueGroup
+from leaderboards.league_service import get_previous_monday_0001_utc, LEAGUES_ORDER
+from leaderboards.serializers import LEADERBOARD_ROW_COLUMNS, LeaderboardRowSerializer, leaderboard_row_dicts
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark building a leaderboard payload: model rows through LeaderboardRowSerializer "
+        "vs .values_list() into plain dicts, fetch included. Runs inside a rolled-back transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[30, 1000], help='Board sizes (default: 30 1000)')
+        parser.add_argument('--repeat', type=int, default=200, help='Payloads built per mode and size (default: 200)')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            league, _ = League.objects.get_or_create(
+                name=LEAGUES_ORDER[0], defaults={"order": 0, "icon": "league_icons/default.png"}
+            )
+            week_start = get_previous_monday_0001_utc().date()
+            renderer = JSONRenderer()
+            for size in options['rows']:
+                group = self._seed(league, week_start, size)
+                rows = LeaderboardRow.objects.filter(league_group=group).order_by("rank")
+
+                def serializer_path():
+                    return LeaderboardRowSerializer(list(rows), many=True).data
+
+                def values_path():
+                    return leaderboard_row_dicts(rows.values_list(*LEADERBOARD_ROW_COLUMNS))
+
+                if renderer.render(serializer_path()) != renderer.render(values_path()):
+                    raise CommandError(f"Payloads differ at {size} rows")
+                slow = self._time(serializer_path, options['repeat'])
+                fast = self._time(values_path, options['repeat'])
+                self.stdout.write(
+                    f"{size:6d} rows  serializer {slow * 1000:8.3f} ms  values {fast * 1000:8.3f} ms  "
+                    f"({slow / fast:4.1f}x, identical JSON)"
+                )
+            transaction.set_rollback(True)
+
+    def _time(self, fn, repeat):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        return (time.perf_counter() - started) / repeat
+
+    def _seed(self, league, week_start, size):
+        # Rows only: the read model has no capacity limit, which stands in for an admin-sized board.
+        group = LeagueGroup.objects.create(league=league, week_start=week_start)
+        stamp = f"{int(time.time())}_{group.id}"
+        users = CustomUser.objects.bulk_create(
+            [
+                CustomUser(email=f"serbench{stamp}_{i}@example.com", username=f"serbench{stamp}_{i}", password="!")
+                for i in range(size)
+            ],
+            batch_size=1000,
+        )
+        LeaderboardRow.objects.bulk_create(
+            [
+                LeaderboardRow(
+                    league_group=group, rank=rank, user=user, username=user.username, email=user.email,
+                    exp_earned=size - rank, league_name=league.name, week_start=week_start,
+                )
+                for rank, user in enumerate(users, start=1)
+            ],
+            batch_size=1000,
+        )
+        return group
@@ -0,0 +1,118 @@
+# python manage.py benchmark_rank_queries --groups 2000 --lookups 500
+# leaderboards/management/commands/benchmark_rank_queries.py
+
+import random
+import time
+from collections import defaultdict
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from accounts.models import CustomUser
+from leaderboards.models import League, LeagueGroup, UserLeaguePlacement
+from leaderboards.league_service import get_previous_monday_0001_utc, LEAGUE_CAPACITY, LEAGUES_ORDER
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark rank lookups: sorting placements in Python (the old view and dump code) "
+        "against UserLeaguePlacement.objects.with_rank(). Runs inside a rolled-back transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--groups', type=int, default=2000, help='Synthetic full groups (default: 2000)')
+        parser.add_argument('--lookups', type=int, default=500, help='"My rank" lookups per mode (default: 500)')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rnd = random.Random(options['seed'])
+        self.week_start = get_previous_monday_0001_utc().date()
+        with transaction.atomic():
+            user_ids = self._seed(options['groups'], rnd)
+            sample = [CustomUser(pk=user_id) for user_id in rnd.sample(user_ids, min(options['lookups'], len(user_ids)))]
+
+            results = [
+                self._run("my rank: Python sort", lambda: [self._python_rank_of(u) for u in sample]),
+                self._run("my rank: rank_of()", lambda: [self._window_rank_of(u) for u in sample]),
+                self._run("all ranks: Python sort", self._python_all_ranks),
+                self._run("all ranks: with_rank()", self._window_all_ranks),
+            ]
+            transaction.set_rollback(True)
+
+        self.stdout.write(
+            f"{len(user_ids)} placements in {options['groups']} groups "
+            f"({'window functions' if connection.features.supports_over_clause else 'subquery fallback'})"
+        )
+        for (name, seconds, queries, value), check in zip(results, (results[1], results[0], results[3], results[2])):
+            verdict = "" if value == check[3] else self.style.ERROR("  results differ!")
+            self.stdout.write(f"  {name:<26} {seconds:8.3f}s  {queries:7d} queries{verdict}")
+
+    def _run(self, name, fn):
+        counter = _QueryCounter()
+        with connection.execute_wrapper(counter):
+            started = time.perf_counter()
+            value = fn()
+            seconds = time.perf_counter() - started
+        return name, seconds, counter.count, value
+
+    def _seed(self, groups, rnd):
+        gold, _ = League.objects.get_or_create(
+            name=LEAGUES_ORDER[2], defaults={"order": 2, "icon": "league_icons/default.png"}
+        )
+        stamp = int(time.time())
+        users = CustomUser.objects.bulk_create(
+            [
+                CustomUser(email=f"rankbench{stamp}_{i}@example.com", username=f"rankbench{stamp}_{i}", password="!")
+                for i in range(groups * LEAGUE_CAPACITY)
+            ],
+            batch_size=1000,
+        )
+        league_groups = LeagueGroup.objects.bulk_create(
+            [LeagueGroup(league=gold, week_start=self.week_start, member_count=LEAGUE_CAPACITY) for _ in range(groups)]
+        )
+        UserLeaguePlacement.objects.bulk_create(
+            [
+                UserLeaguePlacement(
+                    user=user, league_group=league_groups[i // LEAGUE_CAPACITY], exp_earned=rnd.randint(0, 500)
+                )
+                for i, user in enumerate(users)
+            ],
+            batch_size=1000,
+        )
+        return [user.id for user in users]
+
+    def _python_rank_of(self, user):
+        placement = UserLeaguePlacement.objects.filter(user=user, league_group__week_start=self.week_start).first()
+        group = UserLeaguePlacement.objects.filter(league_group_id=placement.league_group_id)
+        order = sorted((-p.exp_earned, p.user_id) for p in group)
+        return order.index((-placement.exp_earned, placement.user_id)) + 1
+
+    def _window_rank_of(self, user):
+        return UserLeaguePlacement.objects.rank_of(user, self.week_start).rank
+
+    def _python_all_ranks(self):
+        groups = defaultdict(list)
+        for p in UserLeaguePlacement.objects.filter(league_group__week_start=self.week_start):
+            groups[p.league_group_id].append(p)
+        ranks = {}
+        for members in groups.values():
+            members.sort(key=lambda p: (-p.exp_earned, p.user_id))
+            for rank, p in enumerate(members, start=1):
+                ranks[p.user_id] = rank
+        return ranks
+
+    def _window_all_ranks(self):
+        return dict(
+            UserLeaguePlacement.objects
+            .filter(league_group__week_start=self.week_start)
+            .with_rank()
+            .values_list("user_id", "rank")
+            .iterator(chunk_size=2000)
+        )
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
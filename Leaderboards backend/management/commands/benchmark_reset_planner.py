@@ -0,0 +1,91 @@
+# python manage.py benchmark_reset_planner --placements 1000000
+# leaderboards/management/commands/benchmark_reset_planner.py
+
+import random
+import time
+import tracemalloc
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from accounts.models import CustomUser
+from leaderboards.models import League, LeagueGroup, UserLeaguePlacement
+from leaderboards.league_service import (
+    build_reset_plan,
+    get_league_map,
+    get_previous_monday_0001_utc,
+    LEAGUE_CAPACITY,
+    LEAGUES_ORDER,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark build_reset_plan() over synthetic full groups spread across every tier: "
+        "CPU time, then peak traced memory in a second pass. Runs inside a rolled-back transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--placements', type=int, default=100000, help='Synthetic placements (default: 100000)')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rnd = random.Random(options['seed'])
+        week_start = get_previous_monday_0001_utc().date()
+        with transaction.atomic():
+            self.stdout.write(f"Seeding {options['placements']} placements...")
+            self._seed(options['placements'], week_start, rnd)
+            old_groups = LeagueGroup.objects.filter(week_start=week_start)
+            league_map = get_league_map()
+
+            started, cpu = time.perf_counter(), time.process_time()
+            plan = build_reset_plan(old_groups, league_map)
+            seconds, cpu = time.perf_counter() - started, time.process_time() - cpu
+            placements = len(plan)
+            del plan
+
+            # tracemalloc slows allocation down a lot, so memory gets its own pass.
+            tracemalloc.start()
+            plan = build_reset_plan(old_groups, league_map)
+            held, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            self.stdout.write(
+                f"{placements} placements -> {len(plan.new_groups)} new groups: "
+                f"{seconds:.2f}s wall, {cpu:.2f}s CPU, plan holds {held / 2**20:.1f} MiB "
+                f"({held / max(placements, 1):.0f} B/placement), peak {peak / 2**20:.1f} MiB"
+            )
+            transaction.set_rollback(True)
+
+    def _seed(self, placements, week_start, rnd):
+        leagues = [
+            League.objects.get_or_create(name=name, defaults={"order": i, "icon": "league_icons/default.png"})[0]
+            for i, name in enumerate(LEAGUES_ORDER)
+        ]
+        stamp = int(time.time())
+        for offset in range(0, placements, 50000):
+            count = min(50000, placements - offset)
+            users = CustomUser.objects.bulk_create(
+                [
+                    CustomUser(
+                        email=f"planbench{stamp}_{i}@example.com", username=f"planbench{stamp}_{i}",
+                        password="!", current_league=LEAGUES_ORDER[0],
+                    )
+                    for i in range(offset, offset + count)
+                ],
+                batch_size=5000,
+            )
+            groups = LeagueGroup.objects.bulk_create(
+                [
+                    LeagueGroup(league=leagues[g % len(leagues)], week_start=week_start, member_count=LEAGUE_CAPACITY)
+                    for g in range(-(-count // LEAGUE_CAPACITY))
+                ],
+                batch_size=5000,
+            )
+            UserLeaguePlacement.objects.bulk_create(
+                [
+                    UserLeaguePlacement(
+                        user=user, league_group=groups[i // LEAGUE_CAPACITY], exp_earned=rnd.randint(0, 300)
+                    )
+                    for i, user in enumerate(users)
+                ],
+                batch_size=5000,
+            )
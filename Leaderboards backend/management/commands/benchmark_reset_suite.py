@@ -0,0 +1,233 @@
+# python manage.py benchmark_reset_suite --scales 10000 100000 1000000 --output reset_bench.json
+# python manage.py benchmark_reset_suite --compare reset_bench_main.json reset_bench.json --tolerance 0.2
+# leaderboards/management/commands/benchmark_reset_suite.py
+
+import json
+import platform
+import random
+import time
+from datetime import datetime, timezone
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from accounts.models import CustomUser
+from leaderboards.models import League, LeagueGroup, UserLeaguePlacement
+from leaderboards.league_service import (
+    get_previous_monday_0001_utc,
+    place_new_user_in_bronze,
+    reset_leagues,
+    EXP_TO_REJOIN,
+    LEAGUE_CAPACITY,
+    LEAGUES_ORDER,
+)
+from leaderboards.reset_telemetry import max_rss_mib
+
+PHASES = ("seed", "place_new_user_in_bronze", "reset_leagues")
+# Metrics compared between two results files; rows_written is compared for equality.
+COMPARED = ("wall_seconds", "queries", "rss_growth_mib")
+TIER_DECAY = 0.7  # each tier holds this share of the users of the tier below it
+SEED_BATCH = 5000
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds synthetic populations through bulk inserts and times place_new_user_in_bronze() and "
+        "reset_leagues() on them: wall time, queries, peak RSS and rows written per phase, saved as JSON. "
+        "Every scale runs in a transaction that is rolled back. --compare flags regressions between two files."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', type=int, nargs='+', default=[10000, 100000], help='Users per run (default: 10000 100000)')
+        parser.add_argument('--output', type=str, default='reset_bench.json', help='Results file (default: reset_bench.json)')
+        parser.add_argument('--xp', choices=['pareto', 'uniform'], default='pareto', help='exp_earned distribution (default: pareto)')
+        parser.add_argument('--zero-share', type=float, default=0.05, help='Share of placed users on 0 XP (default: 0.05)')
+        parser.add_argument('--locked-out-share', type=float, default=0.02, help='Share of users locked out (default: 0.02)')
+        parser.add_argument('--newcomers', type=int, default=200, help='Users placed one by one in Bronze (default: 200)')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CANDIDATE'), help='Compare two results files instead of running')
+        parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed relative growth before a metric is flagged (default: 0.2)')
+
+    def handle(self, *args, **options):
+        if options['compare']:
+            return self._compare(*options['compare'], options['tolerance'])
+
+        week_start = get_previous_monday_0001_utc().date()
+        if LeagueGroup.objects.filter(week_start=week_start).exists():
+            raise CommandError(
+                f"The {week_start} cycle already has groups; reset_leagues() would process them too. "
+                "Run the suite against an empty database."
+            )
+
+        results = {
+            "meta": {
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "database": connection.vendor,
+                "python": platform.python_version(),
+                "xp": options['xp'],
+                "zero_share": options['zero_share'],
+                "locked_out_share": options['locked_out_share'],
+                "newcomers": options['newcomers'],
+                "seed": options['seed'],
+            },
+            "runs": {},
+        }
+        # Ascending, so the process RSS high-water mark of a run belongs to that run.
+        for users in sorted(options['scales']):
+            self.stdout.write(f"{users} users:")
+            results["runs"][str(users)] = self._run(users, week_start, options)
+            with open(options['output'], "w") as f:
+                json.dump(results, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+    def _run(self, users, week_start, options):
+        rnd = random.Random(options['seed'])
+        run = {}
+        with transaction.atomic():
+            newcomers = []
+            run["seed"] = self._phase("seed", lambda: newcomers.extend(self._seed(users, week_start, rnd, options)))
+            run["place_new_user_in_bronze"] = self._phase(
+                "place_new_user_in_bronze", lambda: [place_new_user_in_bronze(user) for user in newcomers]
+            )
+            run["reset_leagues"] = self._phase("reset_leagues", reset_leagues)
+            transaction.set_rollback(True)
+        return run
+
+    def _phase(self, name, fn):
+        meter = _WriteMeter()
+        rss_before = max_rss_mib()
+        started = time.perf_counter()
+        with connection.execute_wrapper(meter):
+            fn()
+        result = {
+            "wall_seconds": round(time.perf_counter() - started, 4),
+            "queries": meter.queries,
+            "rows_written": meter.rows,
+            "peak_rss_mib": round(max_rss_mib(), 1),
+            "rss_growth_mib": round(max_rss_mib() - rss_before, 1),
+        }
+        self.stdout.write(
+            f"  {name:<26} {result['wall_seconds']:9.3f}s {result['queries']:8d} queries "
+            f"{result['rows_written']:9d} rows  peak RSS {result['peak_rss_mib']:.0f} MiB"
+        )
+        return result
+
+    def _seed(self, users, week_start, rnd, options):
+        """
+        Leagues as needed, then users spread over the tiers (each tier TIER_DECAY times the
+        one below), placed in full groups of LEAGUE_CAPACITY. Returns the newcomers, who
+        have no placement yet, for the placement phase.
+        """
+        leagues = [
+            League.objects.get_or_create(name=name, defaults={"order": i, "icon": "league_icons/default.png"})[0]
+            for i, name in enumerate(LEAGUES_ORDER)
+        ]
+        weights = [TIER_DECAY ** i for i in range(len(leagues))]
+        stamp = int(time.time())
+
+        def xp():
+            if rnd.random() < options['zero_share']:
+                return 0
+            if options['xp'] == 'uniform':
+                return rnd.randint(1, 300)
+            return int(rnd.paretovariate(1.5) * 20)
+
+        locked_out = int(users * options['locked_out_share'])
+        profiles = [LEAGUES_ORDER[0]] * options['newcomers'] + [""] * locked_out
+        profiles += rnd.choices(LEAGUES_ORDER, weights=weights, k=max(0, users - len(profiles)))
+
+        created = []
+        for offset in range(0, len(profiles), SEED_BATCH):
+            created += CustomUser.objects.bulk_create(
+                [
+                    CustomUser(
+                        email=f"resetbench{stamp}_{i}@example.com",
+                        username=f"resetbench{stamp}_{i}",
+                        password="!",
+                        current_league=league_name,
+                        exp_to_enter=rnd.randint(0, 2 * EXP_TO_REJOIN) if league_name == "" else 0,
+                    )
+                    for i, league_name in enumerate(profiles[offset:offset + SEED_BATCH], start=offset)
+                ],
+                batch_size=SEED_BATCH,
+            )
+        newcomers = created[:options['newcomers']]
+
+        by_tier = {league.name: [] for league in leagues}
+        for user in created[options['newcomers'] + locked_out:]:
+            by_tier[user.current_league].append(user)
+        for league in leagues:
+            members = by_tier[league.name]
+            groups = LeagueGroup.objects.bulk_create(
+                [
+                    LeagueGroup(
+                        league=league,
+                        week_start=week_start,
+                        member_count=min(LEAGUE_CAPACITY, len(members) - start),
+                    )
+                    for start in range(0, len(members), LEAGUE_CAPACITY)
+                ],
+                batch_size=SEED_BATCH,
+            )
+            UserLeaguePlacement.objects.bulk_create(
+                [
+                    UserLeaguePlacement(user=user, league_group=groups[i // LEAGUE_CAPACITY], exp_earned=xp())
+                    for i, user in enumerate(members)
+                ],
+                batch_size=SEED_BATCH,
+            )
+        return newcomers
+
+    def _compare(self, baseline_path, candidate_path, tolerance):
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        with open(candidate_path) as f:
+            candidate = json.load(f)
+
+        regressions = compare_results(baseline, candidate, tolerance)
+        for line in regressions:
+            self.stdout.write(self.style.ERROR(line))
+        if regressions:
+            raise CommandError(f"{len(regressions)} regression(s) over {tolerance:.0%} tolerance")
+        self.stdout.write(self.style.SUCCESS(f"No regressions over {tolerance:.0%} tolerance"))
+
+
+def compare_results(baseline, candidate, tolerance):
+    """
+    Lines describing each metric that grew by more than tolerance (a fraction) between
+    two results files, plus any change in rows written. Only scales and phases present
+    in both are compared.
+    """
+    regressions = []
+    for scale, phases in candidate["runs"].items():
+        for phase in PHASES:
+            old, new = baseline["runs"].get(scale, {}).get(phase), phases.get(phase)
+            if not old or not new:
+                continue
+            for metric in COMPARED:
+                if new[metric] > old[metric] * (1 + tolerance) and new[metric] - old[metric] > 0:
+                    regressions.append(f"{scale} users, {phase}: {metric} {old[metric]} -> {new[metric]}")
+            if phase != "seed" and new["rows_written"] != old["rows_written"]:
+                regressions.append(
+                    f"{scale} users, {phase}: rows_written {old['rows_written']} -> {new['rows_written']} (changed)"
+                )
+    return regressions
+
+
+class _WriteMeter:
+    """Counts queries, and the rows INSERT/UPDATE/DELETE statements report as affected."""
+
+    def __init__(self):
+        self.queries = 0
+        self.rows = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        result = execute(sql, params, many, context)
+        self.queries += 1
+        if sql.lstrip()[:6].upper() in ("INSERT", "UPDATE", "DELETE"):
+            rowcount = context["cursor"].rowcount
+            if rowcount <= 0 and params and " RETURNING " in sql:
+                # SQLite only knows the count of INSERT ... RETURNING once the ids are
+                # fetched; count the VALUES rows instead.
+                columns = sql[sql.index("(") + 1:sql.index(")")].count(",") + 1
+                rowcount = len(params) // columns
+            self.rows += max(rowcount, 0)
+        return result
@@ -0,0 +1,122 @@
+# python manage.py benchmark_xp_ingest --events 10000 --rate 10000
+# leaderboards/management/commands/benchmark_xp_ingest.py
+
+import random
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from accounts.models import CustomUser
+from leaderboards.models import League, LeagueGroup, UserLeaguePlacement
+from leaderboards.league_service import (
+    add_league_exp,
+    get_previous_monday_0001_utc,
+    LEAGUE_CAPACITY,
+    LEAGUES_ORDER,
+)
+from leaderboards.xp_ingest import XPIngestBuffer
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark XP awards: per-event saves vs add_league_exp() vs the batched ingest buffer. "
+        "Everything runs inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='Synthetic users (default: 1000)')
+        parser.add_argument('--events', type=int, default=10000, help='XP events per mode (default: 10000)')
+        parser.add_argument('--rate', type=int, default=10000, help='Offered events/sec; one flush per second of events (default: 10000)')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rnd = random.Random(options['seed'])
+        with transaction.atomic():
+            user_ids = self._seed_users(options['users'])
+            events = [(rnd.choice(user_ids), rnd.randint(1, 20)) for _ in range(options['events'])]
+
+            results = [
+                self._run("per-event save()", self._per_event_saves, events),
+                self._run("per-event add_league_exp()", self._per_event_service, events),
+                self._run("batched buffer", lambda ev: self._batched(ev, options['rate']), events),
+            ]
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"{len(events)} events over {len(user_ids)} users, offered rate {options['rate']}/s")
+        for name, seconds, queries in results:
+            rate = len(events) / seconds if seconds else float("inf")
+            verdict = self.style.SUCCESS("keeps up") if rate >= options['rate'] else self.style.WARNING("falls behind")
+            self.stdout.write(
+                f"  {name:<28} {seconds:8.3f}s  {rate:10.0f} events/s  {queries:7d} queries  {verdict}"
+            )
+
+    def _run(self, name, fn, events):
+        counter = _QueryCounter()
+        with connection.execute_wrapper(counter):
+            started = time.perf_counter()
+            fn(events)
+            seconds = time.perf_counter() - started
+        return name, seconds, counter.count
+
+    def _seed_users(self, count):
+        bronze, _ = League.objects.get_or_create(
+            name=LEAGUES_ORDER[0], defaults={"order": 0, "icon": "league_icons/default.png"}
+        )
+        week_start = get_previous_monday_0001_utc().date()
+        stamp = int(time.time())
+        users = CustomUser.objects.bulk_create(
+            [
+                CustomUser(
+                    email=f"xpbench{stamp}_{i}@example.com",
+                    username=f"xpbench{stamp}_{i}",
+                    password="!",
+                    current_league=LEAGUES_ORDER[0],
+                )
+                for i in range(count)
+            ],
+            batch_size=1000,
+        )
+        groups = LeagueGroup.objects.bulk_create(
+            [
+                LeagueGroup(league=bronze, week_start=week_start, member_count=min(LEAGUE_CAPACITY, count - start))
+                for start in range(0, count, LEAGUE_CAPACITY)
+            ]
+        )
+        UserLeaguePlacement.objects.bulk_create(
+            [
+                UserLeaguePlacement(user=user, league_group=groups[i // LEAGUE_CAPACITY], exp_earned=0)
+                for i, user in enumerate(users)
+            ],
+            batch_size=1000,
+        )
+        return [user.id for user in users]
+
+    def _per_event_saves(self, events):
+        # What callers did before add_league_exp(): load, bump and save both rows.
+        week_start = get_previous_monday_0001_utc().date()
+        for user_id, delta in events:
+            user = CustomUser.objects.get(pk=user_id)
+            user.exp_this_league += delta
+            user.save()
+            placement = UserLeaguePlacement.objects.get(user=user, league_group__week_start=week_start)
+            placement.exp_earned = user.exp_this_league
+            placement.save()
+
+    def _per_event_service(self, events):
+        for user_id, delta in events:
+            add_league_exp(CustomUser(pk=user_id), delta)
+
+    def _batched(self, events, rate):
+        buffer = XPIngestBuffer(max_events=len(events) + 1)
+        for start in range(0, len(events), max(1, rate)):
+            for user_id, delta in events[start:start + rate]:
+                buffer.record(user_id, delta)
+            buffer.flush()
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
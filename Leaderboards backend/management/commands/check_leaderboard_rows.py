@@ -0,0 +1,42 @@
+# python manage.py check_leaderboard_rows --fix
+# leaderboards/management/commands/check_leaderboard_rows.py
+
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from leaderboards.leaderboard_cache import invalidate_group_snapshot
+from leaderboards.leaderboard_rows import check_rows, refresh_group_rows
+from leaderboards.league_service import get_previous_monday_0001_utc
+
+
+class Command(BaseCommand):
+    help = "Compare the LeaderboardRow read model against UserLeaguePlacement for one cycle."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--week-start',
+            type=date.fromisoformat,
+            default=None,
+            help='Cycle to check, YYYY-MM-DD (default: the current cycle)',
+        )
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Rebuild the rows of inconsistent groups',
+        )
+
+    def handle(self, *args, **options):
+        week_start = options['week_start'] or get_previous_monday_0001_utc().date()
+        problems = check_rows(week_start=week_start)
+
+        for league_group_id, problem in problems:
+            self.stdout.write(self.style.WARNING(f"Group {league_group_id}: {problem}"))
+            if options['fix']:
+                refresh_group_rows(league_group_id)
+                invalidate_group_snapshot(league_group_id)
+
+        if not problems:
+            self.stdout.write(self.style.SUCCESS(f"{week_start}: read model matches the database."))
+        elif options['fix']:
+            self.stdout.write(self.style.SUCCESS(f"{week_start}: rebuilt {len(problems)} group(s)."))
+        else:
+            raise CommandError(f"{week_start}: {len(problems)} inconsistent group(s).")
@@ -1,148 +1,160 @@
+# python manage.py create_test_users --count 100000 --seed 42 --tiers pyramid --xp pareto
 # leaderboards/management/commands/create_test_users.py
 
 import json
 import random
-from collections import defaultdict
-from django.core.management.base import BaseCommand
-from django.utils.timezone import now
-from datetime import timedelta
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 from accounts.models import CustomUser
-from leaderboards.models import League, LeagueGroup, UserLeaguePlacement
-from leaderboards.league_service import LEAGUE_CAPACITY
+from leaderboards.models import LeaderboardRow, LeagueGroup, UserLeaguePlacement
+from leaderboards.league_catalog import get_league_catalog
+from leaderboards.league_service import (
+    _bulk_create_groups,
+    get_previous_monday_0001_utc,
+    LEAGUE_CAPACITY,
+)
+
+TIER_DECAY = 0.7  # with --tiers pyramid, each tier holds this share of the users of the tier below it
+
 
 class Command(BaseCommand):
-    help = "Create a specified number of test users with password=123. Distributes them across all leagues, not just Bronze."
+    help = (
+        "Create test users (password 123 unless --password) and place them in this week's groups "
+        "across every league. Users, groups, placements and leaderboard rows are bulk-inserted in "
+        "batches; --seed makes a run reproducible."
+    )
 
     def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=1000, help='Number of test users to create (default: 1000)')
         parser.add_argument(
-            '--count',
-            type=int,
-            default=1000,
-            help='Number of test users to create (default: 1000)',
+            '--json-file', type=str, default="users_created.json",
+            help="Filename for the JSON output of newly created users",
         )
+        parser.add_argument('--password', type=str, default="123", help='Shared password (default: 123)')
+        parser.add_argument('--start', type=int, default=0, help='First user index, to add users to an earlier run (default: 0)')
+        parser.add_argument('--seed', type=int, default=None, help='Random seed (default: unseeded)')
         parser.add_argument(
-            '--json-file',
-            type=str,
-            default="users_created.json",
-            help="Filename for the JSON output of newly created users",
+            '--tiers', choices=['uniform', 'pyramid'], default='uniform',
+            help=f'League distribution: equal shares, or each tier {TIER_DECAY} times the one below (default: uniform)',
         )
+        parser.add_argument('--xp', choices=['uniform', 'pareto'], default='uniform', help='exp_this_league distribution (default: uniform)')
+        parser.add_argument('--max-xp', type=int, default=10000, help='Upper bound of exp_this_league (default: 10000)')
+        parser.add_argument('--max-gems', type=int, default=500, help='Upper bound of gems_count (default: 500)')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Users per insert batch (default: 5000)')
 
     def handle(self, *args, **options):
-        count = options['count']
-        json_filename = options['json_file']
-
-        self.stdout.write(self.style.WARNING(f"Creating {count} test users..."))
-
-        # Step 1: Create test users
-        created_users = []
-        for i in range(count):
-            username = f"test_user_{i}"
-            email = f"user{i}@test.com"
-            password = "123"  # Properly hashed by create_user
-            gems_count = random.randint(0, 500)
-            exp_this_league = random.randint(0, 10000)
-
-            user = CustomUser.objects.create_user(
-                email=email,
-                password=password,
-                username=username,
-                gems_count=gems_count,
-                exp_this_league=exp_this_league,
-            )
-
-            # We'll store data for the JSON
-            created_users.append({
-                "username": username,
-                "email": email,
-                "gems_count": gems_count,
-                "current_league": user.current_league,
-                "exp_this_league": user.exp_this_league,
-            })
-
-        self.stdout.write(self.style.SUCCESS(f"Successfully created {count} test users!"))
-
-        # Step 2: Assign users to leagues (if not skipped)
-
-        self.assign_users_to_leagues()
-
-        # Step 3: Write newly created users to JSON
-        with open(json_filename, "w") as f:
-            json.dump(created_users, f, indent=4)
-        self.stdout.write(self.style.SUCCESS(f"Wrote user data to {json_filename}"))
-
-    def assign_users_to_leagues(self):
-        """
-        Distribute users across all existing leagues, 
-        so that each league gets roughly the same number of users.
-        or you can do a random approach.
+        catalog = get_league_catalog()
+        leagues = catalog.leagues
+        if not leagues:
+            raise CommandError("No leagues found; create them before seeding users.")
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1")
+
+        count, start, batch_size = options['count'], options['start'], options['batch_size']
+        rnd = random.Random(options['seed'])
+        week_start = get_previous_monday_0001_utc().date()
+        # One PBKDF2 run for everyone instead of one per create_user().
+        password = make_password(options['password'])
+        weights = [TIER_DECAY ** i if options['tiers'] == 'pyramid' else 1 for i in range(len(leagues))]
+        max_xp = options['max_xp']
+
+        def xp():
+            if options['xp'] == 'uniform':
+                return rnd.randint(0, max_xp)
+            return min(max_xp, int((rnd.paretovariate(1.5) - 1) * max_xp / 20))
+
+        self.stdout.write(self.style.WARNING(f"Creating {count} test users across {len(leagues)} leagues..."))
+
+        # Members waiting for a group, per league: a league's last partial group carries
+        # over to the next batch, so only the final group of each league is short.
+        pending = {league.pk: [] for league in leagues}
+        groups = written = 0
+        with open(options['json_file'], "w") as f:
+            f.write("[")
+            for offset in range(start, start + count, batch_size):
+                size = min(batch_size, start + count - offset)
+                tiers = rnd.choices(leagues, weights=weights, k=size)
+                with transaction.atomic():
+                    users = CustomUser.objects.bulk_create(
+                        [
+                            CustomUser(
+                                email=f"user{i}@test.com",
+                                username=f"test_user_{i}",
+                                password=password,
+                                gems_count=rnd.randint(0, options['max_gems']),
+                                exp_this_league=xp(),
+                                current_league=league.name,
+                            )
+                            for i, league in zip(range(offset, offset + size), tiers)
+                        ],
+                        batch_size=batch_size,
+                    )
+                    full = []
+                    for user, league in zip(users, tiers):
+                        members = pending[league.pk]
+                        members.append(user)
+                        if len(members) == LEAGUE_CAPACITY:
+                            full.append((league, members))
+                            pending[league.pk] = []
+                    groups += self._place(full, week_start, batch_size)
+
+                # The array is written element by element, so it never sits in memory as a whole.
+                for user in users:
+                    f.write(",\n    " if written else "\n    ")
+                    f.write(json.dumps({
+                        "username": user.username,
+                        "email": user.email,
+                        "gems_count": user.gems_count,
+                        "current_league": user.current_league,
+                        "exp_this_league": user.exp_this_league,
+                    }))
+                    written += 1
+                self.stdout.write(f"  {offset + size - start}/{count} users, {groups} groups")
+
+            with transaction.atomic():
+                groups += self._place(
+                    [(league, pending[league.pk]) for league in leagues if pending[league.pk]], week_start, batch_size
+                )
+            f.write("\n]\n" if written else "]\n")
+
+        self.stdout.write(self.style.SUCCESS(f"Created {count} test users in {groups} groups for the week of {week_start}"))
+        self.stdout.write(self.style.SUCCESS(f"Wrote user data to {options['json_file']}"))
+
+    def _place(self, groups, week_start, batch_size):
         """
-        all_leagues = list(League.objects.order_by("order"))
-        if not all_leagues:
-            self.stdout.write(self.style.WARNING("No leagues found. Aborting league assignment."))
-            return
-
-        # We define the "week_start" as current Monday, for example:
-        week_start = (now().date() - timedelta(days=now().weekday()))
-
-        users = list(CustomUser.objects.order_by("-exp_this_league"))
-
-        self.stdout.write(self.style.WARNING(
-            f"Assigning {len(users)} users among {len(all_leagues)} leagues..."
-        ))
-
-        # -------------------------
-        # Option A: Uniform distribution by chunk
-        # -------------------------
-        chunk_size = max(1, len(users) // len(all_leagues))
-        league_index = 0
-
-        for i, user in enumerate(users):
-            # Once we fill chunk_size, move to the next league
-            if i != 0 and i % chunk_size == 0:
-                league_index += 1
-            if league_index >= len(all_leagues):
-                league_index = len(all_leagues) - 1  # put overflow in last league
-
-            league_obj = all_leagues[league_index]
-            self.place_user_in_league_group(user, league_obj, week_start)
-
-        # -------------------------
-        # Option B: Random approach (uncomment if you prefer random)
-        # -------------------------
-        # for user in users:
-        #     league_obj = random.choice(all_leagues)
-        #     self.place_user_in_league_group(user, league_obj, week_start)
-
-        self.stdout.write(self.style.SUCCESS("All users have been distributed among leagues."))
-
-    def place_user_in_league_group(self, user, league_obj, week_start):
+        Bulk-inserts new groups with their placements and ranked leaderboard rows:
+        groups is [(League, [user, ...]), ...]. Ranks follow the ranking store's order,
+        highest exp first and the lower user id on ties.
         """
-        Find or create an open league group for the given league_obj at this week_start.
-        Then place the user in it.
-        """
-        existing_groups = LeagueGroup.objects.filter(
-            league=league_obj,
-            week_start=week_start
-        ).order_by("id")
-
-        # find a group with space
-        for group in existing_groups:
-            if group.placements.count() < LEAGUE_CAPACITY:
-                self._assign_user_to_group(user, group, league_obj.name)
-                return
-
-        # else create new group
-        new_group = LeagueGroup.objects.create(league=league_obj, week_start=week_start)
-        self._assign_user_to_group(user, new_group, league_obj.name)
-
-    def _assign_user_to_group(self, user, group, league_name):
-        UserLeaguePlacement.objects.create(
-            user=user,
-            league_group=group,
-            exp_earned=user.exp_this_league,
+        if not groups:
+            return 0
+        created = _bulk_create_groups(
+            [LeagueGroup(league=league, week_start=week_start, member_count=len(members)) for league, members in groups]
+        )
+        UserLeaguePlacement.objects.bulk_create(
+            [
+                UserLeaguePlacement(user=user, league_group=group, exp_earned=user.exp_this_league)
+                for group, (_, members) in zip(created, groups)
+                for user in members
+            ],
+            batch_size=batch_size,
         )
-        user.current_league = league_name
-        user.save()
-        self.stdout.write(
-            self.style.SUCCESS(f"Assigned user {user.username} to league {league_name}")
+        LeaderboardRow.objects.bulk_create(
+            [
+                LeaderboardRow(
+                    league_group=group,
+                    rank=rank,
+                    user=user,
+                    username=user.username,
+                    email=user.email,
+                    exp_earned=user.exp_this_league,
+                    league_name=league.name,
+                    week_start=week_start,
+                )
+                for group, (league, members) in zip(created, groups)
+                for rank, user in enumerate(sorted(members, key=lambda u: (-u.exp_this_league, u.pk)), start=1)
+            ],
+            batch_size=batch_size,
         )
+        return len(created)
@@ -1,59 +1,116 @@
 # python manage.py dump_users_league_status --filename=after_reset.json
+# python manage.py dump_users_league_status --format=csv --week-start=2025-01-06 --tier=Gold --filename=gold.csv
 # leaderboards/management/commands/dump_users_league_status.py
 
+import csv
+import heapq
 import json
-from django.core.management.base import BaseCommand
+from datetime import date
+from operator import itemgetter
+from django.core.management.base import BaseCommand, CommandError
 from accounts.models import CustomUser
 from leaderboards.models import UserLeaguePlacement
+from leaderboards.league_service import LEAGUES_ORDER
+
+FIELDS = ["email", "current_league", "exp_this_league", "placement_exp_earned", "rank_in_group"]
+
 
 class Command(BaseCommand):
-    help = "Dump all users and their league status (rank, league, xp) to a JSON file"
+    help = (
+        "Dump users and their league status (rank, league, xp), streamed. "
+        "JSON (an array, the default), JSONL or CSV."
+    )
 
     def add_arguments(self, parser):
         parser.add_argument(
             '--filename',
             type=str,
             default='users_league_status.json',
-            help='Output JSON filename (default: users_league_status.json)'
+            help='Output filename (default: users_league_status.json)'
+        )
+        parser.add_argument(
+            '--format',
+            choices=['json', 'jsonl', 'csv'],
+            default='json',
+        )
+        parser.add_argument(
+            '--week-start',
+            type=date.fromisoformat,
+            default=None,
+            help='Only users placed in this cycle, YYYY-MM-DD',
+        )
+        parser.add_argument(
+            '--tier',
+            type=str,
+            default=None,
+            help='Only users placed in groups of this league',
         )
+        parser.add_argument('--chunk-size', type=int, default=2000)
 
     def handle(self, *args, **options):
-        filename = options['filename']
-
-        data_output = []
-        users = CustomUser.objects.all().order_by("id")
-        for user in users:
-            # Attempt to find the user’s league placement 
-            # (we assume they might only have 1 for the current cycle, or none)
-            placement = (
-                UserLeaguePlacement.objects.filter(user=user)
-                .order_by("-exp_earned")  # or filter by the current cycle
-                .first()
+        if options['tier'] and options['tier'] not in LEAGUES_ORDER:
+            raise CommandError(f"Unknown tier {options['tier']!r}, expected one of {LEAGUES_ORDER}")
+
+        rows = self.rows(options['week_start'], options['tier'], options['chunk_size'])
+        with open(options['filename'], "w", newline="") as f:
+            written = getattr(self, f"write_{options['format']}")(f, rows)
+
+        self.stdout.write(self.style.SUCCESS(f"Dumped {written} row(s) of user league status to {options['filename']}"))
+
+    def rows(self, week_start, tier, chunk_size):
+        """
+        One row per placement, ranked within its group by UserLeaguePlacement.with_rank(),
+        the order the boards show, plus a row of nulls per user without a placement when
+        nothing is filtered. Both are streamed in user id order and merged. Filters select
+        whole groups, so they never change a rank.
+        """
+        conditions = {}
+        if week_start is not None:
+            conditions["league_group__week_start"] = week_start
+        if tier is not None:
+            conditions["league_group__league__name"] = tier
+        placed = (
+            UserLeaguePlacement.objects
+            .filter(**conditions)
+            .with_rank()
+            .order_by("user_id", "id")
+            .values_list("user_id", "user__email", "user__current_league", "user__exp_this_league", "exp_earned", "rank")
+            .iterator(chunk_size=chunk_size)
+        )
+        unplaced = iter(())
+        if not conditions:
+            unplaced = (
+                row + (None, None)
+                for row in CustomUser.objects.filter(league_placements=None)
+                .order_by("id")
+                .values_list("id", "email", "current_league", "exp_this_league")
+                .iterator(chunk_size=chunk_size)
             )
-            rank = None
-            exp_earned = None
-            if placement:
-                # rank is tricky if we want the rank in that group
-                group_placements = list(
-                    UserLeaguePlacement.objects.filter(league_group=placement.league_group)
-                    .order_by("-exp_earned")
-                )
-                # find index
-                for i, gp in enumerate(group_placements):
-                    if gp.user_id == user.id:
-                        rank = i + 1
-                        exp_earned = gp.exp_earned
-                        break
-
-            data_output.append({
-                "email": user.email,
-                "current_league": user.current_league,
-                "exp_this_league": user.exp_this_league,
-                "placement_exp_earned": exp_earned,
-                "rank_in_group": rank,
-            })
-
-        with open(filename, "w") as f:
-            json.dump(data_output, f, indent=4)
-
-        self.stdout.write(self.style.SUCCESS(f"Dumped user league status to {filename}"))
+        return (row[1:] for row in heapq.merge(placed, unplaced, key=itemgetter(0)))
+
+    def write_json(self, f, rows):
+        # The array is written element by element, so it never sits in memory as a whole.
+        written = 0
+        f.write("[")
+        for row in rows:
+            f.write(",\n    " if written else "\n    ")
+            f.write(json.dumps(dict(zip(FIELDS, row))))
+            written += 1
+        f.write("\n]\n" if written else "]\n")
+        return written
+
+    def write_jsonl(self, f, rows):
+        written = 0
+        for row in rows:
+            f.write(json.dumps(dict(zip(FIELDS, row))) + "\n")
+            written += 1
+        return written
+
+    def write_csv(self, f, rows):
+        writer = csv.writer(f)
+        writer.writerow(FIELDS)
+        written = 0
+        for row in rows:
+            writer.writerow(["" if value is None else value for value in row])
+            written += 1
+        return written
@@ -0,0 +1,22 @@
+# python manage.py rebuild_leaderboard_rows --week-start 2025-01-06
+# leaderboards/management/commands/rebuild_leaderboard_rows.py
+
+from datetime import date
+from django.core.management.base import BaseCommand
+from leaderboards.leaderboard_rows import rebuild_rows
+
+
+class Command(BaseCommand):
+    help = "Recreate the LeaderboardRow read model from UserLeaguePlacement (all cycles by default)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--week-start',
+            type=date.fromisoformat,
+            default=None,
+            help='Only rebuild this cycle, YYYY-MM-DD',
+        )
+
+    def handle(self, *args, **options):
+        written = rebuild_rows(week_start=options['week_start'])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} leaderboard row(s)."))
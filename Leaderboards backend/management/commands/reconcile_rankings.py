@@ -0,0 +1,72 @@
+# python manage.py reconcile_rankings --fix
+# leaderboards/management/commands/reconcile_rankings.py
+
+from collections import defaultdict
+from datetime import date
+from django.core.management.base import BaseCommand
+from leaderboards.models import UserLeaguePlacement
+from leaderboards.league_service import get_previous_monday_0001_utc
+from leaderboards.ranking import get_ranking_store
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the ranking store against UserLeaguePlacement.exp_earned for one cycle. "
+        "Only meaningful for a shared backend (Redis): the in-memory store starts empty in this process."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--week-start',
+            type=date.fromisoformat,
+            default=None,
+            help='Cycle to check, YYYY-MM-DD (default: the current cycle)',
+        )
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Reload drifted groups from the database',
+        )
+
+    def handle(self, *args, **options):
+        week_start = options['week_start'] or get_previous_monday_0001_utc().date()
+        store = get_ranking_store()
+
+        db_scores = defaultdict(dict)
+        rows = (
+            UserLeaguePlacement.objects.filter(league_group__week_start=week_start)
+            .values_list("league_group_id", "user_id", "exp_earned")
+            .iterator(chunk_size=2000)
+        )
+        for league_group_id, user_id, exp_earned in rows:
+            db_scores[league_group_id][user_id] = exp_earned
+
+        checked = not_loaded = drifted = 0
+        for league_group_id, scores in db_scores.items():
+            if not store.has_group(league_group_id):
+                not_loaded += 1
+                continue
+            checked += 1
+            stored = dict(store.top(league_group_id))
+            if stored == scores:
+                continue
+
+            drifted += 1
+            missing = scores.keys() - stored.keys()
+            extra = stored.keys() - scores.keys()
+            wrong = [u for u in scores.keys() & stored.keys() if scores[u] != stored[u]]
+            self.stdout.write(self.style.WARNING(
+                f"Group {league_group_id}: {len(missing)} missing, {len(extra)} extra, "
+                f"{len(wrong)} with a different score"
+            ))
+            if options['fix']:
+                store.load_group(league_group_id, scores.items())
+
+        self.stdout.write(
+            f"{week_start}: {checked} group(s) checked, {not_loaded} not loaded in the store, "
+            f"{drifted} drifted."
+        )
+        if drifted and options['fix']:
+            self.stdout.write(self.style.SUCCESS(f"Reloaded {drifted} group(s) from the database."))
+        elif not drifted:
+            self.stdout.write(self.style.SUCCESS("Ranking store matches the database."))
@@ -0,0 +1,87 @@
+# python manage.py reset_trends --runs 12 --window-minutes 60
+# leaderboards/management/commands/reset_trends.py
+
+from django.core.management.base import BaseCommand
+from leaderboards.models import ResetRun
+
+
+class Command(BaseCommand):
+    help = (
+        "Print recorded weekly resets, oldest first: users, duration and time per phase. "
+        "Fits reset time against users over the finished runs and projects the user count "
+        "at which a reset would outgrow the Monday window."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=12, help='Most recent runs to show (default: 12)')
+        parser.add_argument(
+            '--window-minutes', type=float, default=60,
+            help='Time a reset may take before it eats into the new cycle (default: 60)',
+        )
+
+    def handle(self, *args, **options):
+        runs = list(ResetRun.objects.order_by("-started_at")[:options['runs']])[::-1]
+        if not runs:
+            self.stdout.write("No reset runs recorded yet.")
+            return
+
+        self.stdout.write(
+            f"{'started':<16} {'week':<10} {'mode':<7} {'status':<7} {'users':>9} {'groups':>7} "
+            f"{'seconds':>9} {'us/user':>8} "
+            + " ".join(f"{phase:>10}" for phase in ResetRun.PHASES)
+            + f" {'peak MiB':>8}"
+        )
+        for run in runs:
+            seconds = run.duration_seconds
+            per_user = seconds * 1e6 / run.users_processed if seconds is not None and run.users_processed else None
+            line = (
+                f"{run.started_at:%Y-%m-%d %H:%M} {run.week_start.isoformat():<10} {run.mode:<7} {run.status:<7} "
+                f"{run.users_processed:>9} {run.groups_processed:>7} {_fmt(seconds, 9, 2)} {_fmt(per_user, 8, 1)} "
+                + " ".join(_fmt(run.phase_seconds.get(phase), 10, 2) for phase in ResetRun.PHASES)
+                + f" {_fmt(run.peak_rss_mib, 8, 0)}"
+            )
+            style = self.style.ERROR if run.status == ResetRun.FAILED else str
+            self.stdout.write(style(line))
+
+        window = options['window_minutes'] * 60
+        finished = [run for run in runs if run.status == ResetRun.DONE and run.users_processed]
+        if not finished:
+            return
+        latest = finished[-1]
+        share = latest.duration_seconds / window
+        style = self.style.ERROR if share > 1 else self.style.WARNING if share > 0.5 else self.style.SUCCESS
+        self.stdout.write(style(
+            f"Latest finished reset: {latest.duration_seconds:.1f}s for {latest.users_processed} users, "
+            f"{share:.0%} of the {options['window_minutes']:g} minute window."
+        ))
+
+        fit = fit_line([(run.users_processed, run.duration_seconds) for run in finished])
+        if fit is None:
+            self.stdout.write("Need finished runs at two or more user counts to fit a trend.")
+            return
+        intercept, slope = fit
+        self.stdout.write(f"Trend: {intercept:.2f}s + {slope * 1e6:.1f} us per user.")
+        if slope <= 0:
+            self.stdout.write("Reset time is not growing with users over these runs.")
+        else:
+            limit = (window - intercept) / slope
+            self.stdout.write(
+                f"At this rate a reset outgrows the window at about {max(limit, 0):,.0f} users "
+                f"({limit / latest.users_processed:.1f}x the latest run)."
+            )
+
+
+def fit_line(points):
+    """Least-squares (intercept, slope) through [(x, y), ...]; None without two distinct x."""
+    n = len(points)
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    spread = sum((x - mean_x) ** 2 for x, _ in points)
+    if spread == 0:
+        return None
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in points) / spread
+    return mean_y - slope * mean_x, slope
+
+
+def _fmt(value, width, digits):
+    return f"{'-':>{width}}" if value is None else f"{value:>{width}.{digits}f}"
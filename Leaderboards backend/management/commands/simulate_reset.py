@@ -0,0 +1,59 @@
+# python manage.py simulate_reset --diff reset_diff.jsonl
+# leaderboards/management/commands/simulate_reset.py
+
+import json
+from datetime import date
+from django.core.management.base import BaseCommand
+from leaderboards.reset_simulation import simulate_reset, MOVES
+
+
+class Command(BaseCommand):
+    help = (
+        "Show what the next reset_leagues() would do (promotions, demotions, lockouts, new groups) "
+        "without writing anything."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--week-start',
+            type=date.fromisoformat,
+            default=None,
+            help='Cycle to simulate, YYYY-MM-DD (default: the cycle the next reset closes)',
+        )
+        parser.add_argument(
+            '--diff',
+            type=str,
+            default=None,
+            help='Stream a per-user JSONL diff to this file',
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Print the summary as JSON instead of a table',
+        )
+
+    def handle(self, *args, **options):
+        if options['diff']:
+            with open(options['diff'], "w") as diff_file:
+                summary = simulate_reset(options['week_start'], diff_file=diff_file)
+        else:
+            summary = simulate_reset(options['week_start'])
+
+        if options['json']:
+            self.stdout.write(json.dumps(summary, indent=4))
+            return
+
+        self.stdout.write(f"Reset of {summary['week_start']} (dry run, nothing written)")
+        self.stdout.write(f"  {'tier':<10}{'users':>9}" + "".join(f"{m:>12}" for m in MOVES) + f"{'gems':>8}{'new groups':>12}")
+        for league_name, counts in summary['tiers'].items():
+            self.stdout.write(
+                f"  {league_name:<10}{counts['users']:>9}"
+                + "".join(f"{counts[m]:>12}" for m in MOVES)
+                + f"{counts['gems']:>8}{summary['new_groups'].get(league_name, 0):>12}"
+            )
+        for league_name, groups in summary['new_groups'].items():
+            if league_name not in summary['tiers']:
+                self.stdout.write(f"  {league_name:<10}{'':>9}" + "".join(f"{'':>12}" for _ in MOVES) + f"{'':>8}{groups:>12}")
+        self.stdout.write(f"  Locked-out users whose exp_to_enter resets to 0: {summary['locked_out_reset']}")
+        if options['diff']:
+            self.stdout.write(self.style.SUCCESS(f"Per-user diff written to {options['diff']}"))
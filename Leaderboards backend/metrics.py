@@ -0,0 +1,175 @@
+# leaderboards/metrics.py
+
+import threading
+from bisect import bisect_left
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+TEXT_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class _CounterValue:
+    def __init__(self):
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self):
+        return self._value
+
+
+class _GaugeValue(_CounterValue):
+    def set(self, value):
+        with self._lock:
+            self._value = value
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+
+class _HistogramValue:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.bucket_counts = [0] * (len(buckets) + 1)  # the last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self.bucket_counts[bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.sum += value
+
+
+class Metric:
+    """
+    A named metric, optionally split by label values.
+    Metrics without labelnames can be used directly (counter.inc()); labelled ones go
+    through labels(endpoint="...") first.
+    """
+
+    kind = ""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def children(self):
+        """Returns [(labels dict, child), ...]."""
+        return [(dict(zip(self.labelnames, key)), child) for key, child in list(self._children.items())]
+
+    def clear(self):
+        with self._lock:
+            self._children.clear()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def __getattr__(self, attr):
+        # Unlabelled metrics forward inc()/set()/observe()/value to their single child.
+        if attr.startswith("_") or self.labelnames:
+            raise AttributeError(attr)
+        return getattr(self.labels(), attr)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterValue()
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeValue()
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, documentation, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, **kwargs)
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._get_or_create(Counter, name, documentation, labelnames=labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._get_or_create(Gauge, name, documentation, labelnames=labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, documentation, labelnames=labelnames, buckets=buckets)
+
+    def metrics(self):
+        return list(self._metrics.values())
+
+
+REGISTRY = MetricsRegistry()
+
+
+def render_text(registry=REGISTRY):
+    """The registry in the Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    for metric in sorted(registry.metrics(), key=lambda m: m.name):
+        lines.append(f"# HELP {metric.name} {_escape(metric.documentation, quotes=False)}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for labels, child in sorted(metric.children(), key=lambda item: sorted(item[0].items())):
+            if metric.kind != "histogram":
+                lines.append(f"{metric.name}{_labels(labels)} {_number(child.value)}")
+                continue
+            cumulative = 0
+            bounds = [_number(bound) for bound in child.buckets] + ["+Inf"]
+            for bound, count in zip(bounds, list(child.bucket_counts)):
+                cumulative += count
+                lines.append(f"{metric.name}_bucket{_labels(dict(labels, le=bound))} {cumulative}")
+            lines.append(f"{metric.name}_sum{_labels(labels)} {_number(child.sum)}")
+            lines.append(f"{metric.name}_count{_labels(labels)} {child.count}")
+    return "\n".join(lines) + "\n"
+
+
+def _escape(value, quotes=True):
+    value = str(value).replace("\\", "\\\\").replace("\n", "\\n")
+    return value.replace('"', '\\"') if quotes else value
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
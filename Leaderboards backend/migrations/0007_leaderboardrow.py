@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:38
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leaderboards', '0006_leagueresetcheckpoint'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardRow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveIntegerField()),
+                ('username', models.CharField(max_length=150)),
+                ('email', models.EmailField(max_length=254)),
+                ('exp_earned', models.IntegerField(default=0)),
+                ('league_name', models.CharField(max_length=100)),
+                ('week_start', models.DateField()),
+                ('league_group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='board_rows', to='leaderboards.leaguegroup')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('league_group', 'rank')},
+            },
+        ),
+    ]
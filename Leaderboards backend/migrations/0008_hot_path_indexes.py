@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leaderboards', '0007_leaderboardrow'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='leaguegroup',
+            index=models.Index(fields=['week_start', 'league'], name='leaguegroup_week_league_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userleagueplacement',
+            index=models.Index(fields=['league_group', '-exp_earned'], name='placement_group_exp_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:45
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_member_count(apps, schema_editor):
+    LeagueGroup = apps.get_model('leaderboards', 'LeagueGroup')
+    UserLeaguePlacement = apps.get_model('leaderboards', 'UserLeaguePlacement')
+    members = (
+        UserLeaguePlacement.objects
+        .filter(league_group=OuterRef('pk'))
+        .order_by()
+        .values('league_group')
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+    LeagueGroup.objects.update(member_count=Coalesce(Subquery(members), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leaderboards', '0008_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='leaguegroup',
+            name='member_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_member_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:22
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leaderboards', '0009_leaguegroup_member_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResetRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week_start', models.DateField()),
+                ('mode', models.CharField(choices=[('single', 'Single'), ('sharded', 'Sharded')], default='single', max_length=10)),
+                ('status', models.CharField(choices=[('running', 'Running'), ('done', 'Done'), ('failed', 'Failed'), ('skipped', 'Skipped')], default='running', max_length=10)),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('duration_seconds', models.FloatField(blank=True, null=True)),
+                ('phase_seconds', models.JSONField(blank=True, default=dict)),
+                ('locked_out_users', models.PositiveIntegerField(default=0)),
+                ('groups_processed', models.PositiveIntegerField(default=0)),
+                ('users_processed', models.PositiveIntegerField(default=0)),
+                ('new_groups', models.PositiveIntegerField(default=0)),
+                ('rows_deleted', models.PositiveIntegerField(default=0)),
+                ('tier_moves', models.JSONField(blank=True, default=dict)),
+                ('peak_rss_mib', models.FloatField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, default='')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['started_at'], name='leaderboard_started_1967f9_idx')],
+            },
+        ),
+    ]
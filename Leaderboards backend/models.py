@@ -1,7 +1,12 @@
 # leaderboards/models.py
 
-from django.db import models
+from django.db import connections, models
+from django.db.models import Count, F, OuterRef, Q, Subquery, Window
+from django.db.models.functions import Cast, Coalesce, CumeDist, RowNumber
 from django.conf import settings
+from django.utils import timezone
+
+from .ranking import BOARD_ORDER
 
 # Fixed set of leagues with their icons
 LEAGUES = [
@@ -43,21 +48,124 @@ class LeagueGroup(models.Model):
 
     league = models.ForeignKey(League, on_delete=models.CASCADE, related_name='groups')
     week_start = models.DateField()
+    # Placements in the group. Seats are claimed with a conditional UPDATE on this column
+    # (league_service.reserve_group_seat), so it can never pass LEAGUE_CAPACITY.
+    member_count = models.PositiveIntegerField(default=0)
     users = models.ManyToManyField(
         settings.AUTH_USER_MODEL, through="UserLeaguePlacement", related_name='league_groups'
     )
 
+    class Meta:
+        indexes = [
+            # Serves week_start alone (resets) and (league, week_start) (Bronze placement).
+            models.Index(fields=["week_start", "league"], name="leaguegroup_week_league_idx"),
+        ]
+
     def __str__(self):
         return f"{self.league.name} group starting {self.week_start}"
 
 
+class PlacementQuerySet(models.QuerySet):
+    """
+    Rank queries on placements, computed by the database.
+
+    with_rank() annotates every placement with
+      rank        position within its group in BOARD_ORDER: highest exp first, the lower
+                  user id on ties, as on the boards and in the weekly reset
+      group_size  members in the group
+      percentile  share of the group at or below this score, 1.0 for the leader
+    Narrow the queryset to whole groups before calling it: plain filters apply before the
+    ranking, so filtering out members changes everyone else's rank.
+    """
+
+    def with_rank(self):
+        if connections[self.db].features.supports_over_clause:
+            group = F("league_group_id")
+            return self.annotate(
+                rank=Window(RowNumber(), partition_by=group, order_by=list(BOARD_ORDER)),
+                group_size=Window(Count("id"), partition_by=group),
+                percentile=Window(CumeDist(), partition_by=group, order_by=F("exp_earned").asc()),
+            )
+        return self._with_rank_subqueries()
+
+    def _with_rank_subqueries(self):
+        # Same numbers from correlated COUNT subqueries, for SQLite builds without window
+        # functions (before 3.25). Each counts the group's members around one placement,
+        # so unlike the windows they stay right on a queryset filtered to some members.
+        def count_in_group(condition=Q()):
+            # No matching rows yields NULL, not 0.
+            return Coalesce(Subquery(
+                self.model.objects
+                .filter(condition, league_group_id=OuterRef("league_group_id"))
+                .order_by()
+                .values("league_group_id")
+                .annotate(total=Count("id"))
+                .values("total"),
+                output_field=models.IntegerField(),
+            ), 0)
+
+        ahead = Q(exp_earned__gt=OuterRef("exp_earned")) | Q(
+            exp_earned=OuterRef("exp_earned"), user_id__lt=OuterRef("user_id")
+        )
+        return self.annotate(
+            rank=count_in_group(ahead) + 1,
+            group_size=count_in_group(),
+        ).annotate(
+            percentile=Cast(count_in_group(Q(exp_earned__lte=OuterRef("exp_earned"))), models.FloatField())
+            / Cast(F("group_size"), models.FloatField()),
+        )
+
+    def in_group_of(self, user, week_start):
+        """The placements of the group user is in for week_start (one subquery, no extra round trip)."""
+        return self.filter(
+            league_group_id=Subquery(
+                self.model.objects
+                .filter(user=user, league_group__week_start=week_start)
+                .values("league_group_id")[:1]
+            )
+        )
+
+    def top(self, n):
+        """The best n ranks of each group in the queryset."""
+        return self.with_rank().filter(rank__lte=n).order_by("league_group_id", "rank")
+
+    def board_of(self, user, week_start):
+        """user's whole group, ranked, in one query: a list best first."""
+        return list(self.in_group_of(user, week_start).with_rank().order_by("rank"))
+
+    def rank_of(self, user, week_start):
+        """user's ranked placement for week_start, or None. One row is read, not the board."""
+        return self.filter(user=user, league_group__week_start=week_start)._with_rank_subqueries().first()
+
+    def around(self, user, week_start, k):
+        """user's ranked placement with up to k neighbours on each side, best first, in one query."""
+        mine = Subquery(
+            self.model.objects
+            .filter(user=user, league_group__week_start=week_start)
+            ._with_rank_subqueries()
+            .values("rank")[:1]
+        )
+        return list(
+            self.in_group_of(user, week_start).with_rank()
+            .filter(rank__gte=mine - k, rank__lte=mine + k)
+            .order_by("rank")
+        )
+
+
 class UserLeaguePlacement(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='league_placements')
     league_group = models.ForeignKey(LeagueGroup, on_delete=models.CASCADE, related_name='placements')
     exp_earned = models.IntegerField(default=0)  # Experience earned this league period
 
+    objects = PlacementQuerySet.as_manager()
+
     class Meta:
+        # The unique constraint doubles as the (user, league_group) index.
         unique_together = ("user", "league_group")
+        indexes = [
+            # A group's members in board order, without a sort.
+            models.Index(fields=["league_group", "-exp_earned"], name="placement_group_exp_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user.username} in {self.league_group.league.name} with {self.exp_earned} exp"
@@ -73,4 +181,129 @@ class UserWeeklyOutcome(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f"{self.user.username} outcome {self.created_at}"
\ No newline at end of file
+        return f"{self.user.username} outcome {self.created_at}"
+
+class LeagueResetCheckpoint(models.Model):
+    """
+    Progress of one tier's shard of a weekly reset.
+    Lets a failed run resume without reprocessing the groups it already finished.
+    """
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    week_start = models.DateField()  # week_start of the cycle being closed
+    league_name = models.CharField(max_length=100)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    last_group_id = models.BigIntegerField(default=0)  # highest old LeagueGroup id already processed
+    groups_done = models.PositiveIntegerField(default=0)
+    users_done = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, default="")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("week_start", "league_name")
+
+    def __str__(self):
+        return f"{self.league_name} reset of {self.week_start}: {self.status}"
+
+
+class ResetPoolEntry(models.Model):
+    """
+    A user waiting for a new group during a sharded reset. Each tier's shard stages the
+    users it sends into a league here; the reset's last step then deals everyone staged
+    for a league into its new groups at once, whichever tier they came from.
+    """
+
+    week_start = models.DateField()  # week_start of the cycle being closed
+    league_name = models.CharField(max_length=100)  # league the user moves into
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    exp_earned = models.IntegerField()  # in the cycle being closed; the new groups are dealt by it
+
+    class Meta:
+        unique_together = ("week_start", "user")
+        indexes = [
+            models.Index(fields=["week_start", "league_name", "-exp_earned", "user"], name="resetpool_deal_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} -> {self.league_name} after {self.week_start}"
+
+
+class ResetRun(models.Model):
+    """
+    One weekly reset as it ran, written by reset_leagues() and the sharded reset.
+    Phase timings are summed over shards, so with parallel shards they can exceed the
+    wall-clock duration_seconds. `manage.py reset_trends` reports on these rows.
+    """
+
+    SINGLE = "single"
+    SHARDED = "sharded"
+    MODE_CHOICES = [
+        (SINGLE, "Single"),
+        (SHARDED, "Sharded"),
+    ]
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    SKIPPED = "skipped"
+    STATUS_CHOICES = [
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+        (SKIPPED, "Skipped"),  # no groups in the closing cycle
+    ]
+    # locked-out pass, group processing (planning), assignment, outcome writes, old-group deletion
+    PHASES = ("locked_out", "plan", "assignment", "outcomes", "delete")
+
+    week_start = models.DateField()  # week_start of the cycle being closed
+    mode = models.CharField(max_length=10, choices=MODE_CHOICES, default=SINGLE)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=RUNNING)
+    started_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    duration_seconds = models.FloatField(null=True, blank=True)
+    phase_seconds = models.JSONField(default=dict, blank=True)  # {phase: seconds}
+    locked_out_users = models.PositiveIntegerField(default=0)
+    groups_processed = models.PositiveIntegerField(default=0)
+    users_processed = models.PositiveIntegerField(default=0)
+    new_groups = models.PositiveIntegerField(default=0)
+    rows_deleted = models.PositiveIntegerField(default=0)
+    tier_moves = models.JSONField(default=dict, blank=True)  # {old league: {"up": n, "down": n, "stay": n, "locked_out": n}}
+    peak_rss_mib = models.FloatField(null=True, blank=True)  # high-water mark of the processes that ran it
+    error = models.TextField(blank=True, default="")
+
+    class Meta:
+        indexes = [models.Index(fields=["started_at"])]
+
+    def __str__(self):
+        return f"{self.mode} reset of {self.week_start} started {self.started_at:%Y-%m-%d %H:%M}: {self.status}"
+
+
+class LeaderboardRow(models.Model):
+    """
+    Denormalized, ranked copy of a LeagueGroup's board: one row per member.
+    Kept up to date by leaderboard_rows.py; `manage.py rebuild_leaderboard_rows` recreates it.
+    """
+
+    league_group = models.ForeignKey(LeagueGroup, on_delete=models.CASCADE, related_name='board_rows')
+    rank = models.PositiveIntegerField()
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    username = models.CharField(max_length=150)
+    email = models.EmailField()
+    exp_earned = models.IntegerField(default=0)
+    league_name = models.CharField(max_length=100)
+    week_start = models.DateField()
+
+    class Meta:
+        unique_together = ("league_group", "rank")
+
+    def __str__(self):
+        return f"#{self.rank} {self.username} in {self.league_name} with {self.exp_earned} exp"
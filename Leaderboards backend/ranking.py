@@ -0,0 +1,221 @@
+# leaderboards/ranking.py
+
+import logging
+import threading
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    import redis
+except ImportError:  # only needed when LEADERBOARD_RANKING_BACKEND = "redis"
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+# The one board order: highest exp first, the lower user id on ties. Every store, the
+# read model and the weekly reset rank by it, so the promoted are the displayed top 7.
+BOARD_ORDER = ("-exp_earned", "user_id")
+
+
+class RankingStore:
+    """
+    Scores of the members of each LeagueGroup, kept sorted in BOARD_ORDER.
+    Ranks are 1-based with the highest score first; members are user ids.
+    shared is True when every process reads and writes the same copy.
+    """
+
+    shared = False
+
+    def has_group(self, league_group_id):
+        raise NotImplementedError
+
+    def load_group(self, league_group_id, scores):
+        """Replaces a group's contents with an iterable of (member_id, score)."""
+        raise NotImplementedError
+
+    def set_score(self, league_group_id, member_id, score):
+        raise NotImplementedError
+
+    def incr(self, league_group_id, member_id, delta):
+        """Adds delta to a member's score and returns the new score."""
+        raise NotImplementedError
+
+    def rank(self, league_group_id, member_id):
+        """Returns the member's rank, or None if the member is not in the group."""
+        raise NotImplementedError
+
+    def top(self, league_group_id, k=None):
+        """Returns [(member_id, score), ...] for the k best members, or all of them."""
+        raise NotImplementedError
+
+    def drop_groups(self, league_group_ids):
+        raise NotImplementedError
+
+
+class InMemoryRankingStore(RankingStore):
+    """
+    Process-local store backed by one bisect-sorted array per group.
+    Fine for tests and single-process setups; boards are ranked from the database
+    while it is configured. Use Redis to serve them from the store.
+    """
+
+    def __init__(self):
+        self._groups = {}  # league_group_id -> (member_id -> score, sorted [(-score, member_id)])
+        self._lock = threading.Lock()
+
+    def has_group(self, league_group_id):
+        return league_group_id in self._groups
+
+    def load_group(self, league_group_id, scores):
+        scores = dict(scores)
+        order = sorted((-score, member_id) for member_id, score in scores.items())
+        with self._lock:
+            self._groups[league_group_id] = (scores, order)
+
+    def set_score(self, league_group_id, member_id, score):
+        with self._lock:
+            scores, order = self._groups.setdefault(league_group_id, ({}, []))
+            self._move(scores, order, member_id, score)
+
+    def incr(self, league_group_id, member_id, delta):
+        with self._lock:
+            scores, order = self._groups.setdefault(league_group_id, ({}, []))
+            score = scores.get(member_id, 0) + delta
+            self._move(scores, order, member_id, score)
+            return score
+
+    def rank(self, league_group_id, member_id):
+        scores, order = self._groups.get(league_group_id, ({}, []))
+        if member_id not in scores:
+            return None
+        return bisect_left(order, (-scores[member_id], member_id)) + 1
+
+    def top(self, league_group_id, k=None):
+        _, order = self._groups.get(league_group_id, ({}, []))
+        return [(member_id, -neg_score) for neg_score, member_id in order[:k]]
+
+    def drop_groups(self, league_group_ids):
+        with self._lock:
+            for league_group_id in league_group_ids:
+                self._groups.pop(league_group_id, None)
+
+    @staticmethod
+    def _move(scores, order, member_id, score):
+        if member_id in scores:
+            del order[bisect_left(order, (-scores[member_id], member_id))]
+        scores[member_id] = score
+        insort(order, (-score, member_id))
+
+
+class RedisRankingStore(RankingStore):
+    """
+    One Redis sorted set per group: ZINCRBY, ZREVRANK and ZREVRANGE.
+
+    Redis breaks score ties by member, last member first in ZREVRANGE, so the user id
+    is folded into the stored score instead: exp * 2**32 - user_id. The lower id then
+    ranks first, and doubles keep that exact while exp stays under 2**21.
+    """
+
+    TIE_BITS = 32
+    shared = True
+
+    def __init__(self, url, key_prefix="leaderboards:rank:"):
+        if redis is None:
+            raise ImproperlyConfigured("The redis package is required for the Redis ranking backend.")
+        self._redis = redis.Redis.from_url(url)
+        self._key_prefix = key_prefix
+
+    def _key(self, league_group_id):
+        return f"{self._key_prefix}{league_group_id}"
+
+    def has_group(self, league_group_id):
+        return bool(self._redis.exists(self._key(league_group_id)))
+
+    def _encode(self, member_id, score):
+        return (score << self.TIE_BITS) - member_id
+
+    def _decode(self, member_id, stored):
+        return (int(stored) + int(member_id)) >> self.TIE_BITS
+
+    def load_group(self, league_group_id, scores):
+        key = self._key(league_group_id)
+        mapping = {member_id: self._encode(member_id, score) for member_id, score in scores}
+        pipe = self._redis.pipeline(transaction=True)
+        pipe.delete(key)
+        if mapping:
+            pipe.zadd(key, mapping)
+        pipe.execute()
+
+    def set_score(self, league_group_id, member_id, score):
+        self._redis.zadd(self._key(league_group_id), {member_id: self._encode(member_id, score)})
+
+    def incr(self, league_group_id, member_id, delta):
+        key = self._key(league_group_id)
+        pipe = self._redis.pipeline(transaction=True)
+        pipe.zadd(key, {member_id: self._encode(member_id, 0)}, nx=True)  # a new member starts on 0
+        pipe.zincrby(key, delta << self.TIE_BITS, member_id)
+        return self._decode(member_id, pipe.execute()[-1])
+
+    def rank(self, league_group_id, member_id):
+        rank = self._redis.zrevrank(self._key(league_group_id), member_id)
+        return None if rank is None else rank + 1
+
+    def top(self, league_group_id, k=None):
+        end = -1 if k is None else k - 1
+        rows = self._redis.zrevrange(self._key(league_group_id), 0, end, withscores=True)
+        return [(int(member_id), self._decode(member_id, stored)) for member_id, stored in rows]
+
+    def drop_groups(self, league_group_ids):
+        keys = [self._key(league_group_id) for league_group_id in league_group_ids]
+        if keys:
+            self._redis.delete(*keys)
+
+
+_store = None
+
+
+def get_ranking_store():
+    """
+    Returns the configured store. settings.LEADERBOARD_RANKING_BACKEND is "memory"
+    (default) or "redis", the latter reading settings.LEADERBOARD_RANKING_REDIS_URL.
+    """
+    global _store
+    if _store is None:
+        backend = getattr(settings, "LEADERBOARD_RANKING_BACKEND", "memory")
+        if backend == "redis":
+            _store = RedisRankingStore(settings.LEADERBOARD_RANKING_REDIS_URL)
+        elif backend == "memory":
+            _store = InMemoryRankingStore()
+        else:
+            raise ImproperlyConfigured(f"Unknown LEADERBOARD_RANKING_BACKEND {backend!r}.")
+    return _store
+
+
+def ranked_group(league_group_id, load_scores, members=None):
+    """
+    Returns [(user_id, exp_earned), ...] for a group, best first.
+
+    load_scores() returns {user_id: exp_earned} as the caller read it from the database.
+    A shared store serves the ranking and only calls it to load a group it does not hold
+    (a cold start); writes keep a loaded group current and reconcile_rankings repairs one
+    whose scores drifted. members, when given, are the user ids the caller knows to be in
+    the group; a store that holds other members missed a join or a leave and is reloaded.
+
+    A process-local store only sees the writes of its own process, so its copy of a group
+    may be older than the database; without a shared store the scores are ranked here.
+    """
+    store = get_ranking_store()
+    if not store.shared:
+        return sorted(load_scores().items(), key=lambda member: (-member[1], member[0]))  # BOARD_ORDER
+    ranked = store.top(league_group_id) if store.has_group(league_group_id) else None
+    if ranked is not None and members is not None and (
+        len(ranked) != len(members) or not all(user_id in members for user_id, _ in ranked)
+    ):
+        logger.warning(f"[ranking] group {league_group_id} has other members than the DB, reloading.")
+        ranked = None
+    if ranked is None:
+        store.load_group(league_group_id, load_scores().items())
+        ranked = store.top(league_group_id)
+    return ranked
@@ -0,0 +1,123 @@
+# leaderboards/reset_simulation.py
+
+import json
+import logging
+from collections import Counter
+from contextlib import contextmanager
+
+from django.db import connection, transaction
+
+from .league_service import (
+    build_reset_plan,
+    get_league_map,
+    get_previous_monday_0001_utc,
+    ResetPlan,
+    DIAMOND_GEM_REWARD,
+    EXP_TO_REJOIN,
+    LEAGUE_CAPACITY,
+    RESET_SHARD_GROUPS,
+)
+from .models import LeagueGroup
+from accounts.models import CustomUser
+
+logger = logging.getLogger(__name__)
+
+MOVES = ("promoted", "stayed", "demoted", "locked_out")
+
+
+@contextmanager
+def read_only_snapshot():
+    """
+    One transaction that sees a single point in time and is rolled back at the end.
+    On PostgreSQL it is REPEATABLE READ, READ ONLY, so the chunked reads of a simulation
+    agree with each other and a stray write fails loudly.
+    """
+    outermost = not connection.in_atomic_block
+    with transaction.atomic():
+        if outermost and connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+        yield
+        transaction.set_rollback(True)
+
+
+def simulate_reset(week_start=None, diff_file=None, chunk_groups=RESET_SHARD_GROUPS):
+    """
+    Plans the reset of week_start (default: the cycle a reset would close now) without
+    writing anything, and returns a summary:
+
+        {"week_start": "2025-01-06",
+         "tiers": {"Gold": {"users": 90, "promoted": 21, "stayed": 48, "demoted": 21,
+                            "locked_out": 0, "gems": 0}, ...},
+         "new_groups": {"Gold": 3, ...},
+         "locked_out_reset": 12}
+
+    Groups are planned chunk_groups at a time and each plan is dropped once counted, so
+    memory stays flat however many users there are. With diff_file (a text file), one
+    JSON line per user is streamed to it: user_id, old_league, finished_rank,
+    new_league, move, gems, exp_to_enter.
+    """
+    if week_start is None:
+        week_start = get_previous_monday_0001_utc().date()
+    league_map = get_league_map()
+
+    tiers = {name: dict.fromkeys(("users", *MOVES, "gems"), 0) for name in league_map}
+    incoming = Counter()
+
+    with read_only_snapshot():
+        locked_out_reset = CustomUser.objects.filter(current_league="", exp_to_enter__lt=EXP_TO_REJOIN).count()
+        group_ids = (
+            LeagueGroup.objects.filter(week_start=week_start)
+            .order_by("id")
+            .values_list("id", flat=True)
+            .iterator(chunk_size=chunk_groups)
+        )
+        chunk = []
+        for league_group_id in group_ids:
+            chunk.append(league_group_id)
+            if len(chunk) == chunk_groups:
+                _simulate_chunk(chunk, league_map, tiers, incoming, diff_file)
+                chunk = []
+        if chunk:
+            _simulate_chunk(chunk, league_map, tiers, incoming, diff_file)
+
+    summary = {
+        "week_start": week_start.isoformat(),
+        "tiers": {name: counts for name, counts in tiers.items() if counts["users"]},
+        "new_groups": {name: -(-incoming[name] // LEAGUE_CAPACITY) for name in league_map if incoming[name]},
+        "locked_out_reset": locked_out_reset,
+    }
+    logger.info(f"[simulate_reset] {summary}")
+    return summary
+
+
+def _simulate_chunk(group_ids, league_map, tiers, incoming, diff_file):
+    plan = build_reset_plan(LeagueGroup.objects.filter(id__in=group_ids), league_map)
+
+    # Both resets deal each league's new groups once, from everyone moving into it.
+    for league_name, pool in zip(plan.tiers, plan.pools):
+        incoming[league_name] += len(pool)
+
+    for user_id, finished_rank, old_league, new_league, flags in plan.rows():
+        move = _move(league_map, old_league, new_league)
+        counts = tiers[old_league]
+        counts["users"] += 1
+        counts[move] += 1
+        counts["gems"] += bool(flags & ResetPlan.GEM)
+        if diff_file is not None:
+            diff_file.write(json.dumps({
+                "user_id": user_id,
+                "old_league": old_league,
+                "finished_rank": finished_rank,
+                "new_league": new_league,
+                "move": move,
+                "gems": DIAMOND_GEM_REWARD if flags & ResetPlan.GEM else 0,
+                "exp_to_enter": EXP_TO_REJOIN if flags & ResetPlan.REJOIN else None,
+            }) + "\n")
+
+
+def _move(league_map, old_league, new_league):
+    if not new_league:
+        return "locked_out"
+    order = league_map.position(new_league) - league_map.position(old_league)
+    return "promoted" if order > 0 else "demoted" if order < 0 else "stayed"
@@ -0,0 +1,155 @@
+# leaderboards/reset_telemetry.py
+
+import logging
+import sys
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import DatabaseError, transaction
+from django.utils.timezone import now
+
+from .models import ResetRun
+
+try:
+    import resource
+except ImportError:  # not on Windows; peak memory is left empty there
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+_active = ContextVar("leaderboards_reset_recorder", default=None)
+
+
+def max_rss_mib():
+    """This process's peak resident set size so far, or None where it cannot be read."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 2**20 if sys.platform == "darwin" else rss / 1024  # bytes on macOS, KiB elsewhere
+
+
+class ResetRecorder:
+    """
+    Accumulates what a reset (or one shard of it) did, until flush() adds it to its ResetRun.
+    While recording() it, reset_phase() and the record_*() helpers feed it. Counts made
+    inside a recorded_atomic() block are dropped again if that block rolls back; phase
+    times are kept, since the time was spent either way.
+    """
+
+    def __init__(self, run_id):
+        self.run_id = run_id
+        self._clear()
+
+    def _clear(self):
+        self.phase_seconds = defaultdict(float)
+        self.counts = Counter()
+        self.tier_moves = defaultdict(Counter)
+
+    def add_plan(self, plan):
+        """Counts a ResetPlan's users and new groups, and its moves per old tier."""
+        self.counts["users_processed"] += len(plan)
+        self.counts["new_groups"] += len(plan.new_groups)
+        for (old, new), users in Counter(zip(plan.old_tier, plan.new_tier)).items():
+            if new == plan.LOCKED_OUT_TIER:
+                move = "locked_out"
+            else:
+                move = "up" if new > old else "down" if new < old else "stay"
+            self.tier_moves[plan.tiers[old]][move] += users
+
+    def flush(self, status=None, error=""):
+        """
+        Adds what was recorded since the last flush to the run, under a row lock so
+        shards can flush concurrently. A status finishes the run; a failure is kept
+        even if later shards flush DONE.
+        """
+        with transaction.atomic():
+            run = ResetRun.objects.select_for_update().get(pk=self.run_id)
+            for phase, seconds in self.phase_seconds.items():
+                run.phase_seconds[phase] = round(run.phase_seconds.get(phase, 0) + seconds, 4)
+            for field, value in self.counts.items():
+                setattr(run, field, getattr(run, field) + value)
+            for league_name, moves in self.tier_moves.items():
+                merged = Counter(run.tier_moves.get(league_name, {}))
+                merged.update(moves)
+                run.tier_moves[league_name] = dict(merged)
+            peak = max_rss_mib()
+            if peak is not None:
+                run.peak_rss_mib = round(max(run.peak_rss_mib or 0, peak), 1)
+            if status is not None and (status == ResetRun.FAILED or run.status != ResetRun.FAILED):
+                run.status = status
+                run.finished_at = now()
+                run.duration_seconds = round((run.finished_at - run.started_at).total_seconds(), 4)
+            if error and error not in run.error:
+                run.error = "\n".join(filter(None, (run.error, error)))
+            run.save()
+        self._clear()
+
+    def fail(self, exc):
+        """
+        flush(FAILED) with the error; only logged when the database itself is what failed.
+        Only what committed before the failure is counted (see recorded_atomic()).
+        """
+        try:
+            self.flush(ResetRun.FAILED, error=f"{type(exc).__name__}: {exc}")
+        except DatabaseError:
+            logger.exception(f"[reset_telemetry] could not record the failure of reset run {self.run_id}")
+
+
+@contextmanager
+def recording(recorder):
+    token = _active.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _active.reset(token)
+
+
+@contextmanager
+def recorded_atomic():
+    """
+    transaction.atomic() for reset work: if the block rolls back, the counts and tier
+    moves recorded inside it are taken back out of the active recorder, so a failed run
+    only reports what it committed.
+    """
+    recorder = _active.get()
+    if recorder is None:
+        with transaction.atomic():
+            yield
+        return
+    counts = recorder.counts.copy()
+    tier_moves = {league_name: moves.copy() for league_name, moves in recorder.tier_moves.items()}
+    try:
+        with transaction.atomic():
+            yield
+    except BaseException:
+        recorder.counts = counts
+        recorder.tier_moves = defaultdict(Counter, tier_moves)
+        raise
+
+
+@contextmanager
+def reset_phase(name):
+    """Adds the time spent inside to the active recorder's phase; does nothing without one."""
+    recorder = _active.get()
+    if recorder is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        recorder.phase_seconds[name] += time.perf_counter() - started
+
+
+def record_count(name, value):
+    recorder = _active.get()
+    if recorder is not None:
+        recorder.counts[name] += value
+
+
+def record_plan(plan):
+    recorder = _active.get()
+    if recorder is not None:
+        recorder.add_plan(plan)
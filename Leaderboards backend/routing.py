@@ -0,0 +1,9 @@
+# leaderboards/routing.py
+
+from django.urls import path
+from .consumers import LeaderboardConsumer
+
+
+websocket_urlpatterns = [
+    path("ws/leaderboards/current-league/", LeaderboardConsumer.as_asgi()),
+]
@@ -1,7 +1,7 @@
 # leaderboards/serializers.py
 
 from rest_framework import serializers
-from .models import UserLeaguePlacement, League, LeagueGroup
+from .models import LeaderboardRow, UserLeaguePlacement, League, LeagueGroup
 from accounts.models import CustomUser
 
 
@@ -23,6 +23,32 @@ class UserPlacementSerializer(serializers.ModelSerializer):
         return self.context.get("rank", None)
 
 
+class LeaderboardRowSerializer(serializers.ModelSerializer):
+    """Same output as UserPlacementSerializer, read from the denormalized row."""
+
+    user = serializers.SerializerMethodField()
+
+    class Meta:
+        model = LeaderboardRow
+        fields = ["user", "exp_earned", "rank"]
+
+    def get_user(self, obj):
+        return {"username": obj.username, "email": obj.email}
+
+
+# Plain-dict path for leaderboard payloads: the same output as LeaderboardRowSerializer,
+# built from .values_list(*LEADERBOARD_ROW_COLUMNS) without a serializer per row.
+LEADERBOARD_ROW_COLUMNS = ("username", "email", "exp_earned", "rank")
+
+
+def leaderboard_row_dicts(rows):
+    """[(username, email, exp_earned, rank), ...] -> rows as LeaderboardRowSerializer renders them."""
+    return [
+        {"user": {"username": username, "email": email}, "exp_earned": exp_earned, "rank": rank}
+        for username, email, exp_earned, rank in rows
+    ]
+
+
 class LeagueSerializer(serializers.ModelSerializer):
     class Meta:
         model = League
@@ -0,0 +1,51 @@
+# leaderboards/signals.py
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .leaderboard_cache import invalidate_group_snapshot
+from .leaderboard_rows import refresh_group_rows
+from .league_catalog import invalidate_league_catalog
+from .models import League, LeaderboardRow, UserLeaguePlacement
+from .ranking import get_ranking_store
+
+
+# Only post_save: a post_delete receiver would stop Django from fast-deleting the
+# placements of old groups during a reset. Snapshots of deleted groups just expire.
+@receiver(post_save, sender=UserLeaguePlacement)
+def placement_saved(sender, instance, **kwargs):
+    store = get_ranking_store()
+    if store.has_group(instance.league_group_id):
+        store.set_score(instance.league_group_id, instance.user_id, instance.exp_earned)
+
+    refresh_group_rows(instance.league_group_id)
+    # After commit: a read in between would otherwise cache the old board under the
+    # new group version, and keep serving it until the next change.
+    league_group_id = instance.league_group_id
+    transaction.on_commit(lambda: invalidate_group_snapshot(league_group_id))
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    # LeaderboardRow copies username and email; follow renames into the boards showing them.
+    if created or (update_fields is not None and not {"username", "email"} & set(update_fields)):
+        return
+    stale = LeaderboardRow.objects.filter(user_id=instance.pk).exclude(
+        username=instance.username, email=instance.email
+    )
+    group_ids = list(stale.values_list("league_group_id", flat=True))
+    if group_ids:
+        stale.update(username=instance.username, email=instance.email)
+        for league_group_id in group_ids:
+            transaction.on_commit(lambda gid=league_group_id: invalidate_group_snapshot(gid))
+
+
+@receiver(post_save, sender=League)
+@receiver(post_delete, sender=League)
+def league_changed(sender, instance, **kwargs):
+    # Now, so this process sees its own write, and again after commit, so no process
+    # keeps a catalog it loaded before the write was visible.
+    invalidate_league_catalog()
+    transaction.on_commit(invalidate_league_catalog)
@@ -0,0 +1,54 @@
+# leaderboards/tests/test_benchmark_reset_suite.py
+
+import json
+import os
+import tempfile
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from leaderboards.models import LeagueGroup, UserLeaguePlacement
+from leaderboards.management.commands.benchmark_reset_suite import compare_results
+
+
+class BenchmarkResetSuiteTest(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def _path(self, name):
+        return os.path.join(self.dir, name)
+
+    def test_run_records_every_phase_and_rolls_back(self):
+        call_command(
+            "benchmark_reset_suite", "--scales", "300", "--newcomers", "5",
+            "--output", self._path("run.json"), stdout=open(os.devnull, "w"),
+        )
+        with open(self._path("run.json")) as f:
+            run = json.load(f)["runs"]["300"]
+
+        self.assertEqual(set(run), {"seed", "place_new_user_in_bronze", "reset_leagues"})
+        self.assertGreater(run["seed"]["rows_written"], 300)
+        self.assertGreater(run["reset_leagues"]["queries"], 0)
+        self.assertFalse(LeagueGroup.objects.exists())
+        self.assertFalse(UserLeaguePlacement.objects.exists())
+
+    def test_compare_flags_growth_and_changed_writes(self):
+        phase = {"wall_seconds": 1.0, "queries": 100, "rows_written": 50, "peak_rss_mib": 80.0, "rss_growth_mib": 10.0}
+        baseline = {"runs": {"1000": {"reset_leagues": phase}}}
+        same = {"runs": {"1000": {"reset_leagues": dict(phase, wall_seconds=1.1)}}}
+        worse = {"runs": {"1000": {"reset_leagues": dict(phase, queries=130, rows_written=51)}}}
+
+        self.assertEqual(compare_results(baseline, same, 0.2), [])
+        self.assertEqual(compare_results(baseline, worse, 0.2), [
+            "1000 users, reset_leagues: queries 100 -> 130",
+            "1000 users, reset_leagues: rows_written 50 -> 51 (changed)",
+        ])
+
+        for name, results in (("base.json", baseline), ("worse.json", worse)):
+            with open(self._path(name), "w") as f:
+                json.dump(results, f)
+        with self.assertRaises(CommandError):
+            call_command(
+                "benchmark_reset_suite", "--compare", self._path("base.json"), self._path("worse.json"),
+                stdout=open(os.devnull, "w"),
+            )
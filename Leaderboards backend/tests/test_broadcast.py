@@ -0,0 +1,94 @@
+# leaderboards/tests/test_broadcast.py
+
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from accounts.models import CustomUser
+from leaderboards.broadcast import (
+    broadcasts_emitted,
+    broadcasts_suppressed,
+    emit_group_broadcast,
+    emit_group_broadcast_task,
+    group_channel_name,
+    group_snapshot_message,
+    mark_group_dirty,
+    publish_group_delta,
+)
+from leaderboards.models import League, LeagueGroup, UserLeaguePlacement
+from leaderboards.league_service import get_previous_monday_0001_utc
+
+
+@override_settings(CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}})
+class GroupDeltaBroadcastTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        league = League.objects.create(name="Gold", icon="league_icons/default.png", order=2)
+        self.group = LeagueGroup.objects.create(league=league, week_start=get_previous_monday_0001_utc().date())
+        self.users = [CustomUser.objects.create_user(email=f"ws{i}@example.com") for i in range(3)]
+        for i, user in enumerate(self.users):
+            UserLeaguePlacement.objects.create(user=user, league_group=self.group, exp_earned=(3 - i) * 10)
+
+        self.layer = get_channel_layer()
+        self.channel = async_to_sync(self.layer.new_channel)()
+        async_to_sync(self.layer.group_add)(group_channel_name(self.group.id), self.channel)
+
+    def _receive(self):
+        return async_to_sync(self.layer.receive)(self.channel)
+
+    def test_only_changed_rows_are_sent_with_consecutive_seq(self):
+        first = publish_group_delta(self.group.id)
+        self.assertEqual(self._receive(), first)
+        self.assertEqual(first["seq"], 1)
+        self.assertEqual(len(first["changes"]), 3)
+        self.assertEqual(first["joined"][0], [self.users[0].id, "ws0"])
+
+        self.assertIsNone(publish_group_delta(self.group.id))
+
+        placement = UserLeaguePlacement.objects.get(user=self.users[2])
+        placement.exp_earned = 25
+        placement.save()
+        second = self._receive() if publish_group_delta(self.group.id) else None
+        self.assertEqual(second["seq"], 2)
+        self.assertEqual(second["joined"], [])
+        # ws2 overtakes ws1: both ranks move, ws0 is untouched.
+        self.assertEqual(
+            sorted(second["changes"]),
+            sorted([[self.users[2].id, 2, 25], [self.users[1].id, 3, 20]]),
+        )
+        self.assertNotIn("email", str(second))
+
+    def test_snapshot_carries_current_seq_for_resync(self):
+        publish_group_delta(self.group.id)
+        snapshot = group_snapshot_message(self.group.id)
+        self.assertEqual(snapshot["seq"], 1)
+        self.assertEqual(snapshot["rows"][0], [self.users[0].id, "ws0", 1, 30])
+
+
+@override_settings(CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}})
+class BroadcastSchedulerTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        league = League.objects.create(name="Gold", icon="league_icons/default.png", order=2)
+        self.group = LeagueGroup.objects.create(league=league, week_start=get_previous_monday_0001_utc().date())
+        user = CustomUser.objects.create_user(email="burst@example.com")
+        UserLeaguePlacement.objects.create(user=user, league_group=self.group, exp_earned=1)
+
+    def test_burst_of_marks_yields_one_broadcast_per_window(self):
+        suppressed_before = broadcasts_suppressed.value
+        emitted_before = broadcasts_emitted.value
+
+        with mock.patch.object(emit_group_broadcast_task, "apply_async") as schedule:
+            for _ in range(30):
+                mark_group_dirty(self.group.id)
+            schedule.assert_called_once_with((self.group.id,), countdown=0.25)
+            self.assertEqual(broadcasts_suppressed.value - suppressed_before, 29)
+
+            self.assertIsNotNone(emit_group_broadcast(self.group.id))
+            self.assertEqual(broadcasts_emitted.value - emitted_before, 1)
+
+            # The window closed with the emit, so the next change schedules again.
+            mark_group_dirty(self.group.id)
+            self.assertEqual(schedule.call_count, 2)
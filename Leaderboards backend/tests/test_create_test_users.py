@@ -0,0 +1,56 @@
+# leaderboards/tests/test_create_test_users.py
+
+import json
+import os
+import tempfile
+
+from django.contrib.auth.hashers import check_password
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from accounts.models import CustomUser
+from leaderboards.models import League, LeaderboardRow, LeagueGroup, UserLeaguePlacement
+from leaderboards.league_service import LEAGUE_CAPACITY, LEAGUES_ORDER
+
+
+class CreateTestUsersTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        for i, name in enumerate(LEAGUES_ORDER):
+            League.objects.create(name=name, icon="league_icons/default.png", order=i)
+        self.path = os.path.join(tempfile.mkdtemp(), "users.json")
+
+    def _run(self, *args):
+        call_command(
+            "create_test_users", "--count", "200", "--seed", "7", "--batch-size", "45",
+            "--json-file", self.path, *args, stdout=open(os.devnull, "w"),
+        )
+        with open(self.path) as f:
+            return json.load(f)
+
+    def test_places_everyone_in_ranked_groups(self):
+        created = self._run("--tiers", "pyramid", "--xp", "pareto")
+
+        self.assertEqual(len(created), 200)
+        self.assertEqual(UserLeaguePlacement.objects.count(), 200)
+        self.assertEqual(LeaderboardRow.objects.count(), 200)
+        self.assertTrue(check_password("123", CustomUser.objects.get(email="user0@test.com").password))
+        for group in LeagueGroup.objects.select_related("league"):
+            placements = list(
+                UserLeaguePlacement.objects.filter(league_group=group)
+                .order_by("-exp_earned", "user_id")
+                .values_list("user_id", "exp_earned", "user__current_league")
+            )
+            self.assertEqual(group.member_count, len(placements))
+            self.assertLessEqual(len(placements), LEAGUE_CAPACITY)
+            self.assertEqual({league for _, _, league in placements}, {group.league.name})
+            rows = list(group.board_rows.order_by("rank").values_list("user_id", "exp_earned"))
+            self.assertEqual(rows, [(user_id, exp) for user_id, exp, _ in placements])
+        # Only the last group of each league may be short.
+        short = LeagueGroup.objects.filter(member_count__lt=LEAGUE_CAPACITY).values_list("league_id", flat=True)
+        self.assertEqual(len(short), len(set(short)))
+
+    def test_same_seed_same_users(self):
+        first = self._run()
+        CustomUser.objects.all().delete()
+        self.assertEqual(self._run(), first)
@@ -0,0 +1,70 @@
+# leaderboards/tests/test_current_league_etag.py
+
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from accounts.models import CustomUser
+from leaderboards.models import League, LeagueGroup, UserLeaguePlacement, UserWeeklyOutcome
+from leaderboards.league_service import add_league_exp, get_previous_monday_0001_utc, LEAGUES_ORDER
+from leaderboards.views import etag_requests
+
+
+class CurrentLeagueETagTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        etag_requests.clear()
+        for i, name in enumerate(LEAGUES_ORDER):
+            League.objects.create(name=name, icon="league_icons/default.png", order=i)
+        group = LeagueGroup.objects.create(
+            league=League.objects.get(name="Silver"), week_start=get_previous_monday_0001_utc().date()
+        )
+        self.users = []
+        for i in range(3):
+            user = CustomUser.objects.create_user(email=f"etag{i}@example.com", current_league="Silver")
+            UserLeaguePlacement.objects.create(user=user, league_group=group, exp_earned=i)
+            self.users.append(user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.users[0])
+
+    def _get(self, etag=None):
+        headers = {"HTTP_IF_NONE_MATCH": etag} if etag else {}
+        return self.client.get(reverse("current-league"), **headers)
+
+    def test_unchanged_board_answers_304_without_the_snapshot(self):
+        first = self._get()
+        self.assertEqual(first.status_code, 200)
+        self.assertTrue(first["ETag"])
+
+        with mock.patch("leaderboards.views.get_group_snapshot") as get_group_snapshot:
+            second = self._get(first["ETag"])
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second["ETag"], first["ETag"])
+        get_group_snapshot.assert_not_called()
+        self.assertEqual(etag_requests.labels(result="hit").value, 1)
+        self.assertEqual(etag_requests.labels(result="unconditional").value, 1)
+
+    def test_xp_change_outcome_and_catalog_change_the_etag(self):
+        etag = self._get()["ETag"]
+
+        with mock.patch("leaderboards.league_service.mark_group_dirty"):
+            with self.captureOnCommitCallbacks(execute=True):
+                add_league_exp(self.users[2], 5)
+        response = self._get(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["leaderboard"][0]["exp_earned"], 7)
+        self.assertEqual(etag_requests.labels(result="miss").value, 1)
+
+        etag = response["ETag"]
+        UserWeeklyOutcome.objects.create(user=self.users[0], finished_rank=3, old_league="Bronze", new_league="Silver")
+        self.client.force_authenticate(CustomUser.objects.get(pk=self.users[0].pk))
+        response = self._get(etag)
+        self.assertEqual(response.status_code, 200)
+
+        etag = response["ETag"]
+        gold = League.objects.get(name="Gold")
+        gold.icon = "league_icons/gold.png"
+        gold.save()
+        self.assertEqual(self._get(etag).status_code, 200)
@@ -0,0 +1,58 @@
+# leaderboards/tests/test_dump_users_league_status.py
+
+import csv
+import json
+import os
+import tempfile
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.test import TestCase
+from accounts.models import CustomUser
+from leaderboards.models import League, LeagueGroup, UserLeaguePlacement
+from leaderboards.league_service import get_previous_monday_0001_utc, LEAGUES_ORDER
+
+
+class DumpUsersLeagueStatusTest(TestCase):
+    def setUp(self):
+        for i, name in enumerate(LEAGUES_ORDER):
+            League.objects.create(name=name, icon="league_icons/default.png", order=i)
+        self.week_start = get_previous_monday_0001_utc().date()
+        gold = LeagueGroup.objects.create(league=League.objects.get(name="Gold"), week_start=self.week_start)
+        bronze = LeagueGroup.objects.create(league=League.objects.get(name="Bronze"), week_start=self.week_start)
+        old = LeagueGroup.objects.create(
+            league=League.objects.get(name="Bronze"), week_start=self.week_start - timedelta(days=7)
+        )
+        for i, (group, exp) in enumerate([(gold, 10), (gold, 30), (gold, 30), (bronze, 5), (None, 0)]):
+            user = CustomUser.objects.create_user(email=f"dump{i}@example.com", current_league="Gold")
+            if group is not None:
+                UserLeaguePlacement.objects.create(user=user, league_group=group, exp_earned=exp)
+        UserLeaguePlacement.objects.create(user=CustomUser.objects.get(email="dump3@example.com"), league_group=old)
+        self.path = os.path.join(tempfile.mkdtemp(), "dump.out")
+
+    def _dump(self, *args):
+        call_command("dump_users_league_status", "--filename", self.path, *args, stdout=open(os.devnull, "w"))
+        with open(self.path) as f:
+            return f.read()
+
+    def test_json_ranks_in_sql_with_ties_and_unplaced_users(self):
+        with self.assertNumQueries(2):  # placements, then users without one
+            rows = json.loads(self._dump())
+
+        ranks = [(row["email"], row["placement_exp_earned"], row["rank_in_group"]) for row in rows]
+        self.assertEqual(ranks, [
+            ("dump0@example.com", 10, 3),
+            ("dump1@example.com", 30, 1),
+            ("dump2@example.com", 30, 2),
+            ("dump3@example.com", 5, 1),
+            ("dump3@example.com", 0, 1),
+            ("dump4@example.com", None, None),
+        ])
+
+    def test_filters_keep_whole_groups(self):
+        dump = self._dump("--format", "csv", "--week-start", self.week_start.isoformat())
+        rows = list(csv.DictReader(dump.splitlines()))
+        self.assertEqual(len(rows), 4)
+
+        lines = self._dump("--format", "jsonl", "--tier", "Gold").splitlines()
+        self.assertEqual([json.loads(line)["rank_in_group"] for line in lines], [3, 1, 2])
@@ -0,0 +1,87 @@
+# leaderboards/tests/test_instrumentation.py
+
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, modify_settings, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from accounts.models import CustomUser
+from leaderboards.models import League, LeagueGroup, UserLeaguePlacement
+from leaderboards.league_service import get_previous_monday_0001_utc, LEAGUES_ORDER
+from leaderboards.metrics import MetricsRegistry, render_text
+from leaderboards.tests.test_query_plans import QUERY_BUDGETS
+
+
+@modify_settings(MIDDLEWARE={"prepend": "leaderboards.instrumentation.RequestInstrumentationMiddleware"})
+class RequestInstrumentationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        for i, name in enumerate(LEAGUES_ORDER):
+            League.objects.create(name=name, icon="league_icons/default.png", order=i)
+        group = LeagueGroup.objects.create(
+            league=League.objects.get(name="Silver"), week_start=get_previous_monday_0001_utc().date()
+        )
+        self.user = CustomUser.objects.create_user(email="me@example.com", current_league="Silver")
+        UserLeaguePlacement.objects.create(user=self.user, league_group=group, exp_earned=5)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_profile_counts_the_queries_of_the_request(self):
+        with mock.patch("leaderboards.views.place_user_in_bronze_task"):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse("current-league"))
+
+        profile = response.request_profile
+        self.assertEqual(profile.endpoint, "current-league")
+        self.assertEqual(profile.queries, len(queries))
+        self.assertLessEqual(profile.queries, QUERY_BUDGETS["current_league_view"])
+        self.assertEqual(set(profile.spans), {"placement", "snapshot", "serialize"})
+        self.assertGreaterEqual(profile.total_seconds, profile.db_seconds)
+
+        staff = APIClient()
+        staff.force_login(CustomUser.objects.create_user(email="ops@example.com", is_staff=True))
+        metrics = staff.get(reverse("leaderboard-metrics"))
+        self.assertEqual(metrics["Content-Type"], "text/plain; version=0.0.4; charset=utf-8")
+        text = metrics.content.decode()
+        self.assertIn('leaderboards_request_queries_bucket{endpoint="current-league",le="+Inf"}', text)
+        self.assertIn('leaderboards_span_seconds_count{endpoint="current-league",span="serialize"}', text)
+
+    def test_metrics_are_staff_only_without_a_token(self):
+        self.assertEqual(APIClient().get(reverse("leaderboard-metrics")).status_code, 403)
+        member = APIClient()
+        member.force_login(self.user)
+        self.assertEqual(member.get(reverse("leaderboard-metrics"), HTTP_AUTHORIZATION="Bearer ").status_code, 403)
+
+    @override_settings(LEADERBOARD_METRICS_TOKEN="s3cret")
+    def test_metrics_token(self):
+        self.assertEqual(self.client.get(reverse("leaderboard-metrics")).status_code, 401)
+        self.assertEqual(
+            self.client.get(reverse("leaderboard-metrics"), HTTP_AUTHORIZATION="Bearer wrong").status_code, 401
+        )
+        response = self.client.get(reverse("leaderboard-metrics"), HTTP_AUTHORIZATION="Bearer s3cret")
+        self.assertEqual(response.status_code, 200)
+
+
+class RenderTextTest(TestCase):
+    def test_exposition_format(self):
+        registry = MetricsRegistry()
+        registry.counter("jobs_total", "Jobs run.").inc(3)
+        latency = registry.histogram("job_seconds", "Job time.", labelnames=("queue",), buckets=(0.5, 1.0))
+        latency.labels(queue='a"b').observe(0.2)
+        latency.labels(queue='a"b').observe(2.0)
+
+        self.assertEqual(render_text(registry).splitlines(), [
+            "# HELP job_seconds Job time.",
+            "# TYPE job_seconds histogram",
+            'job_seconds_bucket{queue="a\\"b",le="0.5"} 1',
+            'job_seconds_bucket{queue="a\\"b",le="1.0"} 1',
+            'job_seconds_bucket{queue="a\\"b",le="+Inf"} 2',
+            'job_seconds_sum{queue="a\\"b"} 2.2',
+            'job_seconds_count{queue="a\\"b"} 2',
+            "# HELP jobs_total Jobs run.",
+            "# TYPE jobs_total counter",
+            "jobs_total 3",
+        ])
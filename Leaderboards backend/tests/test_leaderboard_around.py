@@ -0,0 +1,71 @@
+# leaderboards/tests/test_leaderboard_around.py
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from accounts.models import CustomUser
+from leaderboards.models import LeaderboardRow, League, LeagueGroup, UserLeaguePlacement
+from leaderboards.league_service import get_previous_monday_0001_utc, LEAGUES_ORDER
+
+
+class LeaderboardAroundViewTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        for i, name in enumerate(LEAGUES_ORDER):
+            League.objects.create(name=name, icon="league_icons/default.png", order=i)
+        self.group = LeagueGroup.objects.create(
+            league=League.objects.get(name="Silver"),
+            week_start=get_previous_monday_0001_utc().date(),
+            member_count=12,
+        )
+        self.users = []
+        for i in range(12):
+            user = CustomUser.objects.create_user(email=f"around{i}@example.com", current_league="Silver")
+            UserLeaguePlacement.objects.create(user=user, league_group=self.group, exp_earned=100 - i)
+            self.users.append(user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.users[5])
+
+    def _get(self, **params):
+        response = self.client.get(reverse("leaderboard-around"), params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_neighbours_without_email(self):
+        with self.assertNumQueries(3):
+            data = self._get(k=2)
+
+        self.assertEqual((data["currentLeague"], data["rank"], data["group_size"]), ("Silver", 6, 12))
+        self.assertEqual([row["rank"] for row in data["leaderboard"]], [4, 5, 6, 7, 8])
+        self.assertEqual(data["leaderboard"][2], {"rank": 6, "username": "around5", "exp_earned": 95})
+
+    def test_cursor_pages_walk_the_board(self):
+        ranks, after = [], 0
+        while after is not None:
+            data = self._get(after=after, limit=5, fields="rank")
+            ranks += [row["rank"] for row in data["leaderboard"]]
+            after = data["next"]
+        self.assertEqual(ranks, list(range(1, 13)))
+
+    def test_group_without_rows_is_ranked_from_placements(self):
+        LeaderboardRow.objects.all().delete()
+        data = self._get(k=1, fields="username,email")
+        self.assertEqual(data["rank"], 6)
+        self.assertEqual(
+            [row["email"] for row in data["leaderboard"]],
+            ["around4@example.com", "around5@example.com", "around6@example.com"],
+        )
+
+        page = self._get(after=10, limit=5, fields="rank,username")
+        self.assertEqual(page["leaderboard"], [{"rank": 11, "username": "around10"}, {"rank": 12, "username": "around11"}])
+        self.assertIsNone(page["next"])
+
+    def test_league_catalog_is_skipped_when_current(self):
+        first = self._get()
+        self.assertEqual([league["name"] for league in first["leagues"]], LEAGUES_ORDER)
+        self.assertNotIn("leagues", self._get(leagues_version=first["leagues_version"]))
+
+    def test_bad_parameters(self):
+        for params in ({"fields": "rank,password"}, {"k": "-1"}, {"limit": "x"}):
+            self.assertEqual(self.client.get(reverse("leaderboard-around"), params).status_code, 400)
@@ -0,0 +1,128 @@
+# leaderboards/tests/test_leaderboard_cache.py
+
+import threading
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from accounts.models import CustomUser
+from leaderboards.models import League, LeagueGroup, UserLeaguePlacement
+from leaderboards.leaderboard_cache import build_group_snapshot, get_group_snapshot
+from leaderboards.ranking import BOARD_ORDER
+from leaderboards.serializers import UserPlacementSerializer
+from leaderboards.league_service import get_previous_monday_0001_utc, LEAGUES_ORDER
+
+
+class GroupSnapshotCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        for i, name in enumerate(LEAGUES_ORDER):
+            League.objects.create(name=name, icon="league_icons/default.png", order=i)
+        self.group = LeagueGroup.objects.create(
+            league=League.objects.get(name="Silver"),
+            week_start=get_previous_monday_0001_utc().date(),
+        )
+        self.users = []
+        for i in range(5):
+            user = CustomUser.objects.create_user(
+                email=f"member{i}@example.com", current_league="Silver", exp_this_league=i * 10
+            )
+            UserLeaguePlacement.objects.create(user=user, league_group=self.group, exp_earned=i * 10)
+            self.users.append(user)
+
+    def test_members_share_one_snapshot(self):
+        snapshot = get_group_snapshot(self.group)
+        self.assertEqual(
+            [(row["user"]["username"], row["rank"]) for row in snapshot["leaderboard"]],
+            [("member4", 1), ("member3", 2), ("member2", 3), ("member1", 4), ("member0", 5)],
+        )
+        with self.assertNumQueries(0):
+            again = get_group_snapshot(self.group)
+        self.assertEqual(again["built_at"], snapshot["built_at"])
+
+    def test_snapshot_renders_like_the_serializer(self):
+        # What CurrentLeagueView rendered before the snapshot: UserPlacementSerializer per
+        # placement, in board order, with the rank patched in afterwards.
+        expected = []
+        placements = UserLeaguePlacement.objects.filter(league_group=self.group).select_related("user")
+        for rank, placement in enumerate(placements.order_by(*BOARD_ORDER), start=1):
+            data = UserPlacementSerializer(placement).data
+            data["rank"] = rank
+            expected.append(data)
+        expected = JSONRenderer().render(expected)
+        with self.assertNumQueries(1):
+            leaderboard = build_group_snapshot(self.group)["leaderboard"]
+        self.assertEqual(JSONRenderer().render(leaderboard), expected)
+
+    def test_placement_change_invalidates_snapshot(self):
+        get_group_snapshot(self.group)
+        placement = UserLeaguePlacement.objects.get(user=self.users[0])
+        placement.exp_earned = 100
+        with self.captureOnCommitCallbacks(execute=True):
+            placement.save()
+
+        leaderboard = get_group_snapshot(self.group)["leaderboard"]
+        self.assertEqual(leaderboard[0]["user"]["username"], "member0")
+        self.assertEqual(leaderboard[0]["exp_earned"], 100)
+
+    def test_snapshot_built_across_an_invalidation_is_not_served_again(self):
+        placement = UserLeaguePlacement.objects.get(user=self.users[0])
+
+        def build_racing_an_xp_write(group):
+            snapshot = build_group_snapshot(group)
+            placement.exp_earned = 100  # commits while the old board is being cached
+            with self.captureOnCommitCallbacks(execute=True):
+                placement.save()
+            return snapshot
+
+        with mock.patch("leaderboards.leaderboard_cache.build_group_snapshot", side_effect=build_racing_an_xp_write):
+            stale = get_group_snapshot(self.group)
+        self.assertEqual(stale["leaderboard"][0]["user"]["username"], "member4")
+
+        fresh = get_group_snapshot(self.group)
+        self.assertEqual(fresh["leaderboard"][0]["user"]["username"], "member0")
+
+    def test_view_reports_snapshot_age(self):
+        client = APIClient()
+        client.force_authenticate(self.users[0])
+        response = client.get(reverse("current-league"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["leaderboard"]), 5)
+        self.assertGreaterEqual(float(response["X-Leaderboard-Snapshot-Age"]), 0.0)
+
+
+class SnapshotInvalidationOnCommitTest(TransactionTestCase):
+    """A read between a placement's save and its commit must not pin the old board."""
+
+    def setUp(self):
+        cache.clear()
+        for i, name in enumerate(LEAGUES_ORDER):
+            League.objects.create(name=name, icon="league_icons/default.png", order=i)
+        self.group = LeagueGroup.objects.create(
+            league=League.objects.get(name="Silver"), week_start=get_previous_monday_0001_utc().date()
+        )
+        old = CustomUser.objects.create_user(email="old@example.com", current_league="Silver")
+        UserLeaguePlacement.objects.create(user=old, league_group=self.group, exp_earned=5)
+
+    def _read_from_another_connection(self):
+        try:
+            get_group_snapshot(self.group)
+        finally:
+            connection.close()
+
+    def test_read_before_commit_does_not_pin_the_old_board(self):
+        get_group_snapshot(self.group)
+        new = CustomUser.objects.create_user(email="new@example.com", current_league="Silver")
+        with transaction.atomic():
+            UserLeaguePlacement.objects.create(user=new, league_group=self.group, exp_earned=1)
+            reader = threading.Thread(target=self._read_from_another_connection)
+            reader.start()
+            reader.join()
+
+        leaderboard = get_group_snapshot(self.group)["leaderboard"]
+        self.assertEqual([row["user"]["username"] for row in leaderboard], ["old", "new"])
@@ -0,0 +1,97 @@
+# leaderboards/tests/test_leaderboard_rows.py
+
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from accounts.models import CustomUser
+from leaderboards.models import League, LeaderboardRow, LeagueGroup, UserLeaguePlacement
+from leaderboards.leaderboard_cache import get_group_snapshot
+from leaderboards.leaderboard_rows import check_rows, rebuild_rows, refresh_group_rows
+from leaderboards.league_service import add_league_exp, get_previous_monday_0001_utc, reset_leagues, LEAGUES_ORDER
+
+
+@mock.patch("leaderboards.league_service.mark_group_dirty")
+class LeaderboardRowTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        for i, name in enumerate(LEAGUES_ORDER):
+            League.objects.create(name=name, icon="league_icons/default.png", order=i)
+        self.week_start = get_previous_monday_0001_utc().date()
+        self.group = LeagueGroup.objects.create(league=League.objects.get(name="Silver"), week_start=self.week_start)
+        self.users = []
+        for i, exp in enumerate([5, 20, 10]):
+            user = CustomUser.objects.create_user(email=f"row{i}@example.com", current_league="Silver")
+            UserLeaguePlacement.objects.create(user=user, league_group=self.group, exp_earned=exp)
+            self.users.append(user)
+
+    def _board(self, group):
+        return list(
+            LeaderboardRow.objects.filter(league_group=group).order_by("rank").values_list("username", "exp_earned")
+        )
+
+    def test_rows_follow_placements_and_xp(self, _):
+        self.assertEqual(self._board(self.group), [("row1", 20), ("row2", 10), ("row0", 5)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            add_league_exp(self.users[0], 30)
+
+        self.assertEqual(self._board(self.group), [("row0", 35), ("row1", 20), ("row2", 10)])
+        self.assertEqual(get_group_snapshot(self.group)["leaderboard"][0]["exp_earned"], 35)
+        self.assertEqual(check_rows(self.week_start), [])
+
+    def test_xp_rewrites_only_the_rank_slots_that_changed(self, _):
+        before = dict(LeaderboardRow.objects.filter(league_group=self.group).values_list("rank", "id"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            add_league_exp(self.users[0], 6)  # 11 exp: overtakes row2 for second place
+
+        after = dict(LeaderboardRow.objects.filter(league_group=self.group).values_list("rank", "id"))
+        self.assertEqual(after[1], before[1])
+        self.assertNotEqual(after[2], before[2])
+        self.assertEqual(self._board(self.group), [("row1", 20), ("row0", 11), ("row2", 10)])
+
+        with CaptureQueriesContext(connection) as queries:
+            refresh_group_rows(self.group.id)
+        writes = [q["sql"] for q in queries if q["sql"].startswith(("UPDATE", "INSERT", "DELETE"))]
+        self.assertEqual(writes, [])
+
+    def test_renamed_user_is_updated_in_place(self, _):
+        self.users[1].username = "renamed"
+        self.users[1].save()
+
+        self.assertEqual(self._board(self.group)[0], ("renamed", 20))
+        self.assertEqual(check_rows(self.week_start), [])
+
+    def test_reset_writes_rows_for_new_groups(self, _):
+        reset_leagues()
+
+        new_week = self.week_start + timedelta(days=7)
+        self.assertFalse(LeaderboardRow.objects.filter(week_start=self.week_start).exists())
+        self.assertEqual(LeaderboardRow.objects.filter(week_start=new_week, exp_earned=0).count(), 3)
+        self.assertEqual(check_rows(new_week), [])
+
+    def test_checker_reports_drift_and_rebuild_repairs_it(self, _):
+        LeaderboardRow.objects.filter(username="row2").update(exp_earned=99)
+        LeaderboardRow.objects.filter(username="row0").delete()
+
+        self.assertEqual(len(check_rows(self.week_start)), 1)
+        self.assertEqual(rebuild_rows(self.week_start), 3)
+        self.assertEqual(check_rows(self.week_start), [])
+
+    def test_reset_promotes_the_displayed_top_seven_on_ties(self, _):
+        group = LeagueGroup.objects.create(league=League.objects.get(name="Silver"), week_start=self.week_start)
+        tied = [CustomUser.objects.create_user(email=f"tie{i}@example.com", current_league="Silver") for i in range(10)]
+        for user in reversed(tied):  # placement ids run the other way round from user ids
+            UserLeaguePlacement.objects.create(user=user, league_group=group, exp_earned=50)
+
+        displayed = list(LeaderboardRow.objects.filter(league_group=group).order_by("rank").values_list("user_id", flat=True))
+        self.assertEqual(displayed, [user.id for user in tied])
+
+        reset_leagues()
+
+        promoted = set(CustomUser.objects.filter(id__in=displayed, current_league="Gold").values_list("id", flat=True))
+        self.assertEqual(promoted, set(displayed[:7]))
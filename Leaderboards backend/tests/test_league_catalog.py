@@ -0,0 +1,41 @@
+# leaderboards/tests/test_league_catalog.py
+
+from django.core.cache import cache
+from django.test import TestCase
+from leaderboards.models import League
+from leaderboards.league_catalog import CATALOG_VERSION_KEY, get_league_catalog
+from leaderboards.league_service import LEAGUES_ORDER
+
+
+class LeagueCatalogTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        for i, name in enumerate(LEAGUES_ORDER):
+            League.objects.create(name=name, icon="league_icons/default.png", order=i)
+
+    def test_lookups_without_queries(self):
+        get_league_catalog()
+        with self.assertNumQueries(0):
+            catalog = get_league_catalog()
+            self.assertEqual(list(catalog), LEAGUES_ORDER)
+            self.assertEqual(catalog["Gold"].order, 2)
+            self.assertEqual(catalog.position("Ruby"), 6)
+            self.assertEqual((catalog.next_tier("Gold"), catalog.previous_tier("Gold")), ("Platinum", "Silver"))
+            self.assertEqual((catalog.previous_tier("Bronze"), catalog.next_tier("Obsidian")), ("Bronze", "Obsidian"))
+            self.assertEqual((catalog.lowest.name, catalog.highest.name), ("Bronze", "Obsidian"))
+            self.assertNotIn("Wood", catalog)
+
+    def test_saves_and_other_processes_invalidate(self):
+        before = get_league_catalog()
+        gold = League.objects.get(name="Gold")
+        gold.icon = "league_icons/gold.png"
+        gold.save()
+        after = get_league_catalog()
+        self.assertIsNot(after, before)
+        self.assertNotEqual(after.content_version, before.content_version)
+        self.assertTrue(after.serialized[2]["icon"].endswith("league_icons/gold.png"))
+
+        # Another process bumping the shared version makes this one reload.
+        cache.set(CATALOG_VERSION_KEY, "elsewhere", None)
+        with self.assertNumQueries(1):
+            self.assertEqual(get_league_catalog().version, "elsewhere")
@@ -0,0 +1,82 @@
+# leaderboards/tests/test_league_exp.py
+
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from accounts.models import CustomUser
+from leaderboards.models import League, LeagueGroup, UserLeaguePlacement
+from leaderboards.leaderboard_cache import get_group_snapshot
+from leaderboards.league_service import (
+    add_league_exp,
+    get_previous_monday_0001_utc,
+    place_user_in_bronze_task,
+    LEAGUES_ORDER,
+)
+
+
+class LeagueExpTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        for i, name in enumerate(LEAGUES_ORDER):
+            League.objects.create(name=name, icon="league_icons/default.png", order=i)
+        self.group = LeagueGroup.objects.create(
+            league=League.objects.get(name="Bronze"),
+            week_start=get_previous_monday_0001_utc().date(),
+        )
+        self.user = CustomUser.objects.create_user(email="learner@example.com", current_league="Bronze")
+        self.rival = CustomUser.objects.create_user(email="rival@example.com", current_league="Bronze")
+        UserLeaguePlacement.objects.create(user=self.user, league_group=self.group, exp_earned=0)
+        UserLeaguePlacement.objects.create(user=self.rival, league_group=self.group, exp_earned=15)
+
+    def test_add_league_exp_moves_user_and_placement_together(self):
+        get_group_snapshot(self.group)
+        with mock.patch("leaderboards.league_service.mark_group_dirty") as mark_group_dirty:
+            with self.captureOnCommitCallbacks(execute=True):
+                add_league_exp(self.user, 10)
+                add_league_exp(self.user, 10)
+
+        mark_group_dirty.assert_called_with(self.group.id)
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.exp_this_league, 20)
+        self.assertEqual(UserLeaguePlacement.objects.get(user=self.user).exp_earned, 20)
+        self.assertEqual(get_group_snapshot(self.group)["leaderboard"][0]["user"]["username"], "learner")
+
+    def test_current_league_view_never_writes(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        CustomUser.objects.filter(pk=self.user.pk).update(exp_this_league=99)  # out-of-band change
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(reverse("current-league"))
+
+        self.assertEqual(response.status_code, 200)
+        writes = [q["sql"] for q in queries if not q["sql"].lstrip().upper().startswith("SELECT")]
+        self.assertEqual(writes, [])
+        self.assertEqual(UserLeaguePlacement.objects.get(user=self.user).exp_earned, 0)
+
+    def test_unplaced_user_is_placed_by_a_task(self):
+        newcomer = CustomUser.objects.create_user(email="newcomer@example.com", current_league="Bronze")
+        client = APIClient()
+        client.force_authenticate(newcomer)
+
+        with mock.patch("leaderboards.views.place_user_in_bronze_task") as task:
+            response = client.get(reverse("current-league"))
+
+        task.delay.assert_called_once_with(newcomer.id)
+        self.assertEqual(response.data["currentLeague"], "Bronze")
+        self.assertEqual(response.data["leaderboard"], [])
+        self.assertFalse(UserLeaguePlacement.objects.filter(user=newcomer).exists())
+
+    def test_repeated_placement_tasks_place_the_user_once(self):
+        newcomer = CustomUser.objects.create_user(email="newcomer@example.com", current_league="Bronze")
+
+        place_user_in_bronze_task(newcomer.id)
+        place_user_in_bronze_task(newcomer.id)
+
+        self.assertEqual(UserLeaguePlacement.objects.filter(user=newcomer).count(), 1)
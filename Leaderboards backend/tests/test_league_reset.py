@@ -5,7 +5,7 @@ from django.utils import timezone
 import random
 from accounts.models import CustomUser
 from leaderboards.models import League, LeagueGroup, UserLeaguePlacement, UserWeeklyOutcome
-from leaderboards.league_service import reset_leagues, place_new_user_in_bronze, LEAGUES_ORDER
+from leaderboards.league_service import reset_leagues, place_new_user_in_bronze, LEAGUE_CAPACITY, LEAGUES_ORDER
 
 class LeagueResetTest(TestCase):
     def setUp(self):
@@ -28,16 +28,20 @@ class LeagueResetTest(TestCase):
         for user in self.users:
             place_new_user_in_bronze(user)
 
-        old_groups_count = LeagueGroup.objects.count()
-
         # Run reset
         reset_leagues()
 
         new_groups_count = LeagueGroup.objects.count()
 
-        # Basic checks
-        self.assertTrue(new_groups_count >= old_groups_count, 
-                        "We expect new groups to be created for the new cycle (or at least a new set).")
+        # Basic checks: each league's users are pooled into ceil(k / 30) groups
+        self.assertTrue(new_groups_count > 0, "We expect new groups to be created for the new cycle.")
+        for league_name in LEAGUES_ORDER:
+            placed = UserLeaguePlacement.objects.filter(league_group__league__name=league_name).count()
+            self.assertEqual(
+                LeagueGroup.objects.filter(league__name=league_name).count(),
+                -(-placed // LEAGUE_CAPACITY),
+                f"{league_name}: {placed} users should fill the fewest groups possible",
+            )
 
         # Check that each user either has a new league or is locked out
         for user in self.users:
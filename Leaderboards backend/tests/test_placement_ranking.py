@@ -0,0 +1,68 @@
+# leaderboards/tests/test_placement_ranking.py
+
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from accounts.models import CustomUser
+from leaderboards.models import League, LeagueGroup, UserLeaguePlacement
+from leaderboards.league_service import get_previous_monday_0001_utc, LEAGUES_ORDER
+
+
+class PlacementRankingTest(TestCase):
+    def setUp(self):
+        for i, name in enumerate(LEAGUES_ORDER):
+            League.objects.create(name=name, icon="league_icons/default.png", order=i)
+        self.week_start = get_previous_monday_0001_utc().date()
+        gold = League.objects.get(name="Gold")
+        self.users = {}
+        for group_exps in ([50, 40, 40, 10, 0], [7, 3]):
+            group = LeagueGroup.objects.create(league=gold, week_start=self.week_start)
+            for exp in group_exps:
+                user = CustomUser.objects.create_user(email=f"rank{len(self.users)}@example.com")
+                UserLeaguePlacement.objects.create(user=user, league_group=group, exp_earned=exp)
+                self.users[user.email] = user
+
+    def _ranks(self):
+        return sorted(
+            UserLeaguePlacement.objects.with_rank().values_list("user__email", "rank", "group_size", "percentile")
+        )
+
+    def test_window_functions_rank_each_group(self):
+        # Ties go to the lower user id, as on the boards; the percentile treats them alike.
+        self.assertEqual(self._ranks(), [
+            ("rank0@example.com", 1, 5, 1.0),
+            ("rank1@example.com", 2, 5, 0.8),
+            ("rank2@example.com", 3, 5, 0.8),
+            ("rank3@example.com", 4, 5, 0.4),
+            ("rank4@example.com", 5, 5, 0.2),
+            ("rank5@example.com", 1, 2, 1.0),
+            ("rank6@example.com", 2, 2, 0.5),
+        ])
+
+    def test_fallback_without_window_functions_matches(self):
+        expected = self._ranks()
+        with mock.patch.object(connection.features, "supports_over_clause", False):
+            self.assertEqual(self._ranks(), expected)
+            self.assertEqual(UserLeaguePlacement.objects.top(1).count(), 2)
+            self._assert_my_rank_and_neighbours()
+
+    def _assert_my_rank_and_neighbours(self):
+        me = self.users["rank2@example.com"]
+        with self.assertNumQueries(1):
+            mine = UserLeaguePlacement.objects.rank_of(me, self.week_start)
+        self.assertEqual((mine.rank, mine.group_size, mine.percentile), (3, 5, 0.8))
+
+        with self.assertNumQueries(1):
+            around = UserLeaguePlacement.objects.around(me, self.week_start, 1)
+        self.assertEqual([(p.user_id, p.rank) for p in around], [
+            (self.users["rank1@example.com"].id, 2), (me.id, 3), (self.users["rank3@example.com"].id, 4),
+        ])
+
+    def test_my_rank_top_and_neighbours_are_one_query_each(self):
+        self._assert_my_rank_and_neighbours()
+
+        me = self.users["rank2@example.com"]
+        with self.assertNumQueries(1):
+            top = list(UserLeaguePlacement.objects.in_group_of(me, self.week_start).top(2))
+        self.assertEqual([p.rank for p in top], [1, 2])
@@ -0,0 +1,123 @@
+# leaderboards/tests/test_query_plans.py
+
+import re
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from accounts.models import CustomUser
+from leaderboards.models import League, LeagueGroup, UserLeaguePlacement
+from leaderboards.league_service import (
+    add_league_exp,
+    get_previous_monday_0001_utc,
+    place_new_user_in_bronze,
+    reset_leagues,
+    LEAGUES_ORDER,
+)
+
+# The league catalog is ten rows; scanning it is cheaper than any index.
+SCAN_ALLOWED = {"leaderboards_league"}
+
+# Upper bounds per hot path, savepoints included. Lower them when a change saves queries.
+QUERY_BUDGETS = {
+    "current_league_view": 5,
+    "leaderboard_around_view": 3,
+    "place_new_user_in_bronze": 14,
+    "add_league_exp": 11,
+    "reset_leagues": 25,  # 4 of them record the ResetRun
+}
+
+
+def explain(sql):
+    """The plan lines of a captured SELECT on SQLite or PostgreSQL."""
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            # Tiny test tables make a seq scan the cheapest plan; only report the ones
+            # the planner cannot avoid because no index fits.
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute(f"EXPLAIN {sql}")
+            return [row[0] for row in cursor.fetchall()]
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def sequential_scans(plan):
+    """Tables read without an index: SQLite "SCAN t" (not "USING INDEX"), Postgres "Seq Scan on t"."""
+    tables = []
+    for line in plan:
+        match = re.search(r"Seq Scan on (\w+)", line) or re.fullmatch(r"\s*SCAN (\w+)", line)
+        if match:
+            tables.append(match.group(1))
+    return tables
+
+
+class HotPathQueryPlanTest(TestCase):
+    """Fails when a hot path starts scanning a table or issues more queries than budgeted."""
+
+    def setUp(self):
+        cache.clear()
+        for i, name in enumerate(LEAGUES_ORDER):
+            League.objects.create(name=name, icon="league_icons/default.png", order=i)
+        self.week_start = get_previous_monday_0001_utc().date()
+        self.users = self._fill_groups("Silver", groups=3, size=25)
+
+    def _fill_groups(self, league_name, groups, size):
+        users = []
+        for g in range(groups):
+            group = LeagueGroup.objects.create(league=League.objects.get(name=league_name), week_start=self.week_start)
+            for i in range(size):
+                user = CustomUser.objects.create_user(
+                    email=f"{league_name.lower()}{g}_{i}@example.com", current_league=league_name
+                )
+                UserLeaguePlacement.objects.create(user=user, league_group=group, exp_earned=i)
+                users.append(user)
+        return users
+
+    def _assert_hot_path(self, name, fn):
+        cache.clear()
+        with mock.patch("leaderboards.league_service.mark_group_dirty"):
+            with self.captureOnCommitCallbacks(execute=True):
+                with CaptureQueriesContext(connection) as queries:
+                    fn()
+
+        selects = [q["sql"] for q in queries if q["sql"].lstrip().upper().startswith("SELECT")]
+        for sql in selects:
+            plan = explain(sql)
+            scanned = [table for table in sequential_scans(plan) if table not in SCAN_ALLOWED]
+            self.assertEqual(scanned, [], f"{name}: sequential scan in\n{sql}\n" + "\n".join(plan))
+        self.assertLessEqual(
+            len(queries), QUERY_BUDGETS[name],
+            f"{name}: {len(queries)} queries, budget {QUERY_BUDGETS[name]}\n"
+            + "\n".join(q["sql"][:200] for q in queries),
+        )
+        return len(queries)
+
+    def test_current_league_view(self):
+        client = APIClient()
+        client.force_authenticate(self.users[0])
+        self._assert_hot_path("current_league_view", lambda: client.get(reverse("current-league")))
+
+    def test_leaderboard_around_view(self):
+        client = APIClient()
+        client.force_authenticate(self.users[10])
+        self._assert_hot_path("leaderboard_around_view", lambda: client.get(reverse("leaderboard-around")))
+
+    def test_place_new_user_in_bronze(self):
+        newcomer = CustomUser.objects.create_user(email="newcomer@example.com")
+        self._assert_hot_path("place_new_user_in_bronze", lambda: place_new_user_in_bronze(newcomer))
+
+    def test_add_league_exp(self):
+        self._assert_hot_path("add_league_exp", lambda: add_league_exp(self.users[0], 5))
+
+    def test_reset_query_count_does_not_grow_with_groups(self):
+        CustomUser.objects.create_user(email="lockedout@example.com", current_league="", exp_to_enter=10)
+        small = self._assert_hot_path("reset_leagues", reset_leagues)
+
+        self.week_start = get_previous_monday_0001_utc().date()
+        LeagueGroup.objects.all().delete()
+        self._fill_groups("Gold", groups=4, size=25)  # still one insert batch of new groups
+        self.assertEqual(self._assert_hot_path("reset_leagues", reset_leagues), small)
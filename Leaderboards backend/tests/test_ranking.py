@@ -0,0 +1,150 @@
+# leaderboards/tests/test_ranking.py
+
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from accounts.models import CustomUser
+from leaderboards import broadcast, ranking
+from leaderboards.models import LeaderboardRow, League, LeagueGroup, UserLeaguePlacement
+from leaderboards.ranking import InMemoryRankingStore, RedisRankingStore, ranked_group
+from leaderboards.league_service import add_league_exp, get_previous_monday_0001_utc, LEAGUES_ORDER
+
+
+class InMemoryRankingStoreTest(SimpleTestCase):
+    def test_increments_ranks_and_top_k(self):
+        store = InMemoryRankingStore()
+        store.load_group(1, [(10, 5), (11, 50), (12, 20)])
+
+        self.assertEqual(store.top(1), [(11, 50), (12, 20), (10, 5)])
+        self.assertEqual(store.incr(1, 10, 100), 105)
+        self.assertEqual(store.rank(1, 10), 1)
+        self.assertEqual(store.rank(1, 11), 2)
+        self.assertEqual(store.top(1, 2), [(10, 105), (11, 50)])
+        self.assertIsNone(store.rank(1, 99))
+        self.assertIsNone(store.rank(2, 10))
+
+    def test_ties_go_to_lower_member_id(self):
+        store = InMemoryRankingStore()
+        store.set_score(1, 7, 30)
+        store.set_score(1, 3, 30)
+        self.assertEqual(store.top(1), [(3, 30), (7, 30)])
+
+        store.drop_groups([1])
+        self.assertFalse(store.has_group(1))
+
+    def test_redis_scores_order_ties_by_lower_member_id(self):
+        store = RedisRankingStore("redis://localhost:6379/0")  # connects lazily; nothing is sent
+        members = [(7, 30), (3, 30), (12, 45), (5, 0)]
+        stored = sorted(((store._encode(m, s), m) for m, s in members), reverse=True)  # ZREVRANGE order
+
+        self.assertEqual([m for _, m in stored], [12, 3, 7, 5])
+        self.assertEqual([store._decode(str(m).encode(), raw) for raw, m in stored], [45, 30, 30, 0])
+
+
+class SharedInMemoryRankingStore(InMemoryRankingStore):
+    """Stands in for Redis: one copy that every process would read and write."""
+
+    shared = True
+
+
+class RankedGroupTest(TestCase):
+    def setUp(self):
+        self.store = SharedInMemoryRankingStore()
+        patcher = mock.patch.object(ranking, "_store", self.store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        league = League.objects.create(name="Bronze", icon="league_icons/default.png", order=0)
+        self.group = LeagueGroup.objects.create(league=league, week_start=get_previous_monday_0001_utc().date())
+        self.users = [CustomUser.objects.create_user(email=f"r{i}@example.com") for i in range(3)]
+        for i, user in enumerate(self.users):
+            UserLeaguePlacement.objects.create(user=user, league_group=self.group, exp_earned=i)
+
+    def _scores(self):
+        return {u.id: i for i, u in enumerate(self.users)}
+
+    def test_store_serves_a_loaded_group_without_the_db(self):
+        self.store.drop_groups([self.group.id])
+        load = mock.Mock(side_effect=self._scores)
+        self.assertEqual(ranked_group(self.group.id, load)[0], (self.users[2].id, 2))
+        self.assertEqual(load.call_count, 1)
+
+        self.store.incr(self.group.id, self.users[0].id, 10)
+        self.assertEqual(ranked_group(self.group.id, load)[0], (self.users[0].id, 10))
+        self.assertEqual(load.call_count, 1)
+
+    def test_group_with_other_members_is_reloaded(self):
+        ranked_group(self.group.id, self._scores)
+        self.store.set_score(self.group.id, 999, 50)
+
+        ranked = ranked_group(self.group.id, self._scores, members=self._scores())
+        self.assertEqual([user_id for user_id, _ in ranked], [u.id for u in reversed(self.users)])
+
+    def test_placement_saves_update_a_loaded_group(self):
+        ranked_group(self.group.id, self._scores)
+        placement = UserLeaguePlacement.objects.get(user=self.users[0])
+        placement.exp_earned = 10
+        placement.save()
+
+        self.assertEqual(self.store.rank(self.group.id, self.users[0].id), 1)
+
+    def test_reconcile_command_reports_and_fixes_drift(self):
+        ranked_group(self.group.id, self._scores)
+        self.store.set_score(self.group.id, self.users[1].id, 500)
+
+        out = StringIO()
+        call_command("reconcile_rankings", "--fix", stdout=out)
+        self.assertIn("1 drifted", out.getvalue())
+        self.assertEqual(self.store.rank(self.group.id, self.users[1].id), 2)
+
+
+class ProcessLocalStoreTest(TestCase):
+    """Two InMemoryRankingStores stand in for two processes holding their own copy of a group."""
+
+    def setUp(self):
+        cache.clear()
+        for i, name in enumerate(LEAGUES_ORDER):
+            League.objects.create(name=name, icon="league_icons/default.png", order=i)
+        self.group = LeagueGroup.objects.create(
+            league=League.objects.get(name="Silver"), week_start=get_previous_monday_0001_utc().date()
+        )
+        self.x = CustomUser.objects.create_user(email="x@example.com", current_league="Silver")
+        self.y = CustomUser.objects.create_user(email="y@example.com", current_league="Silver")
+        for user in (self.x, self.y):
+            UserLeaguePlacement.objects.create(user=user, league_group=self.group, exp_earned=0)
+        self.process_a, self.process_b = InMemoryRankingStore(), InMemoryRankingStore()
+        for store in (self.process_a, self.process_b):
+            store.load_group(self.group.id, [(self.x.id, 0), (self.y.id, 0)])
+
+    def _in_process(self, store, user, amount):
+        with mock.patch.object(ranking, "_store", store), mock.patch("leaderboards.league_service.mark_group_dirty"):
+            with self.captureOnCommitCallbacks(execute=True):
+                add_league_exp(user, amount)
+
+    def test_boards_follow_the_database_not_a_process_copy(self):
+        self._in_process(self.process_b, self.x, 100)
+        self._in_process(self.process_a, self.y, 5)  # A's copy still has x on 0
+
+        expected = [(self.x.id, 1, 100), (self.y.id, 2, 5)]
+        self.assertEqual(
+            list(LeaderboardRow.objects.filter(league_group=self.group).order_by("rank").values_list(
+                "user_id", "rank", "exp_earned"
+            )),
+            expected,
+        )
+        with mock.patch.object(ranking, "_store", self.process_a):
+            self.assertEqual(
+                [(user_id, rank, exp) for user_id, _, rank, exp in broadcast._ranked_rows(self.group.id)], expected
+            )
+            client = APIClient()
+            client.force_authenticate(self.y)
+            leaderboard = client.get(reverse("current-league")).data["leaderboard"]
+        self.assertEqual(
+            [(row["user"]["username"], row["rank"], row["exp_earned"]) for row in leaderboard],
+            [(self.x.username, 1, 100), (self.y.username, 2, 5)],
+        )
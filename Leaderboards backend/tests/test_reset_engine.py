@@ -0,0 +1,126 @@
+# leaderboards/tests/test_reset_engine.py
+
+from array import array
+
+from django.test import SimpleTestCase, TestCase
+from accounts.models import CustomUser
+from leaderboards.models import League, LeagueGroup, UserLeaguePlacement, UserWeeklyOutcome
+from leaderboards.league_service import (
+    reset_leagues,
+    serpentine_groups,
+    serpentine_split,
+    get_previous_monday_0001_utc,
+    LEAGUES_ORDER,
+    DIAMOND_GEM_REWARD,
+    EXP_TO_REJOIN,
+)
+
+
+class BulkResetEngineTest(TestCase):
+    """Pins the bulk engine to the outcomes of the original per-user reset."""
+
+    def setUp(self):
+        self.leagues = {}
+        for i, name in enumerate(LEAGUES_ORDER):
+            self.leagues[name] = League.objects.create(name=name, icon="league_icons/default.png", order=i)
+        self.week_start = get_previous_monday_0001_utc().date()
+
+    def _group(self, league_name, exps, prefix, current_league=None):
+        group = LeagueGroup.objects.create(league=self.leagues[league_name], week_start=self.week_start)
+        users = []
+        for i, exp in enumerate(exps):
+            user = CustomUser.objects.create_user(
+                email=f"{prefix}{i}@example.com",
+                current_league=league_name if current_league is None else current_league,
+                exp_this_league=exp,
+                gems_count=10,
+            )
+            UserLeaguePlacement.objects.create(user=user, league_group=group, exp_earned=exp)
+            users.append(user)
+        return users
+
+    def _outcome_of(self, user):
+        outcome = UserWeeklyOutcome.objects.get(user=user)
+        return outcome.finished_rank, outcome.old_league, outcome.new_league
+
+    def _new_league_of(self, user):
+        placement = UserLeaguePlacement.objects.filter(user=user).select_related("league_group__league").first()
+        return placement.league_group.league.name if placement else None
+
+    def test_reset_matches_per_row_rules(self):
+        bronze = self._group("Bronze", range(25, 0, -1), "bronze")  # 25 users, bottom 7 locked out
+        small_bronze = self._group("Bronze", [30, 20, 10, 9, 8, 7, 6, 5, 0], "small")
+        silver = self._group("Silver", range(24, 0, -1), "silver")  # 24 users, bottom 7 demoted
+        obsidian = self._group("Obsidian", [300, 200, 100], "obsidian")
+        stale = self._group("Bronze", [999], "stale", current_league="")[0]
+        waiting = CustomUser.objects.create_user(email="waiting@example.com", exp_to_enter=10)
+        rejoining = CustomUser.objects.create_user(email="rejoining@example.com", exp_to_enter=EXP_TO_REJOIN)
+
+        reset_leagues()
+
+        for user in bronze + small_bronze + silver + obsidian + [stale, waiting, rejoining]:
+            user.refresh_from_db()
+
+        self.assertEqual(self._outcome_of(bronze[0]), (1, "Bronze", "Silver"))
+        self.assertEqual(self._outcome_of(bronze[10]), (11, "Bronze", "Bronze"))
+        self.assertEqual(self._outcome_of(bronze[24]), (25, "Bronze", ""))
+        self.assertEqual(bronze[0].current_league, "Silver")
+        self.assertEqual(bronze[0].exp_this_league, 0)
+        self.assertEqual(bronze[10].current_league, "Bronze")
+        for user in bronze[18:]:
+            self.assertEqual((user.current_league, user.exp_to_enter), ("", EXP_TO_REJOIN))
+            self.assertIsNone(self._new_league_of(user))
+
+        # A 0 XP Bronze user outside the bottom slice keeps playing but owes EXP_TO_REJOIN.
+        self.assertEqual(small_bronze[8].current_league, "Bronze")
+        self.assertEqual(small_bronze[8].exp_to_enter, EXP_TO_REJOIN)
+        self.assertEqual(self._outcome_of(small_bronze[8]), (9, "Bronze", "Bronze"))
+
+        self.assertEqual(self._outcome_of(silver[23]), (24, "Silver", "Bronze"))
+        self.assertEqual(self._new_league_of(silver[23]), "Bronze")
+        self.assertEqual(self._new_league_of(silver[0]), "Gold")
+
+        for rank, user in enumerate(obsidian, start=1):
+            self.assertEqual(self._outcome_of(user), (rank, "Obsidian", "Obsidian"))
+            self.assertEqual(user.gems_count, 10 + DIAMOND_GEM_REWARD)
+        self.assertEqual(silver[0].gems_count, 10)
+
+        self.assertFalse(UserWeeklyOutcome.objects.filter(user=stale).exists())
+        self.assertEqual(waiting.exp_to_enter, 0)
+        self.assertEqual(rejoining.exp_to_enter, EXP_TO_REJOIN)
+
+        self.assertFalse(LeagueGroup.objects.filter(week_start=self.week_start).exists())
+        # Each league's new groups are formed from one pool: Silver 24, Bronze 20, Gold 7, Obsidian 3.
+        self.assertEqual(LeagueGroup.objects.count(), 4)
+        self.assertEqual(UserLeaguePlacement.objects.count(), 18 + 9 + 24 + 3)
+
+    def test_existing_outcome_is_updated_in_place(self):
+        user = self._group("Gold", [50], "gold")[0]
+        previous = UserWeeklyOutcome.objects.create(user=user, finished_rank=9, old_league="Silver", new_league="Gold")
+
+        reset_leagues()
+
+        outcome = UserWeeklyOutcome.objects.get(user=user)
+        self.assertEqual(outcome.pk, previous.pk)
+        self.assertEqual((outcome.finished_rank, outcome.old_league, outcome.new_league), (1, "Gold", "Platinum"))
+
+
+class SerpentineGroupsTest(SimpleTestCase):
+    def test_groups_are_balanced_in_size_and_exp(self):
+        members = [(user_id, 1000 - user_id) for user_id in range(1, 66)]  # user 1 has the most exp
+
+        groups = serpentine_groups(members)
+
+        self.assertEqual(sorted(len(g) for g in groups), [21, 22, 22])
+        self.assertEqual([g[:2] for g in groups], [[1, 6], [2, 5], [3, 4]])
+        totals = [sum(1000 - user_id for user_id in g) for g in groups]
+        self.assertLess(max(totals) - min(totals), 1000)
+
+    def test_split_keeps_the_container_type(self):
+        members = [(user_id, 1000 - user_id) for user_id in range(1, 66)]
+        ordered = array("q", range(1, 66))
+
+        groups = serpentine_split(ordered)
+
+        self.assertTrue(all(isinstance(g, array) for g in groups))
+        self.assertEqual([g.tolist() for g in groups], serpentine_groups(members))
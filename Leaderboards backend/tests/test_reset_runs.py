@@ -0,0 +1,79 @@
+# leaderboards/tests/test_reset_runs.py
+
+import io
+from datetime import timedelta
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from accounts.models import CustomUser
+from leaderboards import league_service
+from leaderboards.models import League, LeagueGroup, ResetRun, UserLeaguePlacement
+from leaderboards.league_service import get_previous_monday_0001_utc, reset_leagues, LEAGUES_ORDER
+from leaderboards.management.commands.reset_trends import fit_line
+
+
+class ResetRunTest(TestCase):
+    def setUp(self):
+        for i, name in enumerate(LEAGUES_ORDER):
+            League.objects.create(name=name, icon="league_icons/default.png", order=i)
+        self.week_start = get_previous_monday_0001_utc().date()
+        for g in range(2):
+            group = LeagueGroup.objects.create(league=League.objects.get(name="Bronze"), week_start=self.week_start)
+            for i in range(25):
+                user = CustomUser.objects.create_user(email=f"b{g}_{i}@example.com", current_league="Bronze")
+                UserLeaguePlacement.objects.create(user=user, league_group=group, exp_earned=i + 1)
+        CustomUser.objects.create_user(email="out@example.com", current_league="", exp_to_enter=5)
+
+    def test_reset_records_its_run(self):
+        with mock.patch("leaderboards.league_service.mark_group_dirty"):
+            reset_leagues()
+
+        run = ResetRun.objects.get()
+        self.assertEqual((run.week_start, run.mode, run.status), (self.week_start, ResetRun.SINGLE, ResetRun.DONE))
+        self.assertEqual(
+            (run.locked_out_users, run.groups_processed, run.users_processed, run.new_groups), (1, 2, 50, 2)
+        )
+        self.assertEqual(run.tier_moves, {"Bronze": {"up": 14, "locked_out": 14, "stay": 22}})
+        self.assertEqual(set(run.phase_seconds), set(ResetRun.PHASES))
+        self.assertGreater(run.rows_deleted, 50)  # groups, their placements and leaderboard rows
+        self.assertGreaterEqual(run.duration_seconds, sum(run.phase_seconds.values()) - 0.01)
+
+        # A second reset of the same cycle finds no groups left.
+        reset_leagues()
+        self.assertEqual(ResetRun.objects.latest("id").status, ResetRun.SKIPPED)
+
+    def test_failure_is_recorded_and_raised(self):
+        with mock.patch.object(league_service, "build_reset_plan", side_effect=RuntimeError("out of memory")):
+            with self.assertRaises(RuntimeError):
+                reset_leagues()
+
+        run = ResetRun.objects.get()
+        self.assertEqual((run.status, run.error), (ResetRun.FAILED, "RuntimeError: out of memory"))
+        # Nothing the rolled-back transaction did is counted.
+        self.assertEqual((run.locked_out_users, run.users_processed, run.tier_moves), (0, 0, {}))
+        self.assertEqual(LeagueGroup.objects.filter(week_start=self.week_start).count(), 2)  # rolled back
+        self.assertIsNotNone(run.finished_at)
+
+
+class ResetTrendsTest(TestCase):
+    def test_projects_the_window(self):
+        started = timezone.now() - timedelta(weeks=3)
+        for week, (users, seconds) in enumerate([(100000, 120.0), (200000, 220.0), (300000, 320.0)]):
+            ResetRun.objects.create(
+                week_start=started.date() + timedelta(weeks=week), started_at=started + timedelta(weeks=week),
+                status=ResetRun.DONE, users_processed=users, duration_seconds=seconds,
+                phase_seconds={"plan": seconds / 2},
+            )
+        ResetRun.objects.create(week_start=started.date(), status=ResetRun.FAILED, error="boom")
+
+        out = io.StringIO()
+        call_command("reset_trends", "--window-minutes", "10", stdout=out)
+        output = out.getvalue()
+
+        self.assertEqual(fit_line([(1, 3.0), (2, 5.0), (3, 7.0)]), (1.0, 2.0))
+        self.assertIsNone(fit_line([(5, 1.0), (5, 2.0)]))
+        self.assertIn("Trend: 20.00s + 1000.0 us per user.", output)
+        self.assertIn("outgrows the window at about 580,000 users", output)
+        self.assertIn("failed", output)
@@ -0,0 +1,70 @@
+# leaderboards/tests/test_reset_simulation.py
+
+import io
+import json
+from collections import Counter
+
+from celery import current_app
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from accounts.models import CustomUser
+from leaderboards.models import League, LeagueGroup, UserLeaguePlacement, UserWeeklyOutcome
+from leaderboards.league_service import get_previous_monday_0001_utc, reset_leagues, reset_leagues_task, LEAGUES_ORDER
+from leaderboards.reset_simulation import simulate_reset
+
+
+class ResetSimulationTest(TestCase):
+    def setUp(self):
+        for i, name in enumerate(LEAGUES_ORDER):
+            League.objects.create(name=name, icon="league_icons/default.png", order=i)
+        week_start = get_previous_monday_0001_utc().date()
+        for league_name, size in (("Bronze", 26), ("Gold", 24), ("Gold", 9), ("Obsidian", 8)):
+            group = LeagueGroup.objects.create(league=League.objects.get(name=league_name), week_start=week_start)
+            for i in range(size):
+                user = CustomUser.objects.create_user(
+                    email=f"{league_name.lower()}{group.id}_{i}@example.com", current_league=league_name
+                )
+                UserLeaguePlacement.objects.create(user=user, league_group=group, exp_earned=size - i)
+        CustomUser.objects.create_user(email="waiting@example.com", current_league="", exp_to_enter=10)
+
+    def test_simulation_writes_nothing_and_predicts_the_reset(self):
+        diff = io.StringIO()
+        with CaptureQueriesContext(connection) as queries:
+            summary = simulate_reset(diff_file=diff, chunk_groups=2)
+
+        writes = [
+            q["sql"] for q in queries
+            if q["sql"].split(" ", 1)[0].upper() in ("INSERT", "UPDATE", "DELETE")
+        ]
+        self.assertEqual(writes, [])
+        lines = [json.loads(line) for line in diff.getvalue().splitlines()]
+        self.assertEqual(len(lines), 26 + 24 + 9 + 8)
+        self.assertEqual(summary["tiers"]["Bronze"]["locked_out"], 7)
+        self.assertEqual(summary["tiers"]["Obsidian"]["gems"], 7)
+        self.assertEqual(summary["locked_out_reset"], 1)
+
+        reset_leagues()
+
+        moves = Counter((line["user_id"], line["old_league"], line["new_league"]) for line in lines)
+        actual = Counter(UserWeeklyOutcome.objects.values_list("user_id", "old_league", "new_league"))
+        self.assertEqual(moves, actual)
+        self.assertEqual(
+            summary["new_groups"],
+            dict(Counter(LeagueGroup.objects.values_list("league__name", flat=True))),
+        )
+
+    def test_simulation_predicts_the_sharded_reset(self):
+        summary = simulate_reset(chunk_groups=1)
+
+        eager = (current_app.conf.task_always_eager, current_app.conf.task_eager_propagates)
+        current_app.conf.task_always_eager = current_app.conf.task_eager_propagates = True
+        try:
+            reset_leagues_task.delay()
+        finally:
+            current_app.conf.task_always_eager, current_app.conf.task_eager_propagates = eager
+
+        self.assertEqual(
+            summary["new_groups"],
+            dict(Counter(LeagueGroup.objects.values_list("league__name", flat=True))),
+        )
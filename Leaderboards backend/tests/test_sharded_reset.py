@@ -0,0 +1,221 @@
+# leaderboards/tests/test_sharded_reset.py
+
+from collections import Counter
+from datetime import timedelta
+from unittest import mock
+
+from celery import current_app
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from accounts.models import CustomUser
+from leaderboards import league_service
+from leaderboards.models import (
+    League,
+    LeagueGroup,
+    LeagueResetCheckpoint,
+    ResetPoolEntry,
+    ResetRun,
+    UserLeaguePlacement,
+    UserWeeklyOutcome,
+)
+from leaderboards.league_service import (
+    finish_sharded_reset,
+    place_user_in_bronze_task,
+    reset_league_shard,
+    reset_leagues_task,
+    get_previous_monday_0001_utc,
+    LEAGUES_ORDER,
+)
+
+
+class ShardedResetTest(TestCase):
+    def setUp(self):
+        self._eager = (current_app.conf.task_always_eager, current_app.conf.task_eager_propagates)
+        current_app.conf.task_always_eager = True
+        current_app.conf.task_eager_propagates = True
+
+        self.leagues = {}
+        for i, name in enumerate(LEAGUES_ORDER):
+            self.leagues[name] = League.objects.create(name=name, icon="league_icons/default.png", order=i)
+        self.week_start = get_previous_monday_0001_utc().date()
+
+        self.users = []
+        for league_name in ("Bronze", "Silver", "Gold", "Obsidian"):
+            for g in range(2):
+                group = LeagueGroup.objects.create(league=self.leagues[league_name], week_start=self.week_start)
+                for i in range(25):
+                    user = CustomUser.objects.create_user(
+                        email=f"{league_name}{g}_{i}@example.com",
+                        current_league=league_name,
+                        exp_this_league=i + 1,
+                    )
+                    UserLeaguePlacement.objects.create(user=user, league_group=group, exp_earned=i + 1)
+                    self.users.append(user)
+
+    def tearDown(self):
+        current_app.conf.task_always_eager, current_app.conf.task_eager_propagates = self._eager
+
+    def _checkpoint_statuses(self):
+        return dict(
+            LeagueResetCheckpoint.objects.filter(week_start=self.week_start)
+            .values_list("league_name", "status")
+        )
+
+    def test_every_tier_runs_as_its_own_shard(self):
+        reset_leagues_task.delay()
+
+        self.assertEqual(set(self._checkpoint_statuses().values()), {LeagueResetCheckpoint.DONE})
+        gold = LeagueResetCheckpoint.objects.get(week_start=self.week_start, league_name="Gold")
+        self.assertEqual((gold.groups_done, gold.users_done), (2, 50))
+
+        run = ResetRun.objects.get()
+        self.assertEqual((run.mode, run.status), (ResetRun.SHARDED, ResetRun.DONE))
+        self.assertEqual((run.groups_processed, run.users_processed), (8, len(self.users)))
+        self.assertEqual(set(run.phase_seconds), set(ResetRun.PHASES))
+        # Top 7 of each group move up, bottom 7 down; Bronze's bottom 7 are locked out instead.
+        self.assertEqual(run.tier_moves["Silver"], {"up": 14, "down": 14, "stay": 22})
+        self.assertEqual(run.tier_moves["Bronze"], {"up": 14, "locked_out": 14, "stay": 22})
+        self.assertEqual(run.tier_moves["Obsidian"], {"down": 14, "stay": 36})
+        self.assertFalse(LeagueGroup.objects.filter(week_start=self.week_start).exists())
+        self.assertEqual(UserWeeklyOutcome.objects.count(), len(self.users))
+        # Bronze bottom 7 of each group are locked out; everyone else holds exactly one placement.
+        self.assertEqual(UserLeaguePlacement.objects.count(), len(self.users) - 14)
+        self.assertEqual(
+            UserLeaguePlacement.objects.values("user").distinct().count(), len(self.users) - 14
+        )
+
+    def test_failed_shard_resumes_without_reprocessing_finished_groups(self):
+        real_apply = league_service.apply_reset_plan
+        calls = Counter()
+
+        def flaky_apply(plan, new_cycle_monday, league_map, **kwargs):
+            for old_league in {old for _, old, _ in plan.outcomes.values()}:
+                calls[old_league] += 1
+            if calls["Gold"] == 1:
+                raise RuntimeError("worker lost")
+            return real_apply(plan, new_cycle_monday, league_map, **kwargs)
+
+        with mock.patch.object(league_service, "apply_reset_plan", side_effect=flaky_apply):
+            with self.assertRaisesMessage(RuntimeError, "worker lost"):
+                reset_leagues_task.delay()
+            failed = ResetRun.objects.get()
+            self.assertEqual((failed.mode, failed.status), (ResetRun.SHARDED, ResetRun.FAILED))
+            self.assertEqual(failed.error, "RuntimeError: worker lost")
+            # The Gold slice that rolled back is not counted; the tiers that committed are.
+            self.assertEqual((set(failed.tier_moves), failed.users_processed), ({"Bronze", "Silver"}, 100))
+            statuses = self._checkpoint_statuses()
+            self.assertEqual(statuses["Gold"], LeagueResetCheckpoint.FAILED)
+            self.assertEqual(statuses["Bronze"], LeagueResetCheckpoint.DONE)
+            self.assertEqual(
+                LeagueGroup.objects.filter(week_start=self.week_start, league__name="Gold").count(), 2
+            )
+
+            reset_leagues_task.delay()
+
+        self.assertEqual(set(self._checkpoint_statuses().values()), {LeagueResetCheckpoint.DONE})
+        self.assertEqual(calls, {"Bronze": 1, "Silver": 1, "Gold": 2, "Obsidian": 1})
+        self.assertEqual(UserWeeklyOutcome.objects.filter(old_league="Gold").count(), 50)
+        self.assertEqual(UserLeaguePlacement.objects.count(), len(self.users) - 14)
+        # The resumed attempt is its own run and only counts the tiers it processed.
+        resumed = ResetRun.objects.exclude(pk=failed.pk).get()
+        self.assertEqual(resumed.status, ResetRun.DONE)
+        self.assertEqual(set(resumed.tier_moves), {"Gold", "Obsidian"})
+        self.assertEqual(resumed.users_processed, 100)
+
+
+class ShardedGroupFormationTest(TestCase):
+    def setUp(self):
+        self._eager = (current_app.conf.task_always_eager, current_app.conf.task_eager_propagates)
+        current_app.conf.task_always_eager = True
+        current_app.conf.task_eager_propagates = True
+
+        for i, name in enumerate(LEAGUES_ORDER):
+            League.objects.create(name=name, icon="league_icons/default.png", order=i)
+        self.week_start = get_previous_monday_0001_utc().date()
+        for league_name in ("Silver", "Gold", "Platinum"):
+            group = LeagueGroup.objects.create(league=League.objects.get(name=league_name), week_start=self.week_start)
+            for i in range(30):
+                user = CustomUser.objects.create_user(
+                    email=f"{league_name}_{i}@example.com", current_league=league_name, exp_this_league=i
+                )
+                UserLeaguePlacement.objects.create(user=user, league_group=group, exp_earned=i)
+
+    def tearDown(self):
+        current_app.conf.task_always_eager, current_app.conf.task_eager_propagates = self._eager
+
+    def test_new_groups_pool_every_tier_feeding_a_league(self):
+        reset_leagues_task.delay()
+
+        sizes = {}
+        for league_name, member_count in LeagueGroup.objects.values_list("league__name", "member_count"):
+            sizes.setdefault(league_name, []).append(member_count)
+        # Gold takes Silver's top 7, keeps its middle 16 and gets Platinum's bottom 7: one full group.
+        self.assertEqual(sizes, {"Bronze": [7], "Silver": [23], "Gold": [30], "Platinum": [23], "Diamond": [7]})
+        gold = LeagueGroup.objects.get(league__name="Gold")
+        self.assertEqual(gold.placements.count(), 30)
+        self.assertEqual(gold.board_rows.count(), 30)
+        self.assertFalse(ResetPoolEntry.objects.exists())
+        self.assertEqual(ResetRun.objects.get().new_groups, 5)
+
+    def test_failed_group_formation_is_retried_on_its_own(self):
+        real_form = league_service.form_staged_groups
+        with mock.patch.object(league_service, "form_staged_groups", side_effect=RuntimeError("broker gone")):
+            with self.assertRaisesMessage(RuntimeError, "broker gone"):
+                reset_leagues_task.delay()
+        self.assertEqual(ResetPoolEntry.objects.count(), 90)
+        self.assertFalse(LeagueGroup.objects.exists())
+
+        with mock.patch.object(league_service, "form_staged_groups", side_effect=real_form) as form:
+            reset_leagues_task.delay()
+        form.assert_called_once()
+        self.assertEqual(LeagueGroup.objects.count(), 5)
+        self.assertFalse(ResetPoolEntry.objects.exists())
+        self.assertEqual(
+            list(ResetRun.objects.order_by("started_at").values_list("status", flat=True)),
+            [ResetRun.FAILED, ResetRun.DONE],
+        )
+
+
+class StagedUserPlacementTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        for i, name in enumerate(LEAGUES_ORDER):
+            League.objects.create(name=name, icon="league_icons/default.png", order=i)
+        self.week_start = get_previous_monday_0001_utc().date()
+        group = LeagueGroup.objects.create(league=League.objects.get(name="Silver"), week_start=self.week_start)
+        self.users = []
+        for i in range(10):
+            user = CustomUser.objects.create_user(
+                email=f"s{i}@example.com", current_league="Silver", exp_this_league=i + 1
+            )
+            UserLeaguePlacement.objects.create(user=user, league_group=group, exp_earned=i + 1)
+            self.users.append(user)
+        LeagueResetCheckpoint.objects.create(week_start=self.week_start, league_name="Silver")
+
+    def test_user_staged_between_shard_and_group_formation_is_not_sent_to_bronze(self):
+        top = self.users[-1]
+        result = reset_league_shard("Silver", self.week_start)
+        self.assertTrue(ResetPoolEntry.objects.filter(user=top).exists())
+
+        # A poll in the window: the view does not enqueue, and a task already queued does not place.
+        client = APIClient()
+        client.force_authenticate(top)
+        with mock.patch("leaderboards.views.place_user_in_bronze_task") as task:
+            client.get(reverse("current-league"))
+        task.delay.assert_not_called()
+        place_user_in_bronze_task(top.id)
+        self.assertFalse(UserLeaguePlacement.objects.filter(user=top).exists())
+
+        finish_sharded_reset([result], self.week_start)
+
+        top.refresh_from_db()
+        self.assertEqual(top.current_league, "Gold")
+        self.assertEqual(
+            list(UserLeaguePlacement.objects.filter(user=top).values_list(
+                "league_group__league__name", "league_group__week_start"
+            )),
+            [("Gold", self.week_start + timedelta(days=7))],
+        )
+        self.assertFalse(LeagueGroup.objects.filter(league__name="Bronze", week_start=self.week_start).exists())
@@ -0,0 +1,46 @@
+# leaderboards/tests/test_xp_ingest.py
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from accounts.models import CustomUser
+from leaderboards.models import League, LeagueGroup, UserLeaguePlacement
+from leaderboards.league_service import get_previous_monday_0001_utc
+from leaderboards.xp_ingest import XPIngestBuffer, flush_events
+
+
+class XPIngestBufferTest(TestCase):
+    def setUp(self):
+        league = League.objects.create(name="Bronze", icon="league_icons/default.png", order=0)
+        group = LeagueGroup.objects.create(league=league, week_start=get_previous_monday_0001_utc().date())
+        self.users = [CustomUser.objects.create_user(email=f"xp{i}@example.com") for i in range(3)]
+        for user in self.users[:2]:
+            UserLeaguePlacement.objects.create(user=user, league_group=group, exp_earned=0)
+
+    def test_events_are_coalesced_into_one_update_per_table(self):
+        buffer = XPIngestBuffer()
+        for _ in range(50):
+            buffer.record(self.users[0].id, 2)
+            buffer.record(self.users[1].id, 1)
+        buffer.record(self.users[2].id, 7)  # no placement this cycle
+        applied_before = flush_events.value
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(buffer.flush(), 3)
+
+        updates = [q for q in queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 2)
+        self.assertEqual(flush_events.value - applied_before, 101)
+
+        exp = dict(CustomUser.objects.filter(email__startswith="xp").values_list("email", "exp_this_league"))
+        self.assertEqual(exp, {"xp0@example.com": 100, "xp1@example.com": 50, "xp2@example.com": 7})
+        self.assertEqual(
+            sorted(UserLeaguePlacement.objects.values_list("exp_earned", flat=True)), [50, 100]
+        )
+        self.assertEqual(buffer.flush(), 0)
+
+    def test_buffer_flushes_early_when_full(self):
+        buffer = XPIngestBuffer(max_events=3)
+        for _ in range(3):
+            buffer.record(self.users[0].id, 1)
+        self.assertEqual(UserLeaguePlacement.objects.get(user=self.users[0]).exp_earned, 3)
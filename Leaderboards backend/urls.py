@@ -1,11 +1,13 @@
 # leaderboards/urls.py
 
 from django.urls import path
-from .views import CurrentLeagueView
+from .views import CurrentLeagueView, LeaderboardAroundView, metrics_view
 
 
 urlpatterns = [
     path("current-league/", CurrentLeagueView.as_view(), name="current-league"),
+    path("current-league/around/", LeaderboardAroundView.as_view(), name="leaderboard-around"),
+    path("metrics/", metrics_view, name="leaderboard-metrics"),
 ]
 
 
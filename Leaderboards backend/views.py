@@ -1,5 +1,6 @@
 # leaderboards/views.py
 
+import hashlib
 import logging
 
 logger = logging.getLogger(__name__)
@@ -8,20 +9,66 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control
+from django.utils.crypto import constant_time_compare
+from django.utils.http import parse_etags, quote_etag
 from django.utils.timezone import now
 from datetime import timedelta, timezone
 
-from .models import LeagueGroup, UserLeaguePlacement, League, UserWeeklyOutcome
-from .serializers import UserPlacementSerializer, LeagueSerializer
+from .models import LeaderboardRow, UserLeaguePlacement, UserWeeklyOutcome
+from .league_catalog import get_league_catalog
+from .leaderboard_cache import get_group_snapshot, group_version, snapshot_age
+from .metrics import REGISTRY, TEXT_CONTENT_TYPE, render_text
+from .instrumentation import InstrumentedViewMixin, span
+from .broadcast import mark_group_dirty
 from accounts.models import CustomUser
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
 
 # Import these helpers from your league_service.py (adjust path if needed)
-from .league_service import get_next_monday_0001_utc, get_previous_monday_0001_utc
-
-
-class CurrentLeagueView(APIView):
+from .league_service import (
+    get_next_monday_0001_utc,
+    get_previous_monday_0001_utc,
+    place_user_in_bronze_task,
+    staged_for_reset,
+    LEAGUE_CAPACITY,
+)
+
+# Columns a client may ask for with ?fields=; email only when asked for explicitly.
+ROW_FIELDS = ("rank", "username", "exp_earned", "email")
+DEFAULT_ROW_FIELDS = ("rank", "username", "exp_earned")
+AROUND_DEFAULT_K = 3
+PAGE_DEFAULT_LIMIT = 10
+
+
+etag_requests = REGISTRY.counter(
+    "leaderboards_current_league_etag_total",
+    "current-league requests by If-None-Match result: hit (304), miss, unconditional.",
+    labelnames=("result",),
+)
+
+
+def current_league_etag(placement, board_version, outcome_data, leagues_version):
+    """
+    Versions what a current-league response shows: the group's board, the caller's
+    league, outcome and the league catalog. board_version is the group_version() of
+    the group, the one its snapshot is read under. countdown_seconds and server_time_utc are
+    left out; clients holding a cached body count down from the response Date.
+    """
+    parts = (
+        placement.league_group_id,
+        placement.league_group.week_start.isoformat(),
+        placement.league_group.league.name,
+        board_version,
+        outcome_data["finished_rank"],
+        outcome_data["old_league"],
+        outcome_data["new_league"],
+        leagues_version,
+    )
+    return quote_etag(hashlib.sha1("|".join(map(str, parts)).encode()).hexdigest()[:20])
+
+
+class CurrentLeagueView(InstrumentedViewMixin, APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
@@ -33,7 +80,8 @@ class CurrentLeagueView(APIView):
         monday_start_date = monday_start_dt.date()
         logger.debug(f"[CurrentLeagueView] monday_start_dt={monday_start_dt}, monday_start_date={monday_start_date}")
 
-        lowest_league = League.objects.order_by("order").first()
+        catalog = get_league_catalog()
+        lowest_league = catalog.lowest
         if not lowest_league:
             logger.error("[CurrentLeagueView] No leagues defined.")
             return Response({"error": "No leagues defined."}, status=500)
@@ -56,54 +104,67 @@ class CurrentLeagueView(APIView):
                 "countdown_seconds": 0,
             })
 
-        placement = (
-            UserLeaguePlacement.objects
-            .filter(user=user, league_group__week_start=monday_start_date)
-            .select_related("league_group__league")
-            .first()
-        )
-        if not placement:
-            logger.debug(f"[CurrentLeagueView] No placement found for user={user.id} in week_start={monday_start_date}")
-            league_group, _ = LeagueGroup.objects.get_or_create(
-                league=lowest_league, week_start=monday_start_date
+        with span("placement"):
+            placement = (
+                UserLeaguePlacement.objects
+                .filter(user=user, league_group__week_start=monday_start_date)
+                .select_related("league_group__league")
+                .first()
             )
-            logger.debug(f"[CurrentLeagueView] league_group={league_group}, created={_}")
-            placement = UserLeaguePlacement.objects.create(
-                user=user, league_group=league_group, exp_earned=0
+
+            outcome_data = {"finished_rank": 0, "old_league": "", "new_league": ""}
+            try:
+                outcome = user.userweeklyoutcome
+                outcome_data = {
+                    "finished_rank": outcome.finished_rank,
+                    "old_league": outcome.old_league,
+                    "new_league": outcome.new_league,
+                }
+            except:
+                pass
+
+        leagues_version, leagues_serialized = catalog.content_version, catalog.serialized
+
+        etag = None
+        if placement:
+            board_version = group_version(placement.league_group_id)
+            etag = current_league_etag(placement, board_version, outcome_data, leagues_version)
+            if request.headers.get("If-None-Match"):
+                if etag in parse_etags(request.headers["If-None-Match"]):
+                    # The client's copy is current: skip the snapshot and the serialization.
+                    etag_requests.labels(result="hit").inc()
+                    response = Response(status=304)
+                    response["ETag"] = etag
+                    patch_cache_control(response, private=True, no_cache=True)
+                    return response
+                etag_requests.labels(result="miss").inc()
+            else:
+                etag_requests.labels(result="unconditional").inc()
+
+        if placement:
+            logger.debug(f"[CurrentLeagueView] Found placement: {placement}")
+            current_league_name = placement.league_group.league.name
+            with span("snapshot"):
+                snapshot = get_group_snapshot(placement.league_group, board_version)
+            ranked_serialized = snapshot["leaderboard"]
+            snapshot_age_seconds = snapshot_age(snapshot)
+            logger.debug(
+                f"[CurrentLeagueView] group={placement.league_group_id} rows={len(ranked_serialized)}, "
+                f"snapshot_age={snapshot_age_seconds:.3f}s"
             )
-            logger.info(f"[CurrentLeagueView] Created new placement for user={user.username} in {lowest_league.name}")
         else:
-            logger.debug(f"[CurrentLeagueView] Found placement: {placement}")
-
-        if placement.exp_earned != user.exp_this_league:
-            logger.debug(f"[CurrentLeagueView] Updating placement EXP for user={user.username}")
-            placement.exp_earned = user.exp_this_league
-            placement.save()
-
-        group_placements = (
-            UserLeaguePlacement.objects
-            .filter(league_group=placement.league_group)
-            .select_related("user")
-        )
-        logger.debug(f"[CurrentLeagueView] group_placements count={len(group_placements)}")
-        for p in group_placements:
-            logger.debug(f"[CurrentLeagueView] User={p.user.username}, exp_earned={p.exp_earned}")
-
-        sorted_placements = sorted(group_placements, key=lambda x: x.exp_earned, reverse=True)
-        logger.debug(f"[CurrentLeagueView] Sorted placements: {[p.user.username for p in sorted_placements]}")
-
-        ranked_serialized = []
-        for index, p in enumerate(sorted_placements):
-            data = UserPlacementSerializer(p).data
-            data["rank"] = index + 1
-            ranked_serialized.append(data)
-
-        all_leagues = League.objects.order_by("order")
-        logger.debug(f"[CurrentLeagueView] Total leagues count={all_leagues.count()}")
-        for league in all_leagues:
-            logger.debug(f"[CurrentLeagueView] League: {league.name}, order={league.order}")
+            # This view never writes, so it can be served from a read replica: the
+            # placement is created by a task and shows up on the next request.
+            logger.debug(f"[CurrentLeagueView] No placement found for user={user.id} in week_start={monday_start_date}")
+            if not staged_for_reset(monday_start_date).filter(user=user).exists():
+                place_user_in_bronze_task.delay(user.id)
+            current_league_name = lowest_league.name
+            ranked_serialized = []
+            snapshot_age_seconds = None
 
-        leagues_serialized = LeagueSerializer(all_leagues, many=True).data
+        logger.debug(f"[CurrentLeagueView] Total leagues count={len(leagues_serialized)}")
+        for league in leagues_serialized:
+            logger.debug(f"[CurrentLeagueView] League: {league['name']}, order={league['order']}")
 
         next_monday_dt = get_next_monday_0001_utc(current_time)
         delta = next_monday_dt - current_time.astimezone(timezone.utc)
@@ -113,19 +174,8 @@ class CurrentLeagueView(APIView):
 
         logger.debug(f"[CurrentLeagueView] current_time={current_time}, next_monday_dt={next_monday_dt}, countdown_seconds={countdown_seconds}")
 
-        outcome_data = {"finished_rank": 0, "old_league": "", "new_league": ""}
-        try:
-            outcome = user.userweeklyoutcome
-            outcome_data = {
-                "finished_rank": outcome.finished_rank,
-                "old_league": outcome.old_league,
-                "new_league": outcome.new_league,
-            }
-        except:
-            pass
-
         response_data = {
-            "currentLeague": placement.league_group.league.name,
+            "currentLeague": current_league_name,
             "outcome": outcome_data,
             "leaderboard": ranked_serialized,
             "leagues": leagues_serialized,
@@ -134,41 +184,163 @@ class CurrentLeagueView(APIView):
         }
         logger.debug(f"[CurrentLeagueView] Response data: {response_data}")
 
-        return Response(response_data)
+        response = Response(response_data)
+        if snapshot_age_seconds is not None:
+            response["X-Leaderboard-Snapshot-Age"] = f"{snapshot_age_seconds:.3f}"
+        if etag is not None:
+            response["ETag"] = etag
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
 
 
     def send_leaderboard_update(user):
-        placements = (
-            UserLeaguePlacement.objects.filter(league_group__users=user)
-            .select_related("user", "league_group__league")
-            .order_by("-exp_earned")
+        """Schedules a delta broadcast of the user's current board (debounced per group)."""
+        league_group_id = (
+            UserLeaguePlacement.objects.filter(user=user)
+            .order_by("-league_group__week_start")
+            .values_list("league_group_id", flat=True)
+            .first()
         )
+        if league_group_id is not None:
+            mark_group_dirty(league_group_id)
 
-        for placement in placements:
-            if placement.exp_earned != placement.user.exp_this_league:
-                placement.exp_earned = placement.user.exp_this_league
-                placement.save()
-
-        leaderboard = [
-            {
-                "username": placement.user.username,
-                "email": placement.user.email,
-                "exp_earned": placement.exp_earned,
-                "rank": idx + 1,
-            }
-            for idx, placement in enumerate(placements)
-        ]
-
-        current_league = (
-            placements.first().league_group.league.name if placements.exists() else "Unknown League"
+
+class LeaderboardAroundView(InstrumentedViewMixin, APIView):
+    """
+    A slice of the caller's board, for clients that cannot afford the whole group.
+
+    GET current-league/around/
+      ?k=3                 the caller's row with up to k neighbours on each side (default)
+      ?after=0&limit=10    cursor mode: rows ranked below `after`; "next" is the cursor for
+                           the following page, null on the last one. Ranks move as XP comes
+                           in, so a walk over a live board can repeat or skip a row.
+      ?fields=rank,username   columns per row, out of rank, username, exp_earned, email
+      ?leagues_version=...    the catalog version the client holds; "leagues" is left out
+                              while it is current
+    Rows are read from LeaderboardRow with one range scan over (league_group, rank).
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        user = request.user
+        try:
+            fields = self._fields(request.query_params.get("fields"))
+            k = self._bounded_int(request.query_params, "k", AROUND_DEFAULT_K, 0, LEAGUE_CAPACITY)
+            limit = self._bounded_int(request.query_params, "limit", PAGE_DEFAULT_LIMIT, 1, LEAGUE_CAPACITY)
+            after = self._bounded_int(request.query_params, "after", None, 0, None)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+
+        current_time = now()
+        week_start = get_previous_monday_0001_utc(current_time).date()
+        countdown_seconds = max(
+            0, (get_next_monday_0001_utc(current_time) - current_time.astimezone(timezone.utc)).total_seconds()
         )
+        response_data = {
+            "currentLeague": user.current_league,
+            "rank": None,
+            "group_size": 0,
+            "leaderboard": [],
+            "countdown_seconds": countdown_seconds,
+        }
+        if user.current_league == "":
+            response_data["locked_out"] = True
+            response_data["countdown_seconds"] = 0
+        else:
+            with span("board"):
+                response_data.update(self._board_slice(user, week_start, fields, k, after, limit))
 
-        channel_layer = get_channel_layer()
-        async_to_sync(channel_layer.group_send)(
-            f"leaderboard_{user.id}",
-            {
-                "type": "send_leaderboard_update",
-                "leaderboard": leaderboard,
-                "current_league": current_league,
-            },
+        catalog = get_league_catalog()
+        response_data["leagues_version"] = catalog.content_version
+        if request.query_params.get("leagues_version") != catalog.content_version:
+            response_data["leagues"] = catalog.serialized
+        return Response(response_data)
+
+    def _board_slice(self, user, week_start, fields, k, after, limit):
+        me = (
+            LeaderboardRow.objects
+            .filter(user=user, week_start=week_start)
+            .values("league_group_id", "rank", "league_name", "league_group__member_count")
+            .first()
         )
+        if me is not None:
+            rows = LeaderboardRow.objects.filter(league_group_id=me["league_group_id"]).order_by("rank")
+            if after is None:
+                rows = rows.filter(rank__range=(me["rank"] - k, me["rank"] + k))
+            else:
+                rows = rows.filter(rank__gt=after)[:limit + 1]
+            rows = list(rows.values(*fields))
+            group_size = me["league_group__member_count"]
+        else:
+            placements = UserLeaguePlacement.objects.select_related("user", "league_group__league")
+            mine = placements.rank_of(user, week_start)
+            if mine is None:
+                logger.debug(f"[LeaderboardAroundView] No placement for user={user.id} in week_start={week_start}")
+                if not staged_for_reset(week_start).filter(user=user).exists():
+                    place_user_in_bronze_task.delay(user.id)
+                return {}
+            # A group whose rows were never built: rank the slice in the database instead.
+            me = {"rank": mine.rank, "league_name": mine.league_group.league.name}
+            group_size = mine.group_size
+            if after is None:
+                board = placements.around(user, week_start, k)
+            else:
+                board = placements.in_group_of(user, week_start).with_rank().filter(rank__gt=after).order_by("rank")
+                board = board[:limit + 1]
+            rows = [
+                {
+                    "rank": p.rank,
+                    "username": p.user.username,
+                    "exp_earned": p.exp_earned,
+                    "email": p.user.email,
+                }
+                for p in board
+            ]
+            rows = [{field: row[field] for field in fields} for row in rows]
+
+        data = {"currentLeague": me["league_name"], "rank": me["rank"], "group_size": group_size}
+        if after is not None:
+            # One extra row was read to tell whether another page follows.
+            data["next"] = after + limit if len(rows) > limit else None
+            rows = rows[:limit]
+        data["leaderboard"] = rows
+        return data
+
+    @staticmethod
+    def _fields(param):
+        if not param:
+            return DEFAULT_ROW_FIELDS
+        fields = tuple(dict.fromkeys(field.strip() for field in param.split(",") if field.strip()))
+        unknown = [field for field in fields if field not in ROW_FIELDS]
+        if unknown or not fields:
+            raise ValueError(f"fields must be a comma separated subset of {', '.join(ROW_FIELDS)}")
+        return fields
+
+    @staticmethod
+    def _bounded_int(params, name, default, low, high):
+        if name not in params:
+            return default
+        try:
+            value = int(params[name])
+        except ValueError:
+            raise ValueError(f"{name} must be an integer")
+        if value < low or (high is not None and value > high):
+            raise ValueError(f"{name} must be between {low} and {high}" if high is not None else f"{name} must be >= {low}")
+        return value
+
+
+def metrics_view(request):
+    """
+    Every metric in REGISTRY in the Prometheus text format, for staff sessions and for
+    scrapers sending LEADERBOARD_METRICS_TOKEN as "Authorization: Bearer <token>".
+    Without the setting only staff get in: the endpoint is never public.
+    """
+    token = getattr(settings, "LEADERBOARD_METRICS_TOKEN", None)
+    user = getattr(request, "user", None)
+    scraper = bool(token) and constant_time_compare(request.headers.get("Authorization", ""), f"Bearer {token}")
+    if not (scraper or (user is not None and user.is_staff)):
+        return HttpResponse(status=401 if token else 403)
+    response = HttpResponse(render_text(REGISTRY), content_type=TEXT_CONTENT_TYPE)
+    patch_cache_control(response, no_store=True)
+    return response
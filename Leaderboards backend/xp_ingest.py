@@ -0,0 +1,188 @@
+# leaderboards/xp_ingest.py
+
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F, IntegerField
+from django.db.models.expressions import RawSQL
+
+from .league_service import batched, get_previous_monday_0001_utc, league_group_changed
+from .ranking import get_ranking_store
+from .metrics import REGISTRY
+from .models import UserLeaguePlacement
+from accounts.models import CustomUser
+
+logger = logging.getLogger(__name__)
+
+XP_FLUSH_INTERVAL = 1.0  # seconds events are coalesced before a flush
+XP_FLUSH_MAX_EVENTS = 5000  # a buffer holding this many events flushes early
+XP_FLUSH_BATCH_SIZE = 500  # users per UPDATE ... CASE statement
+
+queue_depth = REGISTRY.gauge("leaderboards_xp_queue_depth", "XP events waiting in the ingest buffer.")
+flush_size = REGISTRY.histogram(
+    "leaderboards_xp_flush_users",
+    "Distinct users applied per XP flush.",
+    buckets=(1, 10, 50, 100, 500, 1000, 5000, 10000),
+)
+flush_events = REGISTRY.counter("leaderboards_xp_flushed_events_total", "XP events applied by flushes.")
+flush_latency = REGISTRY.histogram("leaderboards_xp_flush_seconds", "Time spent applying one XP flush.")
+event_lag = REGISTRY.histogram(
+    "leaderboards_xp_event_lag_seconds", "Age of the oldest event in a flush when it is applied."
+)
+
+
+class XPIngestBuffer:
+    """
+    Accepts XP events (user_id, delta, timestamp) and applies them in coalesced batches.
+
+    Deltas are summed per user; a flush writes the sums with one UPDATE on CustomUser and
+    one on UserLeaguePlacement per XP_FLUSH_BATCH_SIZE users, instead of two per event.
+    Call start() to flush every flush_interval seconds from a background thread, or
+    flush() directly.
+    """
+
+    def __init__(self, flush_interval=XP_FLUSH_INTERVAL, max_events=XP_FLUSH_MAX_EVENTS):
+        self.flush_interval = flush_interval
+        self.max_events = max_events
+        self._pending = defaultdict(int)
+        self._events = 0
+        self._oldest = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def record(self, user_id, delta, timestamp=None):
+        if timestamp is None:
+            timestamp = time.time()
+        with self._lock:
+            self._pending[user_id] += delta
+            self._events += 1
+            if self._oldest is None or timestamp < self._oldest:
+                self._oldest = timestamp
+            events = self._events
+        queue_depth.set(events)
+        if events >= self.max_events:
+            self.flush()
+
+    def flush(self):
+        """Applies everything buffered so far and returns the number of users written."""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, defaultdict(int)
+                events, self._events = self._events, 0
+                oldest, self._oldest = self._oldest, None
+            queue_depth.set(0)
+            if not pending:
+                return 0
+
+            started = time.perf_counter()
+            try:
+                apply_xp_deltas(pending)
+            except Exception:
+                # Put the events back so the next flush retries them.
+                with self._lock:
+                    for user_id, delta in pending.items():
+                        self._pending[user_id] += delta
+                    self._events += events
+                    self._oldest = oldest if self._oldest is None else min(oldest, self._oldest)
+                    queue_depth.set(self._events)
+                raise
+            flush_latency.observe(time.perf_counter() - started)
+            flush_size.observe(len(pending))
+            flush_events.inc(events)
+            event_lag.observe(max(0.0, time.time() - oldest))
+            return len(pending)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="xp-ingest-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"[xp_ingest] flush failed: {e}")
+            finally:
+                close_old_connections()
+
+
+def apply_xp_deltas(deltas):
+    """
+    Adds {user_id: delta} to exp_this_league and to the current-cycle placements,
+    like add_league_exp() does for a single user.
+    """
+    week_start = get_previous_monday_0001_utc().date()
+    with transaction.atomic():
+        for user_ids in batched(sorted(deltas), XP_FLUSH_BATCH_SIZE):
+            CustomUser.objects.filter(pk__in=user_ids).update(
+                exp_this_league=F("exp_this_league")
+                + _delta_by_pk(CustomUser, [(user_id, deltas[user_id]) for user_id in user_ids])
+            )
+
+            placements = list(
+                UserLeaguePlacement.objects
+                .filter(user_id__in=user_ids, league_group__week_start=week_start)
+                .values_list("id", "user_id", "league_group_id")
+            )
+            if not placements:
+                continue
+            UserLeaguePlacement.objects.filter(pk__in=[p[0] for p in placements]).update(
+                exp_earned=F("exp_earned")
+                + _delta_by_pk(UserLeaguePlacement, [(p_id, deltas[user_id]) for p_id, user_id, _ in placements])
+            )
+
+            changes = [(league_group_id, user_id, deltas[user_id]) for _, user_id, league_group_id in placements]
+            transaction.on_commit(lambda changes=changes: _apply_changes(changes))
+
+
+def _delta_by_pk(model, pairs):
+    # CASE pk WHEN ... THEN ... END, written directly: building one When() per row costs
+    # far more than the UPDATE itself once a flush holds a few hundred users.
+    column = connection.ops.quote_name(model._meta.pk.column)
+    whens = " ".join(["WHEN %s THEN %s"] * len(pairs))
+    params = [value for pair in pairs for value in pair]
+    return RawSQL(f"CASE {column} {whens} ELSE 0 END", params, output_field=IntegerField())
+
+
+def _apply_changes(changes):
+    # Per user, then once per group: a flush often moves many members of the same group.
+    store = get_ranking_store()
+    for league_group_id, user_id, amount in changes:
+        if store.has_group(league_group_id):
+            store.incr(league_group_id, user_id, amount)
+    for league_group_id in sorted({league_group_id for league_group_id, _, _ in changes}):
+        league_group_changed(league_group_id)
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_xp_buffer():
+    """The process-wide buffer, with its flusher thread started on first use."""
+    global _buffer
+    with _buffer_lock:
+        if _buffer is None:
+            _buffer = XPIngestBuffer()
+            _buffer.start()
+    return _buffer
+
+
+def record_xp_event(user_id, delta, timestamp=None):
+    get_xp_buffer().record(user_id, delta, timestamp)
@@ -71,6 +71,17 @@ class CustomUser(AbstractUser):
     high_score_lessons = models.IntegerField(default=0)  # For lessons >90%
     medium_score_lessons = models.IntegerField(default=0)  # For lessons >80%
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Locked-out users (current_league="") are a small slice the weekly reset
+            # visits; backends without partial indexes skip this one.
+            models.Index(
+                fields=["exp_to_enter"],
+                condition=models.Q(current_league=""),
+                name="user_locked_out_idx",
+            ),
+        ]
+
     def __str__(self):
         return self.email
 